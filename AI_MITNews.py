@@ -1,98 +1,380 @@
 import asyncio
 import json
-from pathlib import Path
-from playwright.async_api import async_playwright
+import time
 import os
+from http_cache import HttpCache, cache_path
+from seen_store import SeenStore, store_path
+from network_policy import NetworkMeter
 
 BASE_URL = "https://news.mit.edu"
+SITE_DOMAIN = "news.mit.edu"
 # 使用 HUGO_PROJECT_PATH 以便在 GitHub Action 中也能运行
 hugo_project_path = os.getenv('HUGO_PROJECT_PATH', r'C:\Users\kongg\0')
 base_dir = os.path.join(hugo_project_path, 'spiders', 'ai_news')
 SAVE_PATH = os.path.join(base_dir, "mit_news_articles.jsonl")
 HEADLESS = True
+# 并发抓取文章时复用的页面数量，设为 1 即退化为逐篇串行抓取
+CONCURRENCY = max(1, int(os.getenv('MIT_NEWS_CONCURRENCY', '4')))
+# 出错页面的替换页面新建失败时的重试次数，仍失败则池缩小一个名额
+PAGE_REPLACE_ATTEMPTS = 3
+ARTICLE_SELECTOR = "div.paragraph--type--content-block-text p"
+TEASER_SELECTOR = "a.front-page--news-article--teaser--title--link"
+# http: 直接用 httpx 抓取服务端渲染的页面，缺少正文选择器时才回退到浏览器；browser: 全程使用 Playwright
+FETCH_MODE = os.getenv('MIT_NEWS_FETCH_MODE', 'http')
+HTTP_HEADERS = {
+    "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                   "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"),
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "en-US,en;q=0.9",
+}
 
 
-def load_existing_urls(path):
-    if not Path(path).exists():
-        return set()
-    with open(path, "r", encoding="utf-8") as f:
-        return {json.loads(line)["url"] for line in f if line.strip()}
+def open_seen_store(path):
+    """已抓取 URL 的持久化索引，首次使用时从 JSONL 重建，之后只读取新增的行。"""
+    seen = SeenStore(store_path(os.path.dirname(path)))
+    return seen.attach("mit_news", path, lambda record: [("url", record.get("url"))])
 
 
-async def scrape_mit_news_articles(save_path):
-    # 确保输出目录存在
-    os.makedirs(os.path.dirname(save_path), exist_ok=True)
-    existing_urls = load_existing_urls(save_path)
+class PagePool:
+    """固定大小的页面池：页面在文章之间复用，出错的页面会被关闭并替换。"""
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=HEADLESS)
-        context = await browser.new_context()
+    def __init__(self, context, size):
+        self.context = context
+        self.size = size
+        self._idle = asyncio.Queue()
+        self._pages = set()
+
+    async def open(self):
+        for _ in range(self.size):
+            page = await self.context.new_page()
+            self._pages.add(page)
+            self._idle.put_nowait(page)
+
+    async def acquire(self):
+        page = await self._idle.get()
+        if page is None:
+            # 池里已经没有页面：把标记放回去，让其余等待者也能收到
+            self._idle.put_nowait(None)
+            raise RuntimeError("页面池中已没有可用页面，无法继续抓取")
+        return page
+
+    async def release(self, page, broken=False):
+        # 出错的页面可能停留在异常状态，直接关闭并换一个新页面放回池中
+        if broken:
+            self._pages.discard(page)
+            try:
+                await page.close()
+            except Exception:
+                pass
+            page = await self._replace()
+            if page is None:
+                return
+            self._pages.add(page)
+        self._idle.put_nowait(page)
+
+    async def _replace(self):
+        """新建替换页面，失败时重试；仍然失败就让池缩小一个名额，不向外抛出以免掩盖原来的抓取错误。"""
+        for attempt in range(1, PAGE_REPLACE_ATTEMPTS + 1):
+            try:
+                return await self.context.new_page()
+            except Exception as e:
+                print(f"⚠️ 新建替换页面失败（第 {attempt}/{PAGE_REPLACE_ATTEMPTS} 次）: {e}")
+                await asyncio.sleep(0.5 * attempt)
+        self.size -= 1
+        print(f"⚠️ 页面池缩小为 {self.size} 个页面")
+        if self.size == 0:
+            self._idle.put_nowait(None)
+        return None
+
+    async def close(self):
+        for page in list(self._pages):
+            try:
+                await page.close()
+            except Exception:
+                pass
+        self._pages.clear()
+
+
+async def fetch_article(pool, meter, title, url, results):
+    """从池中借一个页面抓取正文，结果(或 None)放入写入队列，并返回单篇耗时。"""
+    page = await pool.acquire()
+    started = time.perf_counter()
+    broken = False
+    meter.bind(page, url)
+    meter.start(url)
+    try:
+        print(f"📰 抓取：{title}")
+        await page.goto(url, timeout=60000)
+        await page.wait_for_selector(ARTICLE_SELECTOR, timeout=10000)
+
+        # 获取正文段落
+        paragraphs = await page.locator(ARTICLE_SELECTOR).all_inner_texts()
+        content = "\n\n".join(paragraphs)
+
+        await results.put({
+            "title": title,
+            "url": url,
+            "content": content.strip()
+        })
+    except Exception as e:
+        broken = True
+        print(f"❌ 抓取失败: {url} - {e}")
+    finally:
+        meter.finish(url)
+        await pool.release(page, broken=broken)
+    latency = time.perf_counter() - started
+    print(f"⏱️ {latency:.2f}s  {url}")
+    return latency
+
+
+async def write_articles(save_path, results, existing_urls):
+    """唯一的写入任务：按完成顺序把文章追加到 JSONL，收到 None 时结束。"""
+    saved = 0
+    with open(save_path, "a", encoding="utf-8") as f:
+        while True:
+            data = await results.get()
+            if data is None:
+                break
+            if data["url"] in existing_urls:
+                continue
+            f.write(json.dumps(data, ensure_ascii=False) + "\n")
+            f.flush()
+            existing_urls.add(data["url"])
+            saved += 1
+            print(f"✅ 已保存：{data['title']}")
+    return saved
+
+
+async def collect_teasers(page, existing_urls):
+    """从首页提取 (标题, 链接)，跳过已抓取过的文章。"""
+    teasers = []
+    seen = set()
+    links = await page.query_selector_all(TEASER_SELECTOR)
+    for link in links:
+        try:
+            href = await link.get_attribute("href")
+            title_span = await link.query_selector("span")
+            title = await title_span.inner_text() if title_span else ""
+            add_teaser(teasers, seen, existing_urls, title, href)
+        except Exception as e:
+            print(f"❌ 解析链接失败: {e}")
+    return teasers
+
+
+def add_teaser(teasers, seen, existing_urls, title, href):
+    if not href or not title.strip():
+        return  # 跳过无标题的
+
+    full_url = BASE_URL + href
+    if full_url in existing_urls:
+        print(f"⏭️ 已抓取，跳过：{full_url}")
+        return
+    if full_url in seen:
+        return
+    seen.add(full_url)
+    teasers.append((title.strip(), full_url))
+
+
+def parse_teasers(html, existing_urls):
+    """HTTP 模式下解析首页 HTML，返回与 collect_teasers 相同的 (标题, 链接) 列表；页面中没有新闻列表时返回 None。"""
+    from bs4 import BeautifulSoup
 
-        # 加快加载速度：拦截图片、字体等非必要资源
-        await context.route("**/*", lambda route: route.abort()
-                            if route.request.resource_type in ["image", "font", "media"]
-                            else route.continue_())
+    soup = BeautifulSoup(html, "html.parser")
+    links = soup.select(TEASER_SELECTOR)
+    if not links:
+        return None
+    teasers = []
+    seen = set()
+    for link in links:
+        title_span = link.find("span")
+        title = title_span.get_text(" ", strip=True) if title_span else ""
+        add_teaser(teasers, seen, existing_urls, title, link.get("href"))
+    return teasers
 
-        page = await context.new_page()
-        print("🔗 正在访问 MIT News 首页...")
 
-        # 增加重试逻辑，应对网络波动
+def parse_article(html):
+    """提取正文段落；页面中没有正文选择器时返回 None，由调用方回退到浏览器。"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    paragraphs = soup.select(ARTICLE_SELECTOR)
+    if not paragraphs:
+        return None
+    texts = [p.get_text().strip() for p in paragraphs]
+    return "\n\n".join(t for t in texts if t)
+
+
+def print_timing(latencies, wall_time, concurrency):
+    if not latencies:
+        print(f"⏱️ 没有需要抓取的新文章，总耗时 {wall_time:.2f}s")
+        return
+    ordered = sorted(latencies)
+    serial_time = sum(ordered)
+    print(f"⏱️ 共请求 {len(ordered)} 篇，并发 {concurrency}，总耗时 {wall_time:.2f}s")
+    print(f"   单篇耗时: 平均 {serial_time / len(ordered):.2f}s，"
+          f"中位 {ordered[len(ordered) // 2]:.2f}s，最长 {ordered[-1]:.2f}s")
+    print(f"   单篇耗时之和 {serial_time:.2f}s，相对串行加速约 {serial_time / wall_time:.1f}x")
+
+
+def new_http_client(concurrency):
+    """带连接池和 HTTP/2 的共享客户端，同一主机上的请求复用连接。"""
+    import httpx
+
+    return httpx.AsyncClient(
+        http2=True,
+        headers=HTTP_HEADERS,
+        timeout=httpx.Timeout(30.0),
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+    )
+
+
+async def fetch_article_http(client, cache, meter, sem, title, url, results, fallback):
+    """HTTP 模式抓取单篇文章；拿不到正文时把文章交给浏览器回退列表。"""
+    async with sem:
+        started = time.perf_counter()
+        try:
+            response = await cache.fetch(client, url)
+            meter.record_response(url, response, time.perf_counter() - started)
+            response.raise_for_status()
+            content = parse_article(response.text)
+            if content is None:
+                print(f"↩️ 未找到正文选择器，改用浏览器：{url}")
+                fallback.append((title, url))
+            else:
+                await results.put({
+                    "title": title,
+                    "url": url,
+                    "content": content.strip()
+                })
+        except Exception as e:
+            print(f"↩️ HTTP 抓取失败，改用浏览器：{url} - {e}")
+            fallback.append((title, url))
+        latency = time.perf_counter() - started
+        print(f"⏱️ {latency:.2f}s  {url}")
+        return latency
+
+
+async def scrape_with_http(save_path, existing_urls, concurrency, cache, meter):
+    """不启动浏览器抓取首页和文章。返回 (耗时列表, 需要回退的文章)；首页不可用时回退列表为 None。"""
+    fallback = []
+    async with new_http_client(concurrency) as client:
+        print("🔗 正在通过 HTTP 访问 MIT News 首页...")
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                await page.goto(BASE_URL, timeout=60000)
-                print("✅ 成功访问 MIT News 首页。")
-                break  # 成功，则跳出循环
+                response = await cache.fetch(client, BASE_URL)
+                meter.record_response(meter.listing(BASE_URL), response)
+                response.raise_for_status()
+                break
             except Exception as e:
-                print(f"🕒 访问超时 (尝试 {attempt + 1}/{max_retries})，正在重试...")
+                print(f"🕒 访问失败 (尝试 {attempt + 1}/{max_retries})：{e}")
                 if attempt == max_retries - 1:
-                    print(f"❌ 访问 MIT News 失败，已达最大重试次数: {e}")
-                    await browser.close()
-                    return  # 退出函数
+                    return [], None
+
+        teasers = parse_teasers(response.text, existing_urls)
+        if teasers is None:
+            # 首页结构与预期不符（例如改为客户端渲染），整体交给浏览器处理
+            print("↩️ 首页中未找到新闻列表，改用浏览器模式。")
+            return [], None
+        print(f"🧮 待抓取 {len(teasers)} 篇，HTTP 并发 {concurrency}")
+
+        results = asyncio.Queue()
+        writer = asyncio.create_task(write_articles(save_path, results, existing_urls))
+        sem = asyncio.Semaphore(concurrency)
+        try:
+            latencies = await asyncio.gather(
+                *(fetch_article_http(client, cache, meter, sem, title, url, results, fallback) for title, url in teasers)
+            )
+        finally:
+            await results.put(None)
+            await writer
+    return list(latencies), fallback
+
 
-        print("🔍 正在提取新闻标题和链接...")
-        links = await page.query_selector_all("a.front-page--news-article--teaser--title--link")
+async def scrape_with_browser(save_path, existing_urls, concurrency, cache, meter, teasers=None):
+    """Playwright 抓取路径。teasers 为 None 时先从首页提取链接，否则只抓取给定的文章。"""
+    from playwright.async_api import async_playwright
 
-        with open(save_path, "a", encoding="utf-8") as f:
-            for link in links:
+    latencies = []
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=HEADLESS)
+        try:
+            context = await browser.new_context()
+
+            # 加快加载速度：按共享策略拦截图片、字体、统计脚本等非必要资源，页面和接口走磁盘缓存
+            await meter.install(context, cache, site=SITE_DOMAIN)
+
+            if teasers is None:
+                page = await context.new_page()
+                meter.bind(page, meter.listing(BASE_URL))
+                print("🔗 正在访问 MIT News 首页...")
+
+                # 增加重试逻辑，应对网络波动
+                max_retries = 3
+                for attempt in range(max_retries):
+                    try:
+                        await page.goto(BASE_URL, timeout=60000)
+                        print("✅ 成功访问 MIT News 首页。")
+                        break  # 成功，则跳出循环
+                    except Exception as e:
+                        print(f"🕒 访问超时 (尝试 {attempt + 1}/{max_retries})，正在重试...")
+                        if attempt == max_retries - 1:
+                            print(f"❌ 访问 MIT News 失败，已达最大重试次数: {e}")
+                            return latencies  # 退出函数
+
+                print("🔍 正在提取新闻标题和链接...")
+                teasers = await collect_teasers(page, existing_urls)
+                await page.close()
+            print(f"🧮 浏览器待抓取 {len(teasers)} 篇，并发页面数 {min(concurrency, len(teasers))}")
+
+            if teasers:
+                pool = PagePool(context, min(concurrency, len(teasers)))
+                results = asyncio.Queue()
+                writer = asyncio.create_task(write_articles(save_path, results, existing_urls))
                 try:
-                    href = await link.get_attribute("href")
-                    title_span = await link.query_selector("span")
-                    title = await title_span.inner_text() if title_span else ""
-
-                    if not href or not title.strip():
-                        continue  # 跳过无标题的
-
-                    full_url = BASE_URL + href
-                    if full_url in existing_urls:
-                        print(f"⏭️ 已抓取，跳过：{full_url}")
-                        continue
-
-                    print(f"📰 抓取：{title.strip()}")
-                    article_page = await context.new_page()
-                    await article_page.goto(full_url, timeout=60000)
-                    await article_page.wait_for_selector("div.paragraph--type--content-block-text p", timeout=10000)
-
-                    # 获取正文段落
-                    paragraphs = await article_page.locator("div.paragraph--type--content-block-text p").all_inner_texts()
-                    content = "\n\n".join(paragraphs)
-
-                    data = {
-                        "title": title.strip(),
-                        "url": full_url,
-                        "content": content.strip()
-                    }
-
-                    f.write(json.dumps(data, ensure_ascii=False) + "\n")
-                    f.flush()
-
-                    existing_urls.add(full_url)
-                    print(f"✅ 已保存：{title.strip()}")
-                    await article_page.close()
-
-                except Exception as e:
-                    print(f"❌ 抓取失败: {e}")
-        await browser.close()
+                    await pool.open()
+                    latencies = await asyncio.gather(
+                        *(fetch_article(pool, meter, title, url, results) for title, url in teasers)
+                    )
+                finally:
+                    await results.put(None)
+                    await writer
+                    await pool.close()
+        finally:
+            await browser.close()
+    return list(latencies)
+
+
+async def scrape_mit_news_articles(save_path, concurrency=CONCURRENCY, mode=FETCH_MODE):
+    started = time.perf_counter()
+    # 确保输出目录存在
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    seen = open_seen_store(save_path)
+    existing_urls = seen.view("mit_news", "url")
+    cache = HttpCache(cache_path(os.path.dirname(save_path)))
+    meter = NetworkMeter("mit_news")
+
+    try:
+        if mode == "http":
+            latencies, fallback = await scrape_with_http(save_path, existing_urls, concurrency, cache, meter)
+            if fallback is None:
+                latencies += await scrape_with_browser(save_path, existing_urls, concurrency, cache, meter)
+            elif fallback:
+                print(f"🌐 {len(fallback)} 篇文章需要浏览器回退抓取")
+                latencies += await scrape_with_browser(save_path, existing_urls, concurrency, cache, meter,
+                                                       teasers=fallback)
+        else:
+            latencies = await scrape_with_browser(save_path, existing_urls, concurrency, cache, meter)
+    finally:
+        meter.write_summary(os.path.dirname(save_path))
+        cache.report()
+        cache.close()
+        seen.close()
+
+    wall_time = time.perf_counter() - started
+    print_timing(latencies, wall_time, concurrency)
+    return {"latencies": latencies, "wall_time": wall_time}
 
 
 if __name__ == "__main__":
@@ -1,13 +1,28 @@
 import os
 import json
+import re
+import hashlib
 import asyncio
-from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
+import time
+from datetime import datetime, timedelta
+import pytz
+from http_cache import HttpCache, cache_path
+from network_policy import NetworkMeter
+from seen_store import SeenStore, store_path
 
 # 检查是否在GitHub Actions环境中运行
 is_github_actions = os.environ.get('GITHUB_ACTIONS') == 'true'
-if is_github_actions:
-    print("在GitHub Actions环境中运行")
+
+SITE_URL = "https://www.jiqizhixin.com"
+SITE_DOMAIN = "jiqizhixin.com"
+LIST_URL = f"{SITE_URL}/articles"
+API_URL = f"{SITE_URL}/api/v4/articles/"
+# api: 从列表页一次性收集文章 ID，再批量并发请求接口；click: 逐篇点击卡片并返回列表页（旧逻辑）
+CRAWL_MODE = os.getenv('JIQIZHIXIN_MODE', 'api')
+# api 模式下每批并发请求的文章数
+CONCURRENCY = max(1, int(os.getenv('JIQIZHIXIN_CONCURRENCY', '8')))
+# 设置后把抓到的文章 HTML 保存到该目录，作为 bench_html_extract.py 的基准语料
+HTML_CORPUS_DIR = os.getenv('JIQIZHIXIN_HTML_CORPUS_DIR')
 
 # ========== 环境加载 (OpenAI相关已移除) ==========
 
@@ -18,106 +33,381 @@ if is_github_actions:
 hugo_project_path = os.getenv('HUGO_PROJECT_PATH', '.') # 默认为当前目录
 base_dir = os.path.join(hugo_project_path, 'spiders', 'ai_news')
 output_file = os.path.join(base_dir, "jiqizhixin_articles_summarized.jsonl")
+# 已处理到的最新文章（published_at + id），列表页从新到旧排列，遇到不晚于它的卡片即可停止
+watermark_file = os.path.join(base_dir, "jiqizhixin_watermark.json")
+SITE_TIMEZONE = pytz.timezone("Asia/Shanghai")
 # Markdown文件生成已移至AI_summary.py
-summarized_titles = set()
-if os.path.exists(output_file):
-    with open(output_file, "r", encoding="utf-8") as f:
-        for line in f:
-            try:
-                data = json.loads(line)
-                summarized_titles.add(data["title"])
-            except:
-                continue
+# 已爬取标题保存在持久化索引中（按规范化标题去重），首次使用时从输出文件重建
+# 在 main() 中打开，导入本模块（例如 news_sources.py 复用这里的解析函数）时不触碰磁盘
+seen_store = None
+summarized_titles = None
+
+
+def open_seen_store():
+    global seen_store, summarized_titles
+    seen_store = SeenStore(store_path(base_dir)).attach(
+        "jiqizhixin", output_file, lambda record: [("title", record.get("title"))]
+    )
+    summarized_titles = seen_store.view("jiqizhixin", "title")
 
 # ========== 摘要生成函数 (已移除) ==========
 
+# 在浏览器内请求文章接口，沿用页面的 cookie 和同源上下文，单篇失败不影响同批其他文章
+FETCH_BATCH_JS = """
+async (urls) => Promise.all(urls.map(async (url) => {
+    try {
+        const res = await fetch(url, {headers: {"Accept": "application/json"}, credentials: "include"});
+        if (!res.ok) {
+            return {url: url, status: res.status};
+        }
+        return {url: url, status: res.status, data: await res.json()};
+    } catch (e) {
+        return {url: url, error: String(e)};
+    }
+}))
+"""
+
+# 读取列表页中每张卡片的时间和文章链接
+LIST_CARDS_JS = """
+() => Array.from(document.querySelectorAll("div.article-card")).map((card) => {
+    const time = card.querySelector("div.article-card__time");
+    const link = card.querySelector('a[href*="/articles/"]') || card.closest('a[href*="/articles/"]');
+    return {time: time ? time.innerText : "", href: link ? link.href : null};
+})
+"""
+
+
+def is_too_old(time_text):
+    return "天前" in time_text or "月前" in time_text or "年前" in time_text
+
+
+RELATIVE_UNITS = {
+    "秒": timedelta(seconds=1),
+    "分钟": timedelta(minutes=1),
+    "小时": timedelta(hours=1),
+    "天": timedelta(days=1),
+    "周": timedelta(weeks=1),
+    "个月": timedelta(days=30),
+    "月": timedelta(days=30),
+    "年": timedelta(days=365),
+}
+
+
+def parse_card_time(time_text, now=None):
+    """把卡片上的时间（刚刚、5分钟前、3小时前、昨天 10:20、07-01、2024-07-01）换算成绝对时间。
+
+    相对时间只精确到所写的单位，返回的是文章可能的最晚发布时间（“3小时前”即 now - 3h），
+    用它和水位线比较不会把新文章误判为旧文章。无法识别时返回 None。
+    """
+    now = now or datetime.now(SITE_TIMEZONE)
+    text = time_text.strip()
+    if not text:
+        return None
+    if text == "刚刚":
+        return now
+    match = re.match(r"(\d+)\s*(秒|分钟|小时|天|周|个月|月|年)前", text)
+    if match:
+        return now - int(match.group(1)) * RELATIVE_UNITS[match.group(2)]
+    match = re.match(r"(昨天|前天)\s*(\d{1,2}):(\d{2})?", text)
+    if match:
+        day = now - timedelta(days=1 if match.group(1) == "昨天" else 2)
+        return day.replace(hour=int(match.group(2)), minute=int(match.group(3) or 0), second=0, microsecond=0)
+    match = re.match(r"(?:(\d{4})[-/.年])?(\d{1,2})[-/.月](\d{1,2})日?", text)
+    if match:
+        year = int(match.group(1)) if match.group(1) else now.year
+        day_end = SITE_TIMEZONE.localize(datetime(year, int(match.group(2)), int(match.group(3)), 23, 59, 59))
+        if not match.group(1) and day_end > now + timedelta(days=1):
+            day_end = day_end.replace(year=year - 1)  # 不带年份的日期落在未来，说明是去年
+        return day_end
+    return None
+
+
+def parse_published_at(value):
+    """解析接口返回的 published_at（ISO 字符串、“2024/07/01 10:20”或时间戳），失败返回 None。"""
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000 if value > 1e11 else value, SITE_TIMEZONE)
+    text = str(value).strip().replace("/", "-").replace("Z", "+00:00")
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = SITE_TIMEZONE.localize(parsed)
+    return parsed
+
+
+def load_watermark():
+    if not os.path.exists(watermark_file):
+        return None
+    try:
+        with open(watermark_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return {"id": data["id"], "published_at": parse_published_at(data["published_at"])}
+    except Exception as e:
+        print(f"⚠️ 水位线文件无法读取，本次按时间截止规则抓取: {e}")
+        return None
+
+
+def save_watermark(watermark):
+    with open(watermark_file, "w", encoding="utf-8") as f:
+        json.dump({"id": watermark["id"], "published_at": watermark["published_at"].isoformat()}, f)
+
+
+def reached_watermark(watermark, article_id, time_text):
+    """卡片是水位线那篇文章，或其最晚可能发布时间早于水位线时，说明之后的卡片都已处理过。"""
+    if article_id == watermark["id"]:
+        return True
+    card_time = parse_card_time(time_text)
+    return card_time is not None and watermark["published_at"] is not None and card_time < watermark["published_at"]
+
+
+def advance_watermark(watermark, articles, done):
+    """articles 按列表顺序（从新到旧），done 为成功处理的 {文章ID: published_at}。
+
+    从最旧的一篇往新推进，遇到第一篇失败的文章就停下，保证水位线以下没有漏抓的文章。
+    """
+    for article_id, _ in reversed(articles):
+        if article_id not in done:
+            break
+        published_at = parse_published_at(done[article_id])
+        if published_at is None:
+            break
+        if watermark is None or watermark["published_at"] is None or published_at >= watermark["published_at"]:
+            watermark = {"id": article_id, "published_at": published_at}
+    return watermark
+
+
+def build_row(data, article_url):
+    """把文章接口返回的 JSON 转成输出行；无标题、已处理或无正文时返回 None。"""
+    title = data.get("title")
+    if not title or title in summarized_titles:
+        print(f"⏭️ 跳过已处理或无标题的文章: {title}")
+        return None
+
+    # 核心改进：解析HTML内容并提取纯文本
+    html_content = data.get("content")
+    if not html_content:
+        print(f"⚠️ 未找到文章内容 (content)，跳过文章: {title}")
+        return None
+
+    save_html_sample(article_url, html_content)
+    from html_extract import extract_text
+
+    # AI摘要生成已移除，只准备数据
+    return {
+        "title": title,
+        "published_at": data.get("published_at"),
+        "url": article_url,
+        # 优先提取 article__content 容器，找不到时提取全部文本；提供给 AI_summary.py 的原文
+        "content": extract_text(html_content),
+    }
+
+
+def save_html_sample(article_url, html_content):
+    if not HTML_CORPUS_DIR:
+        return
+    os.makedirs(HTML_CORPUS_DIR, exist_ok=True)
+    name = hashlib.md5(article_url.encode("utf-8")).hexdigest()
+    with open(os.path.join(HTML_CORPUS_DIR, f"{name}.html"), "w", encoding="utf-8") as f:
+        f.write(html_content)
+
+
+def write_row(f, row):
+    # 写入 JSONL
+    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    f.flush()
+    summarized_titles.add(row["title"])
+    print(f"✅ 已爬取文章: {row['title']}")
+
+
+async def discover_articles(page, watermark=None):
+    """只加载一次列表页，返回需要抓取的 (文章ID, 文章URL)；卡片中找不到链接时返回 None。
+
+    有水位线时在第一张不晚于水位线的卡片处停止；没有水位线（首次运行）时沿用“天前/月前/年前”截止规则。
+    """
+    try:
+        await page.wait_for_selector("div.article-card", timeout=30000)
+    except Exception as e:
+        print(f"⚠️ 列表页未出现文章卡片: {e}")
+    cards = await page.evaluate(LIST_CARDS_JS)
+
+    articles = []
+    for i, card in enumerate(cards):
+        print(f"[{i + 1}/{len(cards)}] 检查文章: {card['time']}")
+        if not card["href"]:
+            print("⚠️ 文章卡片中没有链接，无法使用接口模式。")
+            return None
+        article_url = card["href"].split("?")[0].split("#")[0].rstrip("/")
+        article_id = article_url.rsplit("/", 1)[-1]
+        if watermark is not None:
+            if reached_watermark(watermark, article_id, card["time"]):
+                print("🛑 已到达上次的水位线，停止收集。")
+                break
+        elif is_too_old(card["time"]):
+            print("🛑 遇到较早的文章，停止收集。")
+            break
+        articles.append((article_id, article_url))
+    return articles
+
+
+async def crawl_via_api(page, articles, f, meter):
+    """在浏览器内并发请求 /api/v4/articles/<id>，按列表顺序写入结果。返回成功处理的 {文章ID: published_at}。
+
+    滑动窗口：最多 CONCURRENCY 个请求同时进行，任一请求完成就补上下一篇，慢请求不会拖住整批。
+    """
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    results = [None] * len(articles)
+    done = {}
+    written = 0
+
+    def write_ready():
+        # 按列表顺序写出已经返回的结果，前面还有请求未完成时先留着
+        nonlocal written
+        while written < len(articles) and results[written] is not None:
+            (article_id, article_url), result = articles[written], results[written]
+            written += 1
+            if "data" not in result:
+                print(f"⚠️ 接口请求失败，跳过文章 {article_id}: {result.get('error') or result.get('status')}")
+                continue
+            row = build_row(result["data"], article_url)
+            if row:
+                write_row(f, row)
+            done[article_id] = result["data"].get("published_at")
+
+    async def fetch(i, article_id, article_url):
+        async with semaphore:
+            # 接口请求发生在列表页里，按 URL 登记后才能把流量记到对应文章上
+            meter.expect(API_URL + article_id, article_url)
+            meter.start(article_url)
+            try:
+                results[i] = (await page.evaluate(FETCH_BATCH_JS, [API_URL + article_id]))[0]
+            except Exception as e:
+                results[i] = {"error": str(e)}
+            finally:
+                meter.finish(article_url)
+        write_ready()
+
+    await asyncio.gather(*(fetch(i, article_id, article_url) for i, (article_id, article_url) in enumerate(articles)))
+    print(f"⏱️ 接口模式请求 {len(articles)} 篇，并发 {CONCURRENCY}，耗时 {time.perf_counter() - started:.2f}s")
+    return done
+
+
+async def crawl_by_clicking(page, f, meter, watermark=None):
+    """逐篇点击卡片抓取，截止规则与 discover_articles 相同（有水位线时按水位线）。
+
+    返回 (articles, done)，格式与接口模式相同，供 advance_watermark 推进水位线；
+    失败的卡片拿不到文章 ID，以 (None, None) 占位，水位线不会越过它。
+    """
+    cards = await page.locator("div.article-card").all()
+    articles = []
+    done = {}
+
+    for i, card in enumerate(cards):
+        # 提前获取时间，减少不必要的点击
+        time_text = await card.locator("div.article-card__time").inner_text()
+        print(f"[{i + 1}/{len(cards)}] 检查文章: {time_text}")
+
+        if watermark is not None:
+            if reached_watermark(watermark, None, time_text):
+                print("🛑 已到达上次的水位线，停止抓取。")
+                break
+        elif is_too_old(time_text):
+            print("🛑 遇到较早的文章，停止抓取。")
+            break
+
+        # 设置监听
+        try:
+            async with page.expect_response(
+                lambda res: "/api/v4/articles/" in res.url and res.status == 200,
+                timeout=30000  # 缩短等待时间
+            ) as res_info:
+                meter.bind(page, f"card-{i + 1}")
+                meter.start(f"card-{i + 1}")
+                await card.click()
+                await page.wait_for_load_state("domcontentloaded") # 等待DOM即可，无需等待所有资源
+                response = await res_info.value
+                data = await response.json()
+                # 获取当前页面的URL
+                article_url = page.url
+                meter.finish(f"card-{i + 1}")
+
+        except Exception as e:
+            print(f"⚠️ 页面加载或API请求失败，跳过该篇文章: {e}")
+            articles.append((None, None))
+            # 出错后，返回列表页并重新获取卡片列表以保证状态同步
+            await page.go_back()
+            await page.wait_for_load_state("domcontentloaded")
+            continue
+
+        article_url = article_url.split("?")[0].split("#")[0].rstrip("/")
+        article_id = article_url.rsplit("/", 1)[-1]
+        if watermark is not None and article_id == watermark["id"]:
+            print("🛑 已到达上次的水位线，停止抓取。")
+            await page.go_back()
+            break
+        articles.append((article_id, article_url))
+        done[article_id] = data.get("published_at")
+
+        row = build_row(data, article_url)
+        if row is None:
+            await page.go_back() # 返回列表页
+            await page.wait_for_timeout(500) # 等待一下
+            continue
+
+        write_row(f, row)
+
+        # 返回文章列表页，准备处理下一篇
+        await page.go_back()
+        # 等待列表页加载完成
+        await page.wait_for_load_state("domcontentloaded")
+        await page.wait_for_timeout(1000) # 等待一下，避免过快操作
+    return articles, done
+
+
 # ========== 主爬虫逻辑 ==========
-async def main():
+async def main(mode=CRAWL_MODE):
+    from playwright.async_api import async_playwright
+
+    if is_github_actions:
+        print("在GitHub Actions环境中运行")
     # 确保输出目录存在
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    open_seen_store()
     async with async_playwright() as p:
         # 在GitHub Actions中使用headless模式，本地开发可视化
         browser = await p.chromium.launch(headless=is_github_actions)
-        page = await browser.new_page()
-        await page.goto("https://www.jiqizhixin.com/articles", timeout=60000)
-
-        cards = await page.locator("div.article-card").all()
-
-        with open(output_file, "a", encoding="utf-8") as f:
-            for i, card in enumerate(cards):
-                # 提前获取时间，减少不必要的点击
-                time_text = await card.locator("div.article-card__time").inner_text()
-                print(f"[{i + 1}/{len(cards)}] 检查文章: {time_text}")
-
-                if "天前" in time_text or "月前" in time_text or "年前" in time_text:
-                    print("🛑 遇到较早的文章，停止抓取。")
-                    break
-
-                # 设置监听
-                try:
-                    async with page.expect_response(
-                        lambda res: "/api/v4/articles/" in res.url and res.status == 200,
-                        timeout=30000  # 缩短等待时间
-                    ) as res_info:
-                        await card.click()
-                        await page.wait_for_load_state("domcontentloaded") # 等待DOM即可，无需等待所有资源
-                        response = await res_info.value
-                        data = await response.json()
-                        # 获取当前页面的URL
-                        article_url = page.url
-
-                except Exception as e:
-                    print(f"⚠️ 页面加载或API请求失败，跳过该篇文章: {e}")
-                    # 出错后，返回列表页并重新获取卡片列表以保证状态同步
-                    await page.go_back()
-                    await page.wait_for_load_state("domcontentloaded")
-                    continue
-
-                title = data.get("title")
-                if not title or title in summarized_titles:
-                    print(f"⏭️ 跳过已处理或无标题的文章: {title}")
-                    await page.go_back() # 返回列表页
-                    await page.wait_for_timeout(500) # 等待一下
-                    continue
-                
-                # 核心改进：解析HTML内容并提取纯文本
-                html_content = data.get("content")
-                if not html_content:
-                    print(f"⚠️ 未找到文章内容 (content)，跳过文章: {title}")
-                    await page.go_back() # 返回列表页
-                    await page.wait_for_timeout(500)
-                    continue
-
-                soup = BeautifulSoup(html_content, "html.parser")
-                
-                # 优先尝试提取特定文章内容容器，如果失败则提取全部文本
-                article_body = soup.find('div', class_='article__content')
-                if article_body:
-                    content = article_body.get_text(separator="\n", strip=True)
+        context = await browser.new_context()
+        # 按共享策略拦截非必要资源；列表页和文章接口通过磁盘缓存做条件请求，内容未变时不再重新下载
+        cache = HttpCache(cache_path(base_dir))
+        meter = NetworkMeter("jiqizhixin")
+        await meter.install(context, cache, site=SITE_DOMAIN)
+        try:
+            page = await context.new_page()
+            meter.bind(page, meter.listing(LIST_URL))
+            await page.goto(LIST_URL, timeout=60000)
+
+            with open(output_file, "a", encoding="utf-8") as f:
+                watermark = load_watermark()
+                articles = await discover_articles(page, watermark) if mode == "api" else None
+                if articles is not None:
+                    done = await crawl_via_api(page, articles, f, meter)
                 else:
-                    content = soup.get_text(separator="\n", strip=True)
-
-                # AI摘要生成已移除，只准备数据
-                row = {
-                    "title": title,
-                    "published_at": data.get("published_at"),
-                    "url": article_url,
-                    "content": content, # 提供给 AI_summary.py 的原文
-                }
-
-                # 写入 JSONL
-                f.write(json.dumps(row, ensure_ascii=False) + "\n")
-                summarized_titles.add(title)
-                
-                print(f"✅ 已爬取文章: {title}")
-
-                # 返回文章列表页，准备处理下一篇
-                await page.go_back()
-                # 等待列表页加载完成
-                await page.wait_for_load_state("domcontentloaded")
-                await page.wait_for_timeout(1000) # 等待一下，避免过快操作
-
-        await browser.close()
+                    if mode == "api":
+                        print("↩️ 回退到逐篇点击模式。")
+                    articles, done = await crawl_by_clicking(page, f, meter, watermark)
+                new_watermark = advance_watermark(watermark, articles, done)
+                if new_watermark is not watermark:
+                    save_watermark(new_watermark)
+                    print(f"🔖 水位线更新为 {new_watermark['id']} ({new_watermark['published_at'].isoformat()})")
+        finally:
+            await browser.close()
+            meter.write_summary(base_dir)
+            cache.report()
+            cache.close()
+            seen_store.close()
 
 # 运行爬虫
 if __name__ == "__main__":
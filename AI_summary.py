@@ -1,85 +1,213 @@
 import os
 import json
+import time
+import asyncio
 import hashlib
-from openai import OpenAI
-from tqdm import tqdm
-from dotenv import load_dotenv
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from seen_store import SeenStore, store_path, iter_jsonl
+from llm_scheduler import RateLimiter, estimate_tokens, parse_duration
+from token_budget import count_tokens, split_by_tokens, truncate_to_tokens
+import llm_cache
+import near_dup
+import run_metrics
+import llm_usage
+import text_hash
 
-# 检查是否在GitHub Actions环境中运行
-is_github_actions = os.environ.get('GITHUB_ACTIONS') == 'true'
+# 导入本模块不做任何事：路径检测、OpenAI 客户端、索引和缓存都在 setup() 里初始化，
+# openai、tqdm、dotenv 等较重的依赖也在用到时才导入。入口为 main()
 
+OPENAI_API_KEY = None
+OPENAI_API_BASE = None
+client = None
 
-load_dotenv()
+base = None  # SeaTable disabled
+table_name = 'AI摘要'  # preserved as placeholder, not used
 
+hugo_project_path = ''
+base_dir = ''
+input_files = []
+output_file = ''
+batch_state_file = ''
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_API_BASE = os.getenv("OPENAI_API_BASE")
+# 本次运行中已排队的内容哈希，防止输入文件之间互相重复
+content_hash_set = set()
 
-# ========== 初始化 ==========
-# 使用 OpenAI v1.x+ 内置的重试机制
-client = OpenAI(
-    api_key=OPENAI_API_KEY,
-    base_url=OPENAI_API_BASE,
-    timeout=60.0,  # 设置较长的超时时间
-    max_retries=5, # 内置的重试次数
-)
+# 已总结的标题和内容哈希保存在持久化索引中，首次使用时从输出文件重建，之后只读取新增的行
+def summary_keys(record):
+    keys = [("title", record.get("title"))]
+    # 同时记录内容哈希值，用于去重
+    if record.get("original_content"):
+        keys.append(("content", record["original_content"]))
+    return keys
 
+seen_store = None
+summarized_titles = None
+summarized_contents = None
+# 精确去重之外再按 MinHash 找近似重复（改过一句话的稿子、被抓了两次的通稿），命中的不再调用接口
+near_dup_index = None
+# 摘要结果缓存：内容、提示词、模型、温度都不变时直接复用上次的 summary/tags
+summary_cache = None
+# 每次 LLM 调用的 token 数、耗时和重试次数，追加写入 llm_usage.jsonl，运行结束时打印汇总
+usage_log = None
 
-base = None  # SeaTable disabled
-table_name = 'AI摘要'  # preserved as placeholder, not used
 
-# --- 环境自适应的智能路径配置 ---
-hugo_project_path = ''
-# 首先检查是否在 GitHub Actions 环境中
-if os.environ.get('GITHUB_ACTIONS') == 'true':
-    print("🤖 [AI_summary.py] 在 GitHub Actions 中运行, 将使用环境变量。")
-    hugo_project_path = os.getenv('HUGO_PROJECT_PATH')
-    if not hugo_project_path:
-        print("❌ 错误: 在 GitHub Actions 环境中, 环境变量 HUGO_PROJECT_PATH 未设置。")
-        sys.exit(1)
-else:
-    # 如果不在云端，则假定为本地环境，自动计算路径
-    print("💻 [AI_summary.py] 在本地运行, 将自动检测项目路径。")
-    hugo_project_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-print(f"✅ [AI_summary.py] 使用 Hugo 项目路径: {hugo_project_path}")
-# --- 路径配置结束 ---
-
-# 文件路径现在完全基于 hugo_project_path
-base_dir = os.path.join(hugo_project_path, 'spiders', 'ai_news')
-input_files = [
-    os.path.join(base_dir, "mit_news_articles.jsonl"),
-    os.path.join(base_dir, "jiqizhixin_articles_summarized.jsonl")
-]
-output_file = os.path.join(base_dir, "summarized_articles.jsonl")
-markdown_file = os.path.join(base_dir, "summarized_articles.md")  # 新增Markdown文件名
-
-# 用于去重的内容哈希集合
-content_hash_set = set()
+def detect_hugo_project_path():
+    # --- 环境自适应的智能路径配置 ---
+    # 首先检查是否在 GitHub Actions 环境中
+    if os.environ.get('GITHUB_ACTIONS') == 'true':
+        print("🤖 [AI_summary.py] 在 GitHub Actions 中运行, 将使用环境变量。")
+        path = os.getenv('HUGO_PROJECT_PATH')
+        if not path:
+            print("❌ 错误: 在 GitHub Actions 环境中, 环境变量 HUGO_PROJECT_PATH 未设置。")
+            sys.exit(1)
+    else:
+        # 如果不在云端，则假定为本地环境，自动计算路径
+        print("💻 [AI_summary.py] 在本地运行, 将自动检测项目路径。")
+        path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    print(f"✅ [AI_summary.py] 使用 Hugo 项目路径: {path}")
+    return path
 
-# 用于计算内容哈希值
-def get_content_hash(content):
-    return hashlib.md5(content.encode('utf-8')).hexdigest()
 
-# 加载已总结的标题集合和内容哈希集合
-summarized_titles = set()
-if os.path.exists(output_file):
-    with open(output_file, 'r', encoding='utf-8') as f:
-        for line in f:
-            try:
-                data = json.loads(line)
-                summarized_titles.add(data["title"])
-                # 同时记录内容哈希值，用于去重
-                if "original_content" in data:
-                    content_hash = get_content_hash(data["original_content"])
-                    content_hash_set.add(content_hash)
-            except:
-                continue
+def setup():
+    """初始化一次运行所需的客户端、路径、已见索引、近似重复索引和缓存。"""
+    global OPENAI_API_KEY, OPENAI_API_BASE, client
+    global hugo_project_path, base_dir, input_files, output_file, batch_state_file
+    global seen_store, summarized_titles, summarized_contents, near_dup_index, summary_cache, usage_log
+    from dotenv import load_dotenv
+    from openai import OpenAI
+
+    load_dotenv()
+    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    OPENAI_API_BASE = os.getenv("OPENAI_API_BASE")
+    # 摘要请求的重试由 call_openai_with_retry 自己处理（以便记录重试次数），内置重试只用于批任务的文件和状态接口
+    client = OpenAI(
+        api_key=OPENAI_API_KEY,
+        base_url=OPENAI_API_BASE,
+        timeout=60.0,  # 设置较长的超时时间
+        max_retries=5, # 内置的重试次数
+    )
+
+    hugo_project_path = detect_hugo_project_path()
+    # 文件路径现在完全基于 hugo_project_path
+    base_dir = os.path.join(hugo_project_path, 'spiders', 'ai_news')
+    input_files = [
+        os.path.join(base_dir, "mit_news_articles.jsonl"),
+        os.path.join(base_dir, "jiqizhixin_articles_summarized.jsonl")
+    ]
+    output_file = os.path.join(base_dir, "summarized_articles.jsonl")
+    # 批任务状态文件：记录已提交的 batch 和已合并的请求，之后的运行据此查询并合并同一个 batch
+    batch_state_file = os.path.join(base_dir, "summary_batch_state.json")
+
+    content_hash_set.clear()
+    queued_titles.clear()
+    input_progress.clear()
+    seen_store = SeenStore(store_path(base_dir)).attach("summary", output_file, summary_keys)
+    summarized_titles = seen_store.view("summary", "title")
+    summarized_contents = seen_store.view("summary", "content")
+    near_dup_index = near_dup.NearDupIndex(near_dup.index_path(base_dir))
+    if near_dup_index.needs_backfill():
+        near_dup_index.backfill(iter_summarized_inputs())
+    summary_cache = llm_cache.LLMCache(llm_cache.cache_path(base_dir))
+    usage_log = llm_usage.UsageLog(llm_usage.log_path(base_dir))
+
+
+def teardown():
+    save_input_checkpoints()
+    near_dup_index.report()
+    near_dup_index.close()
+    summary_cache.report()
+    summary_cache.close()
+    usage_log.report()
+    usage_log.close()
+    seen_store.close()
+
+
+MODEL = "gpt-3.5-turbo"
+TEMPERATURE = 0.5
+# 并发生成摘要的协程数，设为 1 时使用原来的同步逐篇模式
+CONCURRENCY = max(1, int(os.getenv("SUMMARY_CONCURRENCY", "4")))
+# 每分钟请求数和 token 数的预算，调度器据此排队；收到 429 时会自动下调
+RPM_LIMIT = int(os.getenv("OPENAI_RPM_LIMIT", "60"))
+TPM_LIMIT = int(os.getenv("OPENAI_TPM_LIMIT", "60000"))
+MAX_ATTEMPTS = 6
+# 同步模式下同时进行中的请求数上限，各篇文章的分段请求共用
+request_slots = threading.BoundedSemaphore(CONCURRENCY)
+# 一篇文章因自身原因（请求被拒、返回无法解析）累计失败这么多次后不再重试，输入文件断点越过它
+MAX_ARTICLE_FAILURES = int(os.getenv("SUMMARY_MAX_FAILURES", "3"))
+# 批任务结果里表示请求本身有问题的状态码
+ARTICLE_ERROR_STATUS = (400, 422)
+# 单次请求里原文最多占用的 token 数；超出的文章按句子切块，各块并行摘要后再合并成最终结果
+MAX_INPUT_TOKENS = int(os.getenv("SUMMARY_MAX_INPUT_TOKENS", "3000"))
+# SUMMARY_MODE=batch 时通过 Batch API 一次提交所有待处理文章，适合补历史数据或积压较多的日子；
+# 提交后不等待，之后的运行发现批任务已结束时再合并结果
+SUMMARY_MODE = os.getenv("SUMMARY_MODE", "realtime").lower()
+
+KEYWORDS = ["基模", "多模态", "Infra", "AI4S", "具身智能", "垂直大模型", "Agent", "能效优化"]
+keywords_str = ", ".join(f'"{k}"' for k in KEYWORDS)
+SYSTEM_PROMPT = f"你是一名专业的新闻编辑。请根据以下新闻原文，完成两项任务：\n1. **生成摘要**: 撰写一段3-5句话的中文摘要，客观、准确地概括文章的核心内容。\n2. **提取关键词**: 从以下列表中精确选择1-3个最相关的关键词：[{keywords_str}]。\n\n你的输出必须是严格的JSON格式，包含两个键：'summary'（其值为摘要字符串）和'tags'（其值为关键词字符串数组）。"
+
+CHUNK_PROMPT = "你是一名专业的新闻编辑。下面是一篇长新闻中的一段，请用中文写出这一段的要点（3-5句话），不要遗漏关键事实和数字。\n\n你的输出必须是严格的JSON格式，包含一个键：'summary'（其值为要点字符串）。"
+
+
+def summary_cache_key(content, truncated=False):
+    """超出 MAX_INPUT_TOKENS 的原文，摘要还取决于分段方式：键里加上分段提示词和每段预算，
+    批任务截断而不分段（truncated=True），另记一种，改动分段设置后不会复用旧的摘要。"""
+    chunking = None
+    if count_tokens(content, MODEL) > MAX_INPUT_TOKENS:
+        if truncated:
+            chunking = f"truncate:{MAX_INPUT_TOKENS}"
+        else:
+            chunking = f"chunk:{MAX_INPUT_TOKENS}:{hashlib.sha256(CHUNK_PROMPT.encode('utf-8')).hexdigest()}"
+    return llm_cache.make_key(text_hash.content_hash(content), SYSTEM_PROMPT, MODEL, TEMPERATURE, chunking)
+
+
+def build_messages(content):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"新闻原文：\n{content}"}
+    ]
+
+
+def build_chunk_messages(chunk, index, total):
+    return [
+        {"role": "system", "content": CHUNK_PROMPT},
+        {"role": "user", "content": f"新闻原文（第 {index}/{total} 段）：\n{chunk}"}
+    ]
+
+
+def build_reduce_messages(partials):
+    notes = "\n".join(f"{index}. {partial}" for index, partial in enumerate(partials, 1))
+    notes = truncate_to_tokens(notes, MAX_INPUT_TOKENS, MODEL)
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"新闻原文过长，以下是按原文顺序整理的各段要点：\n{notes}"}
+    ]
+
+
+def split_article(article):
+    """按 token 预算切分原文并记录 token 数；不超预算时只有一块。"""
+    content = article["content"]
+    tokens = count_tokens(content, MODEL)
+    if tokens <= MAX_INPUT_TOKENS:
+        print(f"🔢 {article['title']}: 原文 {tokens} tokens")
+        return [content]
+    chunks = split_by_tokens(content, MAX_INPUT_TOKENS, MODEL)
+    print(f"🔢 {article['title']}: 原文 {tokens} tokens，超出预算 {MAX_INPUT_TOKENS}，切分为 {len(chunks)} 段")
+    return chunks
+
+
+def parse_summary(response):
+    response_data = json.loads(response.choices[0].message.content.strip())
+    return response_data.get("summary", ""), response_data.get("tags", [])
+
 
 # 添加重试逻辑
-def call_openai_with_retry(model, messages, temperature=0.7, response_format=None):
-    """使用内置重试调用OpenAI API"""
+def call_openai_with_retry(model, messages, temperature=0.7, response_format=None, title="", kind="summary"):
+    """调用OpenAI API：429 按 Retry-After 等待，连接错误和 5xx 指数退避，每次调用的用量、耗时和重试次数记入用量日志"""
+    import openai
+
     params = {
         "model": model,
         "messages": messages,
@@ -87,97 +215,568 @@ def call_openai_with_retry(model, messages, temperature=0.7, response_format=Non
     }
     if response_format:
         params["response_format"] = response_format
-    return client.chat.completions.create(**params)
-
-# 处理所有输入文件
-articles = []
-for input_file in input_files:
-    if not os.path.exists(input_file):
-        print(f"⚠️ 输入文件不存在: {input_file}")
-        continue
-    
-    with open(input_file, 'r', encoding='utf-8') as f:
-        for line in f:
-            try:
-                data = json.loads(line)
-                if data.get("title") and data.get("content"):
-                    # 检查内容是否重复
-                    content_hash = get_content_hash(data["content"])
-                    if content_hash in content_hash_set:
-                        print(f"⏭️ 跳过重复内容: {data['title']}")
-                        continue
-                    
-                    # 如果是新内容，则添加到处理队列，同时记录哈希值
-                    articles.append(data)
-                    content_hash_set.add(content_hash)
-            except Exception as e:
-                print(f"⚠️ 解析JSON失败: {e}")
+    for attempt in range(MAX_ATTEMPTS):
+        started = time.perf_counter()
+        try:
+            with request_slots:
+                response = client.with_options(max_retries=0).chat.completions.create(**params)
+        except (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError) as e:
+            if attempt == MAX_ATTEMPTS - 1:
+                usage_log.record(model, None, time.perf_counter() - started, attempt, kind, title, ok=False)
+                raise
+            if isinstance(e, openai.RateLimitError):
+                delay = parse_duration(e.response.headers.get("retry-after")) or 5.0
+                print(f"🚦 触发限流 (429)，{delay:.1f}s 后重试")
+            else:
+                delay = min(2 ** attempt, 30)
+            time.sleep(delay)
+            continue
+        except Exception:
+            usage_log.record(model, None, time.perf_counter() - started, attempt, kind, title, ok=False)
+            raise
+        usage_log.record(model, response.usage, time.perf_counter() - started, attempt, kind, title)
+        return response
+
+
+def request_summary(messages, title="", kind="summary"):
+    response = call_openai_with_retry(
+        MODEL,
+        messages,
+        temperature=TEMPERATURE,
+        response_format={"type": "json_object"},
+        title=title,
+        kind=kind,
+    )
+    return parse_summary(response)
+
+
+def summarize_article(article):
+    """短文直接摘要；长文先并行摘要各段，再把各段要点合并成最终的 summary/tags。
 
-# 生成摘要
-print(f"开始生成摘要，共 {len(articles)} 篇，已有摘要 {len(summarized_titles)} 篇")
+    同时进行中的请求数由 request_slots 统一限制，不随文章的分段数增长。
+    """
+    title = article["title"]
+    chunks = split_article(article)
+    if len(chunks) == 1:
+        return request_summary(build_messages(chunks[0]), title)
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        partials = list(pool.map(
+            lambda item: request_summary(build_chunk_messages(item[1], item[0], len(chunks)), title, "chunk")[0],
+            enumerate(chunks, 1),
+        ))
+    return request_summary(build_reduce_messages(partials), title, "reduce")
 
-# 确保输出目录存在
-os.makedirs(os.path.dirname(output_file), exist_ok=True)
-os.makedirs(os.path.dirname(markdown_file), exist_ok=True)
 
-# 插入数据并写入 jsonl
-with open(output_file, 'a', encoding='utf-8') as out_f, \
-     open(markdown_file, 'a', encoding='utf-8') as md_f:  # 同时打开Markdown文件
+def write_summary(out_f, article, summary, tags):
+    title = article["title"]
+    url = article.get("url", "")
+    # 保存摘要到 jsonl 文件
+    # 保存原文链接和内容
+    article_data = {
+        "title": title,
+        "summary": summary,
+        "tags": tags,
+        "url": url,  # 保存原文链接
+        "original_content": ""  # 不再保存原文内容
+    }
+    line = json.dumps(article_data, ensure_ascii=False) + "\n"
+    out_f.write(line)
+    out_f.flush()
+    summarized_titles.add(title)
+    summarized_contents.add(article["content"])
+    seen_store.commit()
+    near_dup_index.commit(title)
+    mark_done(article)
+    # summarized_articles.md、当天汇总和订阅源由 daily_md_generator 通过 post_renderer.DailyOutputs 一次生成
+    run_metrics.count("articles_summarized")
+    run_metrics.count("bytes_written", len(line.encode("utf-8")))
+    print(f"✅ 成功生成并保存摘要: {title}")
+    return article_data
+
+
+def summarize_sequentially(articles, out_f, on_written=None):
+    from tqdm import tqdm
+
     for article in tqdm(articles, desc="🌐 正在生成摘要"):
         title = article["title"]
-        content = article["content"]
-        url = article.get("url", "") # 获取URL
-        
-        # 如果标题已存在，跳过
-        if title in summarized_titles:
-            print(f"⏭️ 跳过已处理的标题: {title}")
-            continue
+        key = summary_cache_key(article["content"])
+        cached = summary_cache.get(key)
+        if cached is not None:
+            print(f"♻️ 使用缓存的摘要: {title}")
+            summary, tags = cached["summary"], cached["tags"]
+        else:
+            try:
+                # 增加更多调试信息
+                print(f"正在为文章 '{title}' 调用OpenAI API生成摘要...")
+                # 调用 GPT-3.5 生成摘要（带重试）
+                summary, tags = summarize_article(article)
+                summary_cache.put(key, MODEL, {"summary": summary, "tags": tags})
+            except Exception as e:
+                print(f"\n❌ 摘要生成失败: {title}\n原因: {e}")
+                release(article, is_article_error(e))
+                continue
+        record = write_summary(out_f, article, summary, tags)
+        if on_written is not None:
+            on_written(record)
 
+
+async def call_openai_async(async_client, limiter, messages, title="", kind="summary"):
+    """经调度器限流后调用接口；429 按 Retry-After 暂停并降速，连接错误和 5xx 指数退避重试。
+
+    耗时只计最后一次请求本身，不含在调度器里排队和重试前等待的时间。
+    """
+    import openai
+
+    for attempt in range(MAX_ATTEMPTS):
+        await limiter.acquire(estimate_tokens(messages))
+        started = time.perf_counter()
         try:
-            # 增加更多调试信息
-            print(f"正在为文章 '{title}' 调用OpenAI API生成摘要...")
-            # 调用 GPT-3.5 生成摘要（带重试）
-            keywords = ["基模", "多模态", "Infra", "AI4S", "具身智能", "垂直大模型", "Agent", "能效优化"]
-            keywords_str = ", ".join(f'"{k}"' for k in keywords)
-            messages = [
-                {"role": "system", "content": f"你是一名专业的新闻编辑。请根据以下新闻原文，完成两项任务：\n1. **生成摘要**: 撰写一段3-5句话的中文摘要，客观、准确地概括文章的核心内容。\n2. **提取关键词**: 从以下列表中精确选择1-3个最相关的关键词：[{keywords_str}]。\n\n你的输出必须是严格的JSON格式，包含两个键：'summary'（其值为摘要字符串）和'tags'（其值为关键词字符串数组）。"},
-                {"role": "user", "content": f"新闻原文：\n{content}"}
-            ]
-            response = call_openai_with_retry(
-                "gpt-3.5-turbo", 
-                messages, 
-                temperature=0.5,
-                response_format={"type": "json_object"}
-            )
-
-            response_data = json.loads(response.choices[0].message.content.strip())
-            summary = response_data.get("summary", "")
-            tags = response_data.get("tags", [])
-
-
-            # 保存摘要到 jsonl 文件
-            # 保存原文链接和内容
-            article_data = {
-                "title": title, 
-                "summary": summary,
-                "tags": tags,
-                "url": url,  # 保存原文链接
-                "original_content": ""  # 不再保存原文内容
+            # 所有文章（包括长文的各段）共用同一组请求槽位，重试前的等待不占槽位
+            async with limiter.slots:
+                started = time.perf_counter()
+                raw = await async_client.chat.completions.with_raw_response.create(
+                    model=MODEL,
+                    messages=messages,
+                    temperature=TEMPERATURE,
+                    response_format={"type": "json_object"},
+                )
+        except openai.RateLimitError as e:
+            retry_after = parse_duration(e.response.headers.get("retry-after"))
+            print(f"🚦 触发限流 (429)，{retry_after or 5.0:.1f}s 后重试")
+            limiter.on_rate_limited(retry_after)
+            continue
+        except (openai.APIConnectionError, openai.InternalServerError) as e:
+            if attempt == MAX_ATTEMPTS - 1:
+                usage_log.record(MODEL, None, time.perf_counter() - started, attempt, kind, title, ok=False)
+                raise
+            await asyncio.sleep(min(2 ** attempt, 30))
+            continue
+        except Exception:
+            usage_log.record(MODEL, None, time.perf_counter() - started, attempt, kind, title, ok=False)
+            raise
+        limiter.on_success(raw.headers)
+        response = raw.parse()
+        usage_log.record(MODEL, response.usage, time.perf_counter() - started, attempt, kind, title)
+        return response
+    usage_log.record(MODEL, None, None, MAX_ATTEMPTS - 1, kind, title, ok=False)
+    raise RuntimeError(f"重试 {MAX_ATTEMPTS} 次后仍被限流")
+
+
+async def summarize_article_async(async_client, limiter, article):
+    title = article["title"]
+    chunks = split_article(article)
+    if len(chunks) == 1:
+        return parse_summary(await call_openai_async(async_client, limiter, build_messages(chunks[0]), title))
+    responses = await asyncio.gather(*(
+        call_openai_async(async_client, limiter, build_chunk_messages(chunk, index, len(chunks)), title, "chunk")
+        for index, chunk in enumerate(chunks, 1)
+    ))
+    partials = [parse_summary(response)[0] for response in responses]
+    return parse_summary(await call_openai_async(async_client, limiter, build_reduce_messages(partials), title, "reduce"))
+
+
+def iter_taker(articles):
+    """把同步或异步的文章来源包装成 await take() 的形式，取完返回 None。"""
+    if hasattr(articles, "__aiter__"):
+        iterator = articles.__aiter__()
+        # 多个协程不能同时推进同一个异步生成器
+        lock = asyncio.Lock()
+
+        async def take():
+            async with lock:
+                try:
+                    return await iterator.__anext__()
+                except StopAsyncIteration:
+                    return None
+    else:
+        iterator = iter(articles)
+
+        async def take():
+            # 同步生成器在事件循环线程里推进，不会被多个协程同时进入
+            return next(iterator, None)
+    return take
+
+
+async def summarize_concurrently(articles, out_f, concurrency=CONCURRENCY, on_written=None):
+    """固定数量的协程并发调用接口；文章从迭代器（或异步迭代器）按需读取，完成顺序不定，但结果按读取顺序写入 jsonl 和 Markdown。
+
+    on_written(record) 在每条摘要写入后调用，流水线模式下用它把结果继续交给下游。
+    """
+    from openai import AsyncOpenAI
+    from tqdm import tqdm
+
+    async_client = AsyncOpenAI(
+        api_key=OPENAI_API_KEY,
+        base_url=OPENAI_API_BASE,
+        timeout=60.0,
+        max_retries=0,  # 重试和限流由调度器统一处理
+    )
+    limiter = RateLimiter(RPM_LIMIT, TPM_LIMIT, concurrency)
+    take = iter_taker(articles)
+    taken_count = 0
+    # 已取出的文章：index -> article；已完成但还不能写出的结果：index -> (summary, tags)，失败为 None
+    taken = {}
+    finished = {}
+    next_index = 0
+    progress = tqdm(desc="🌐 正在生成摘要")
+
+    def flush_in_order():
+        nonlocal next_index
+        while next_index in finished:
+            result = finished.pop(next_index)
+            article = taken.pop(next_index)
+            if result is not None:
+                record = write_summary(out_f, article, *result)
+                if on_written is not None:
+                    on_written(record)
+            next_index += 1
+
+    async def worker():
+        while True:
+            nonlocal taken_count
+            article = await take()
+            if article is None:
+                return
+            index = taken_count
+            taken_count += 1
+            taken[index] = article
+            key = summary_cache_key(article["content"])
+            cached = summary_cache.get(key)
+            try:
+                if cached is not None:
+                    finished[index] = (cached["summary"], cached["tags"])
+                else:
+                    finished[index] = await summarize_article_async(async_client, limiter, article)
+                    summary_cache.put(key, MODEL, {"summary": finished[index][0], "tags": finished[index][1]})
+            except Exception as e:
+                print(f"\n❌ 摘要生成失败: {article['title']}\n原因: {e}")
+                release(article, is_article_error(e))
+                finished[index] = None
+            progress.update(1)
+            flush_in_order()
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finally:
+        progress.close()
+        await async_client.close()
+    print(f"⏱️ 并发 {concurrency} 生成 {progress.n} 篇摘要，耗时 {time.perf_counter() - started:.2f}s，"
+          f"触发限流 {limiter.throttled} 次")
+
+
+def load_batch_state():
+    if not os.path.exists(batch_state_file):
+        return None
+    with open(batch_state_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_batch_state(state):
+    # 先写临时文件再替换，避免中断时留下半个 JSON
+    tmp_file = batch_state_file + ".tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_file, batch_state_file)
+
+
+def submit_batch(articles, out_f):
+    """缓存命中的文章直接写出，其余写成批任务 JSONL 上传并创建 batch，返回新的状态。"""
+    requests = {}
+    batch_input_file = os.path.join(base_dir, f"summary_batch_{time.strftime('%Y%m%d_%H%M%S')}.jsonl")
+    with open(batch_input_file, 'w', encoding='utf-8') as f:
+        for index, article in enumerate(articles):
+            cached = summary_cache.get(summary_cache_key(article["content"], truncated=True))
+            if cached is not None:
+                print(f"♻️ 使用缓存的摘要: {article['title']}")
+                write_summary(out_f, article, cached["summary"], cached["tags"])
+                continue
+            # 批任务没法分段后再合并，超出预算的原文直接截断
+            content = truncate_to_tokens(article["content"], MAX_INPUT_TOKENS, MODEL)
+            if content != article["content"]:
+                print(f"✂️ 原文超出 {MAX_INPUT_TOKENS} tokens，批任务中截断: {article['title']}")
+            custom_id = f"{index}-{text_hash.content_hash(article['content'])}"
+            requests[custom_id] = {
+                "title": article["title"],
+                "url": article.get("url", ""),
+                "content": article["content"],
+                "_source": article.get("_source"),  # 合并后据此推进输入文件断点
             }
-            out_f.write(json.dumps(article_data, ensure_ascii=False) + "\n")
-            out_f.flush()
-            summarized_titles.add(title)
-            # 写入Markdown
-            md_f.write(f"## {title}\n\n")
-            if url:
-                md_f.write(f"**原文链接：** [{url}]({url})\n\n")
-            if tags:
-                md_f.write(f"**标签：** {', '.join(tags)}\n\n")
-            md_f.write(f"**摘要：**\n\n{summary}\n\n")
-            md_f.write("---\n\n")
-            md_f.flush()
-
-            print(f"✅ 成功生成并保存摘要: {title}")
+            f.write(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": MODEL,
+                    "messages": build_messages(content),
+                    "temperature": TEMPERATURE,
+                    "response_format": {"type": "json_object"},
+                },
+            }, ensure_ascii=False) + "\n")
+    if not requests:
+        os.remove(batch_input_file)
+        return None
+
+    with open(batch_input_file, 'rb') as f:
+        input_file = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    print(f"📦 已提交批任务 {batch.id}，共 {len(requests)} 篇，输入文件: {batch_input_file}")
+    state = {
+        "batch_id": batch.id,
+        "input_file": batch_input_file,
+        "submitted_at": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "requests": requests,  # custom_id -> 文章，按提交顺序
+        "merged": [],
+    }
+    save_batch_state(state)
+    return state
+
+
+def check_batch(batch_id):
+    """查询一次批任务状态；已结束（completed/failed/expired/cancelled）时返回 batch，否则返回 None。"""
+    batch = client.batches.retrieve(batch_id)
+    counts = batch.request_counts
+    if counts:
+        print(f"⏳ 批任务 {batch_id} 状态: {batch.status}，完成 {counts.completed}/{counts.total}，失败 {counts.failed}")
+    else:
+        print(f"⏳ 批任务 {batch_id} 状态: {batch.status}")
+    if batch.status in ("completed", "failed", "expired", "cancelled"):
+        return batch
+    return None
+
 
+def read_batch_file(file_id):
+    if not file_id:
+        return []
+    text = client.files.content(file_id).text
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def merge_batch_results(state, batch, out_f):
+    """按提交顺序把批任务结果写入 jsonl 和 Markdown；已合并或已有摘要的条目跳过，可重复执行。"""
+    results = {}
+    rejected = set()  # 请求被拒或结果无法解析，计入文章的失败次数
+    for item in read_batch_file(batch.output_file_id):
+        response = item.get("response") or {}
+        if response.get("status_code") != 200:
+            if response.get("status_code") in ARTICLE_ERROR_STATUS:
+                rejected.add(item.get("custom_id"))
+            continue
+        try:
+            content = response["body"]["choices"][0]["message"]["content"]
+            data = json.loads(content.strip())
+            results[item["custom_id"]] = (data.get("summary", ""), data.get("tags", []), response["body"])
         except Exception as e:
-            print(f"\n❌ 摘要生成失败: {title}\n原因: {e}")
\ No newline at end of file
+            rejected.add(item.get("custom_id"))
+            print(f"⚠️ 解析批任务结果失败: {item.get('custom_id')} ({e})")
+    for item in read_batch_file(batch.error_file_id):
+        print(f"❌ 批任务请求失败: {item.get('custom_id')} ({item.get('error')})")
+
+    merged = set(state["merged"])
+    failed = 0
+    for custom_id, article in state["requests"].items():
+        if custom_id in merged:
+            continue
+        if custom_id not in results:
+            failed += 1
+            release(article, custom_id in rejected)
+            continue
+        summary, tags, body = results[custom_id]
+        # 只在首次合并时记录用量，重跑合并不会重复计入
+        usage_log.record(body.get("model", MODEL), body.get("usage"), None, 0, "batch", article["title"])
+        summary_cache.put(summary_cache_key(article["content"], truncated=True), MODEL, {"summary": summary, "tags": tags})
+        # 写入后、保存状态前中断的话，重跑时靠已有标题去重，不会重复写入
+        if article["title"] not in summarized_titles:
+            write_summary(out_f, article, summary, tags)
+        state["merged"].append(custom_id)
+        save_batch_state(state)
+    print(f"📥 批任务合并完成: 成功 {len(state['merged'])} 篇，失败 {failed} 篇（失败的文章下次运行会重新排队）")
+
+
+def summarize_in_batch(articles, out_f):
+    """提交批任务后立即返回，不在每日流水线里等待（批任务最长要 24 小时）。
+
+    之后的运行先查询上次提交的 batch：还没结束就直接返回，新文章留在输入文件断点之后；
+    已结束则合并结果，再把断点之后的文章（包括失败待重试的）作为新的批任务提交。
+    """
+    state = load_batch_state()
+    if state is not None:
+        print(f"🔁 检查上次提交的批任务 {state['batch_id']}（提交于 {state['submitted_at']}）")
+        batch = check_batch(state["batch_id"])
+        if batch is None:
+            print("⏸️ 批任务仍在处理中，下次运行再合并结果")
+            return
+        if batch.status != "completed":
+            print(f"❌ 批任务 {batch.id} 结束状态为 {batch.status}，未完成的文章会重新提交")
+        merge_batch_results(state, batch, out_f)
+        os.remove(batch_state_file)
+        if os.path.exists(state["input_file"]):
+            os.remove(state["input_file"])
+    if submit_batch(articles, out_f) is not None:
+        print("⏸️ 批任务已提交，结果在之后的运行中合并")
+
+
+# 输入文件的读取断点保存在已见索引库里：每次只读断点之后新增的行，不再把全部历史读进内存。
+# 断点只推进到最早一篇还没写出摘要的文章之前，失败的文章下次运行会被重新读到
+input_progress = {}
+queued_titles = set()
+
+
+def admit(data):
+    """判断一篇抓取到的文章是否需要摘要；需要时登记标题、内容哈希和近似重复签名。"""
+    if not (data.get("title") and data.get("content")):
+        return False
+    # 如果标题已存在，跳过
+    if data["title"] in summarized_titles or data["title"] in queued_titles:
+        return False
+    if seen_store.failures("summary", data["content"]) >= MAX_ARTICLE_FAILURES:
+        print(f"☠️ 跳过多次失败的文章: {data['title']}")
+        return False
+    # 检查内容是否重复
+    content_hash = text_hash.content_hash(data["content"])
+    if content_hash in content_hash_set or data["content"] in summarized_contents:
+        print(f"⏭️ 跳过重复内容: {data['title']}")
+        run_metrics.count("articles_deduped")
+        return False
+
+    # 与已入库或正在摘要的文章近似重复时跳过；同标题的记录是同一篇文章，不算重复
+    signature = near_dup.signature(data["content"])
+    match = near_dup_index.query(signature, exclude_label=data["title"])
+    if match is not None:
+        print(f"🪞 跳过近似重复: {data['title']}（与《{match[0]}》相似度 {match[1]:.2f}）")
+        near_dup_index.skipped += 1
+        run_metrics.count("articles_deduped")
+        return False
+    near_dup_index.reserve(data["title"], signature)
+
+    # 如果是新内容，则交给摘要流程，同时记录哈希值
+    content_hash_set.add(content_hash)
+    queued_titles.add(data["title"])
+    return True
+
+
+def is_article_error(error):
+    """失败是否出在文章本身：请求被拒（400/422）或返回的内容无法解析。
+
+    限流、网络、5xx、鉴权等问题与文章无关，接口恢复后就能成功，不计入文章的失败次数。
+    """
+    import openai
+
+    return isinstance(error, (openai.BadRequestError, openai.UnprocessableEntityError, ValueError, KeyError, TypeError))
+
+
+def release(article, article_error=False):
+    """摘要失败后撤销 admit() 的登记，同一次运行里的补齐阶段（或下次运行）会重新接纳这篇文章。
+
+    流水线里从队列来的文章没有经过输入文件断点；不撤销的话补齐阶段会把它当作已排队而跳过，
+    它也就不会进入 pending，断点随之越过它，这篇文章再也不会被重试。
+    因文章本身失败时累计失败次数，达到 MAX_ARTICLE_FAILURES 后放弃它，断点不再停在这里。
+    """
+    queued_titles.discard(article["title"])
+    content_hash_set.discard(text_hash.content_hash(article["content"]))
+    near_dup_index.release(article["title"])
+    if not article_error:
+        return
+    failures = seen_store.record_failure("summary", article["content"])
+    if failures >= MAX_ARTICLE_FAILURES:
+        print(f"☠️ 《{article['title']}》已因自身原因失败 {failures} 次，不再重试")
+        mark_done(article)
+
+
+def iter_summarized_inputs():
+    """输入文件中已经写出摘要的文章 (标题, 原文)，用于给近似重复索引补录历史文章。"""
+    for input_file in input_files:
+        if not os.path.exists(input_file):
+            continue
+        for data, _, _ in iter_jsonl(input_file, 0):
+            if data and data.get("title") and data.get("content") and data["title"] in summarized_titles:
+                yield data["title"], data["content"]
+
+
+def iter_new_articles():
+    for input_file in input_files:
+        if not os.path.exists(input_file):
+            print(f"⚠️ 输入文件不存在: {input_file}")
+            continue
+        offset = seen_store.checkpoint(f"summary_input:{os.path.basename(input_file)}", input_file)
+        progress = input_progress[input_file] = {"start": offset, "read_to": offset, "pending": set(), "queued": 0}
+        for data, line_start, line_end in iter_jsonl(input_file, offset):
+            progress["read_to"] = line_end
+            if data is None:
+                print(f"⚠️ 解析JSON失败: {os.path.basename(input_file)} 第 {line_start} 字节处")
+                continue
+            if not admit(data):
+                continue
+            data["_source"] = (input_file, line_start)
+            progress["pending"].add(line_start)
+            progress["queued"] += 1
+            yield data
+
+
+def mark_done(article):
+    source = article.get("_source")
+    if source and source[0] in input_progress:
+        input_progress[source[0]]["pending"].discard(source[1])
+
+
+def save_input_checkpoints():
+    for input_file, progress in input_progress.items():
+        offset = min(progress["pending"]) if progress["pending"] else progress["read_to"]
+        seen_store.save_checkpoint(f"summary_input:{os.path.basename(input_file)}", input_file, offset)
+        print(f"📍 {os.path.basename(input_file)}: 读取 {progress['read_to'] - progress['start']} 字节新数据，"
+              f"排队 {progress['queued']} 篇，未完成 {len(progress['pending'])} 篇，断点 {offset}")
+
+
+def open_output():
+    # 确保输出目录存在
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    return open(output_file, 'a', encoding='utf-8')
+
+
+def summarize_pending(on_written=None):
+    """读取输入文件断点之后的新文章并生成摘要（按 SUMMARY_MODE 选择批任务、并发或逐篇模式）。"""
+    articles = iter_new_articles()
+    # 摘要写入 jsonl，文章、汇总和订阅源由 daily_md_generator 生成
+    with open_output() as out_f:
+        if SUMMARY_MODE == "batch":
+            summarize_in_batch(articles, out_f)
+        elif CONCURRENCY > 1:
+            asyncio.run(summarize_concurrently(articles, out_f, on_written=on_written))
+        else:
+            summarize_sequentially(articles, out_f, on_written)
+
+
+async def iter_queue_articles(queue):
+    while True:
+        data = await queue.get()
+        if data is None:
+            return
+        if admit(data):
+            yield data
+
+
+async def summarize_queue(queue, on_written=None):
+    """流水线模式：从 asyncio 队列读取爬虫刚写出的文章（None 表示结束），过滤后立即并发生成摘要。
+
+    这些文章不经过输入文件断点，结束后再调用 summarize_pending() 补齐断点和遗漏的文章。
+    """
+    with open_output() as out_f:
+        await summarize_concurrently(iter_queue_articles(queue), out_f, on_written=on_written)
+
+
+def main():
+    setup()
+    try:
+        # 生成摘要
+        print(f"开始生成摘要，已有摘要 {len(summarized_titles)} 篇")
+        summarize_pending()
+    finally:
+        teardown()
+
+
+if __name__ == "__main__":
+    main()
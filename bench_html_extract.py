@@ -0,0 +1,125 @@
+"""对比 html_extract.extract_text（lxml）与原 BeautifulSoup 实现的吞吐量和峰值内存。
+
+用法: python bench_html_extract.py [语料目录] [--rounds N]
+
+语料为目录下的 *.html 文件（保存的文章接口 content）。设置 JIQIZHIXIN_HTML_CORPUS_DIR 后运行
+AI_jiqizhixin.py 或每日流水线会把抓到的文章 HTML 存入该目录。每个实现在独立子进程中运行，峰值 RSS 互不干扰。
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import subprocess
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows 上没有 resource，只报告 tracemalloc 峰值
+    resource = None
+
+import html_extract
+
+ENGINES = {
+    "lxml": html_extract.extract_text,
+    "bs4": html_extract.extract_text_bs4,
+}
+DEFAULT_CORPUS = os.path.join(os.getenv('HUGO_PROJECT_PATH', '.'), 'spiders', 'ai_news', 'html_corpus')
+
+
+def load_corpus(corpus_dir):
+    docs = []
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            docs.append(f.read())
+    return docs
+
+
+def max_rss_kb():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_engine(engine, corpus_dir, rounds):
+    """在当前进程中测量单个实现，结果以 JSON 打印到标准输出。"""
+    extract = ENGINES[engine]
+    docs = load_corpus(corpus_dir)
+    total_bytes = sum(len(doc.encode("utf-8")) for doc in docs)
+    extract(docs[0])  # 预热，让导入和首次初始化不计入耗时
+    rss_before = max_rss_kb()
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for doc in docs:
+            extract(doc)
+    seconds = time.perf_counter() - started
+
+    # 单独跑一轮统计 Python 堆峰值，避免 tracemalloc 的开销影响计时
+    tracemalloc.start()
+    for doc in docs:
+        extract(doc)
+    _, heap_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rss_after = max_rss_kb()
+    print(json.dumps({
+        "engine": engine,
+        "docs": len(docs) * rounds,
+        "seconds": seconds,
+        "docs_per_second": len(docs) * rounds / seconds,
+        "mb_per_second": total_bytes * rounds / seconds / 1024 / 1024,
+        "heap_peak_kb": heap_peak / 1024,
+        "rss_growth_kb": None if rss_before is None else rss_after - rss_before,
+        "peak_rss_kb": rss_after,
+    }))
+
+
+def check_equivalence(docs):
+    mismatches = [i for i, doc in enumerate(docs) if ENGINES["lxml"](doc) != ENGINES["bs4"](doc)]
+    if mismatches:
+        print(f"⚠️ {len(mismatches)} 篇文档两种实现的输出不一致，例如第 {mismatches[0]} 篇")
+    else:
+        print(f"✅ {len(docs)} 篇文档两种实现的输出完全一致")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML 正文提取基准测试")
+    parser.add_argument("corpus", nargs="?", default=DEFAULT_CORPUS)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--engine", choices=sorted(ENGINES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.engine:
+        run_engine(args.engine, args.corpus, args.rounds)
+        return
+
+    docs = load_corpus(args.corpus)
+    if not docs:
+        print(f"❌ 语料目录中没有 .html 文件: {args.corpus}")
+        sys.exit(1)
+    total_kb = sum(len(doc.encode("utf-8")) for doc in docs) / 1024
+    print(f"📚 语料: {len(docs)} 篇，共 {total_kb:.1f} KB，每个实现运行 {args.rounds} 轮")
+    check_equivalence(docs)
+
+    results = {}
+    for engine in ENGINES:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), args.corpus, "--rounds", str(args.rounds), "--engine", engine],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results[engine] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"\n{'实现':<6}{'篇/秒':>10}{'MB/秒':>10}{'堆峰值KB':>12}{'RSS增长KB':>12}{'峰值RSS KB':>12}")
+    for engine, r in results.items():
+        rss_growth = "-" if r["rss_growth_kb"] is None else f"{r['rss_growth_kb']}"
+        peak_rss = "-" if r["peak_rss_kb"] is None else f"{r['peak_rss_kb']}"
+        print(f"{engine:<6}{r['docs_per_second']:>10.1f}{r['mb_per_second']:>10.2f}"
+              f"{r['heap_peak_kb']:>12.1f}{rss_growth:>12}{peak_rss:>12}")
+    speedup = results["lxml"]["docs_per_second"] / results["bs4"]["docs_per_second"]
+    print(f"\n⚡ lxml 吞吐量是 BeautifulSoup 的 {speedup:.1f} 倍")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""对比两种文章输出模式：bundle（每篇一个 NN_slug/index.md）和 adapter（每天一个 data/posts/*.json + 内容适配器）。
+
+用法: python bench_hugo_modes.py [--days 30] [--posts 20] [--rounds 3] [--keep]
+
+在临时目录里各建一个最小的 Hugo 站点，用 daily_md_generator 的写入逻辑按天生成合成文章，统计：
+  - 每天新建或改动的文件数（即 git 每天要 stat 和提交的文件），以及内容目录里的文件总数；
+  - Hugo 完整构建耗时（取多轮最小值）和生成的页面数。本机没有 hugo 时只报告文件数。
+两种模式的文章清单（.post_manifest.sqlite3）相同，不计入文件数。
+"""
+import io
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+import daily_md_generator
+
+MODES = ("bundle", "adapter")
+HUGO_CONFIG = 'baseURL = "http://example.org/"\ntitle = "bench"\ndisableKinds = ["RSS", "sitemap"]\n'
+LAYOUTS = {
+    "single.html": "<h1>{{ .Title }}</h1>{{ .Content }}<a href=\"{{ .Params.link }}\">原文</a>",
+    "list.html": "<h1>{{ .Title }}</h1>{{ range .Pages }}<a href=\"{{ .RelPermalink }}\">{{ .Title }}</a>{{ end }}",
+}
+
+
+def snapshot(site):
+    files = {}
+    for top in ("content", "data"):
+        for dirpath, _, names in os.walk(os.path.join(site, top)):
+            for name in names:
+                if name.startswith(".post_manifest"):
+                    continue
+                path = os.path.join(dirpath, name)
+                stat = os.stat(path)
+                files[path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def make_site(root, mode):
+    site = os.path.join(root, mode)
+    os.makedirs(os.path.join(site, "layouts", "_default"))
+    with open(os.path.join(site, "hugo.toml"), "w", encoding="utf-8") as f:
+        f.write(HUGO_CONFIG)
+    for name, text in LAYOUTS.items():
+        with open(os.path.join(site, "layouts", "_default", name), "w", encoding="utf-8") as f:
+            f.write(text)
+    return site
+
+
+def generate(site, mode, days, posts_per_day):
+    """按天写入合成文章，返回每天改动的文件数列表。"""
+    daily_md_generator.POST_OUTPUT_MODE = mode
+    daily_md_generator.hugo_project_path = site
+    daily_md_generator.target_root = os.path.join(site, "content", "post")
+    daily_md_generator.data_root = os.path.join(site, "data", "posts")
+    os.makedirs(daily_md_generator.target_root, exist_ok=True)
+    if mode == "adapter":
+        daily_md_generator.install_content_adapter()
+
+    touched = []
+    today = datetime.now(daily_md_generator.TARGET_TIMEZONE)
+    for offset in range(days - 1, -1, -1):
+        day = (today - timedelta(days=offset)).strftime('%Y_%m_%d')
+        before = snapshot(site)
+        with redirect_stdout(io.StringIO()):
+            state = daily_md_generator.open_today_posts(day)
+            for i in range(posts_per_day):
+                daily_md_generator.write_post(state, {
+                    "title": f"Synthetic story {day} #{i}: \"quotes\" and 'apostrophes'",
+                    "summary": f"第 {i} 条合成摘要，日期 {day}。" * 8,
+                    "tags": ["AI", "Bench"],
+                    "url": f"https://example.org/{day}/{i}",
+                }, i)
+            state["manifest"].close()
+        after = snapshot(site)
+        touched.append(sum(1 for path, meta in after.items() if before.get(path) != meta))
+    return touched
+
+
+def build(site, rounds):
+    """运行 hugo 完整构建，返回 (最短耗时, 生成的 HTML 页面数)；没有 hugo 时返回 (None, None)。"""
+    if shutil.which("hugo") is None:
+        return None, None
+    public = os.path.join(site, "public")
+    best = None
+    for _ in range(rounds):
+        shutil.rmtree(public, ignore_errors=True)
+        started = time.perf_counter()
+        result = subprocess.run(["hugo", "--quiet", "--destination", public], cwd=site, capture_output=True, text=True)
+        seconds = time.perf_counter() - started
+        if result.returncode != 0:
+            print(f"❌ hugo 构建失败（{site}）:\n{result.stderr.strip()}")
+            return None, None
+        best = seconds if best is None else min(best, seconds)
+    pages = sum(1 for _, _, names in os.walk(public) for name in names if name.endswith(".html"))
+    return best, pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hugo 输出模式基准测试")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--posts", type=int, default=20, help="每天的文章数")
+    parser.add_argument("--rounds", type=int, default=3, help="hugo 构建轮数")
+    parser.add_argument("--keep", action="store_true", help="保留临时站点目录")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="hugo-modes-")
+    print(f"🏗️ 生成 {args.days} 天 × {args.posts} 篇文章，站点目录: {root}")
+    if shutil.which("hugo") is None:
+        print("⚠️ 未找到 hugo，只比较文件数")
+
+    results = {}
+    try:
+        for mode in MODES:
+            site = make_site(root, mode)
+            started = time.perf_counter()
+            touched = generate(site, mode, args.days, args.posts)
+            write_seconds = time.perf_counter() - started
+            total_files = len(snapshot(site))
+            build_seconds, pages = build(site, args.rounds)
+            results[mode] = (touched, total_files, write_seconds, build_seconds, pages)
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    print(f"\n{'模式':<9}{'每天改动文件':>12}{'文件总数':>10}{'写入耗时s':>11}{'构建耗时s':>11}{'页面数':>8}")
+    for mode, (touched, total_files, write_seconds, build_seconds, pages) in results.items():
+        per_day = sum(touched) / len(touched)
+        build_text = "-" if build_seconds is None else f"{build_seconds:.2f}"
+        pages_text = "-" if pages is None else str(pages)
+        print(f"{mode:<9}{per_day:>14.1f}{total_files:>12}{write_seconds:>13.2f}{build_text:>13}{pages_text:>10}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
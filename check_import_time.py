@@ -0,0 +1,114 @@
+"""检查各阶段模块的导入开销，防止每日流程的启动时间悄悄变长。
+
+对每个模块在干净的临时目录里单独执行 `python -X importtime -c "import 模块"`，要求：
+  - 导入时不打印任何内容、不创建任何文件（路径检测、建目录、打开索引都应放在入口函数里）；
+  - 不导入 openai、playwright、bs4 等重依赖（应在用到的函数里再导入）；
+  - 模块自身的累计导入耗时不超过预算（IMPORT_BUDGET_MS，默认 200ms，取多次运行的最小值以减少抖动）。
+
+用法:
+    python check_import_time.py            # 检查全部阶段模块
+    python check_import_time.py AI_summary # 只检查指定模块
+任一检查失败时以非零状态退出。CI 中由 tests/test_import_time.py 在 push/PR 时运行（.github/workflows/tests.yml），
+不放在每日抓取任务里，机器偶尔变慢不会耽误当天的发布。
+"""
+import os
+import re
+import sys
+import tempfile
+import subprocess
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+STAGE_MODULES = [
+    'run_all_daily',
+    'pipeline',
+    'news_sources',
+    'AI_MITNews',
+    'AI_jiqizhixin',
+    'AI_summary',
+    'daily_md_generator',
+    'auto_push_github',
+]
+HEAVY_MODULES = {'openai', 'playwright', 'bs4', 'tqdm', 'httpx', 'lxml', 'tiktoken', 'dotenv'}
+BUDGET_MS = float(os.getenv('IMPORT_BUDGET_MS', '200'))
+RUNS = int(os.getenv('IMPORT_CHECK_RUNS', '3'))
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def list_files(root):
+    return {os.path.relpath(os.path.join(dirpath, name), root)
+            for dirpath, _, names in os.walk(root) for name in names}
+
+
+def import_once(module):
+    """在空的临时目录里导入一次模块，返回 (累计耗时 ms, 导入的重依赖, 标准输出, 新建的文件)。"""
+    with tempfile.TemporaryDirectory(prefix="import-check-") as workdir:
+        env = os.environ.copy()
+        env['PYTHONPATH'] = current_dir
+        env['PYTHONDONTWRITEBYTECODE'] = '1'
+        env['HUGO_PROJECT_PATH'] = os.path.join(workdir, 'hugo')
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=workdir,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        cumulative_us = None
+        heavy = set()
+        for line in result.stderr.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if not match:
+                continue
+            name = match.group(4)
+            if name.split('.')[0] in HEAVY_MODULES:
+                heavy.add(name.split('.')[0])
+            if name == module and not match.group(3):
+                cumulative_us = int(match.group(2))
+        return (cumulative_us or 0) / 1000, heavy, result.stdout.strip(), list_files(workdir)
+
+
+def check_module(module):
+    problems = []
+    timings = []
+    for _ in range(RUNS):
+        try:
+            ms, heavy, stdout, created = import_once(module)
+        except RuntimeError as e:
+            return None, [f"导入失败: {e}"]
+        timings.append(ms)
+    best = min(timings)
+    if stdout:
+        problems.append(f"导入时有输出: {stdout.splitlines()[0]}")
+    if created:
+        problems.append(f"导入时创建了文件: {', '.join(sorted(created)[:3])}")
+    if heavy:
+        problems.append(f"导入了重依赖: {', '.join(sorted(heavy))}")
+    if best > BUDGET_MS:
+        problems.append(f"导入耗时 {best:.1f}ms 超出预算 {BUDGET_MS:.0f}ms")
+    return best, problems
+
+
+def main():
+    modules = sys.argv[1:] or STAGE_MODULES
+    failed = False
+    print(f"⏱️ 检查 {len(modules)} 个模块的导入开销（预算 {BUDGET_MS:.0f}ms，每个模块运行 {RUNS} 次取最小值）")
+    for module in modules:
+        best, problems = check_module(module)
+        timing = f"{best:7.1f}ms" if best is not None else "      -  "
+        if problems:
+            failed = True
+            print(f"❌ {module:<20} {timing}")
+            for problem in problems:
+                print(f"     - {problem}")
+        else:
+            print(f"✅ {module:<20} {timing}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,5 @@
 import os
 import json
-import hashlib
 import shutil
 from datetime import datetime, timedelta
 import glob
@@ -8,28 +7,83 @@ import re
 import sys
 import pytz
 
-# --- 环境自适应的智能路径配置 ---
+import run_metrics
+import post_renderer
+import text_hash
+from post_manifest import PostManifest
+from seen_store import iter_jsonl
+
+# 导入本模块不做任何事：路径检测和目录创建都在 setup() 里完成，入口为 main()
 hugo_project_path = ''
-# 首先检查是否在 GitHub Actions 环境中
-if os.environ.get('GITHUB_ACTIONS') == 'true':
-    print("🤖 在 GitHub Actions 中运行, 将使用环境变量。")
-    hugo_project_path = os.getenv('HUGO_PROJECT_PATH')
-    if not hugo_project_path:
-        print("❌ 错误: 在 GitHub Actions 环境中, 环境变量 HUGO_PROJECT_PATH 未设置。")
-        sys.exit(1)
-else:
-    # 如果不在云端，则假定为本地环境，自动计算路径
-    print("💻 在本地运行, 将自动检测项目路径。")
-    # __file__ 是脚本自身的绝对路径
-    # os.path.dirname(__file__) 是脚本所在的目录 (e.g., /path/to/project/blogdata)
-    # os.path.dirname(...) 再一次，就是项目的根目录 (e.g., /path/to/project)
-    hugo_project_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-print(f"✅ 使用 Hugo 项目路径: {hugo_project_path}")
+target_root = ''
+data_root = ''
 
 TARGET_TIMEZONE = pytz.timezone("Asia/Shanghai")
-print(f"🕒 使用目标时区: {TARGET_TIMEZONE}")
-# --- 路径配置结束 ---
+# bundle: 每篇文章一个 content/post/YYYY_MM_DD/NN_slug/index.md；
+# adapter: 每天一个 data/posts/YYYY_MM_DD.json，由 content/post/_content.gotmpl（Hugo 内容适配器，需 Hugo 0.126+）生成页面
+POST_OUTPUT_MODE = os.getenv('POST_OUTPUT_MODE', 'bundle')
+ADAPTER_TEMPLATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'content_adapter.gotmpl')
+# 处理摘要文件时每隔多少条保存一次断点
+CHECKPOINT_EVERY = 200
+# 去重回看的天数，0 表示全部历史文章（由文章清单的布隆过滤器兜底，每篇文章的去重开销不随历史增长）
+POST_DEDUP_DAYS = int(os.getenv('POST_DEDUP_DAYS', '0'))
+
+
+def detect_hugo_project_path():
+    # --- 环境自适应的智能路径配置 ---
+    # 首先检查是否在 GitHub Actions 环境中
+    if os.environ.get('GITHUB_ACTIONS') == 'true':
+        print("🤖 在 GitHub Actions 中运行, 将使用环境变量。")
+        path = os.getenv('HUGO_PROJECT_PATH')
+        if not path:
+            print("❌ 错误: 在 GitHub Actions 环境中, 环境变量 HUGO_PROJECT_PATH 未设置。")
+            sys.exit(1)
+    else:
+        # 如果不在云端，则假定为本地环境，自动计算路径
+        print("💻 在本地运行, 将自动检测项目路径。")
+        # __file__ 是脚本自身的绝对路径
+        # os.path.dirname(__file__) 是脚本所在的目录 (e.g., /path/to/project/blogdata)
+        # os.path.dirname(...) 再一次，就是项目的根目录 (e.g., /path/to/project)
+        path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    print(f"✅ 使用 Hugo 项目路径: {path}")
+    return path
+
+
+def setup():
+    global hugo_project_path, target_root, data_root
+    hugo_project_path = detect_hugo_project_path()
+    print(f"🕒 使用目标时区: {TARGET_TIMEZONE}")
+    # --- 路径配置结束 ---
+
+    # 目标根目录
+    # 例如：C:\Users\kongg\0\content\post
+    # 可根据实际情况调整
+    # 这里假设与原逻辑一致
+    # 你可以根据实际Hugo路径修改 target_root
+    target_root = os.path.join(hugo_project_path, 'content', 'post')
+
+    # 确保目标目录存在
+    os.makedirs(target_root, exist_ok=True)
+    print(f"确保目标目录存在: {target_root}")
+
+    data_root = os.path.join(hugo_project_path, 'data', 'posts')
+    if POST_OUTPUT_MODE == 'adapter':
+        install_content_adapter()
+
+
+def install_content_adapter():
+    """把内容适配器模板复制到 content/post/_content.gotmpl（内容相同时不动，避免无谓的改动）。"""
+    os.makedirs(data_root, exist_ok=True)
+    with open(ADAPTER_TEMPLATE, 'r', encoding='utf-8') as f:
+        template = f.read()
+    target = os.path.join(target_root, '_content.gotmpl')
+    if os.path.exists(target):
+        with open(target, 'r', encoding='utf-8') as f:
+            if f.read() == template:
+                return
+    with open(target, 'w', encoding='utf-8') as f:
+        f.write(template)
+    print(f"📄 已写入 Hugo 内容适配器: {target}")
 
 # 自动定位 summarized_articles.jsonl 的最新文件
 # 优先查找 AI_summary.py 生成的路径
@@ -53,84 +107,29 @@ def find_latest_summary_jsonl():
     return None
 
 # 从环境变量读取hugo项目路径，如果未设置，则脚本会提前退出
-# hugo_project_path = os.getenv('HUGO_PROJECT_PATH') # 已在顶部定义和检查
-
-# 目标根目录
-# 例如：C:\Users\kongg\0\content\post
-# 可根据实际情况调整
-# 这里假设与原逻辑一致
-# 你可以根据实际Hugo路径修改 target_root
-#
-target_root = os.path.join(hugo_project_path, 'content', 'post')
-
-# 确保目标目录存在
-os.makedirs(target_root, exist_ok=True)
-print(f"确保目标目录存在: {target_root}")
+# hugo_project_path = os.getenv('HUGO_PROJECT_PATH') # 已在 setup() 中定义和检查
 
 def safe_filename(name):
     # 生成安全的文件夹名
     return ''.join(c if c.isalnum() or c in '-_.' else '_' for c in name)[:40]
 
-# 计算内容的MD5哈希值，用于去重
-def get_content_hash(content):
-    return hashlib.md5(content.encode('utf-8')).hexdigest()
-
-# 计算标题的哈希值，用于检测相同标题的文章
-def get_title_hash(title):
-    # 移除所有空格和标点符号，转为小写后计算哈希值
-    normalized_title = ''.join(c.lower() for c in title if c.isalnum())
-    return hashlib.md5(normalized_title.encode('utf-8')).hexdigest()
-
 # 获取前一天的日期目录
 def get_previous_day_folder():
     yesterday = (datetime.now(TARGET_TIMEZONE) - timedelta(days=1)).strftime('%Y-%m-%d')
     yesterday_safe = yesterday.replace('-', '_')
     return os.path.join(target_root, yesterday_safe)
 
-# 收集已存在的文章信息，包括内容哈希和标题哈希
-def collect_existing_articles_info(days=7):
-    content_hash_set = set()  # 内容哈希集合
-    title_hash_map = {}       # 标题哈希 -> 文件夹路径的映射
-    
-    # 遍历最近几天的文件夹
-    for day_offset in range(0, days+1):  # 包括今天(0)
-        day_date = (datetime.now(TARGET_TIMEZONE) - timedelta(days=day_offset)).strftime('%Y-%m-%d')
-        day_folder = os.path.join(target_root, day_date.replace('-', '_'))
-        
-        if not os.path.exists(day_folder):
-            continue
-            
-        # 查找所有index.md文件
-        for root, dirs, files in os.walk(day_folder):
-            for file in files:
-                if file.lower() == 'index.md':
-                    index_path = os.path.join(root, file)
-                    try:
-                        with open(index_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            
-                            # 提取标题
-                            title_match = re.search(r"title\s*=\s*'([^']*)'", content)
-                            if title_match:
-                                title = title_match.group(1)
-                                title_hash = get_title_hash(title)
-                                # 保存标题哈希和对应的文件夹路径
-                                title_hash_map[title_hash] = os.path.dirname(index_path)
-                            
-                            # 提取正文部分（去除front matter）
-                            content_match = re.search(r'^\+\+\+\n.*?\+\+\+\n(.*)', content, re.DOTALL)
-                            if content_match:
-                                content_body = content_match.group(1)
-                                content_hash = get_content_hash(content_body)
-                                content_hash_set.add(content_hash)
-                    except Exception as e:
-                        print(f"读取文件失败 {index_path}: {e}")
-    
-    print(f"已收集 {len(content_hash_set)} 个现有内容哈希值和 {len(title_hash_map)} 个标题哈希值用于去重")
-    return content_hash_set, title_hash_map
+# 计算去重窗口的起始日期目录名（None 表示全部历史文章），并打印清单中这段时间内的文章数
+def collect_existing_articles_info(manifest, days=POST_DEDUP_DAYS):
+    if not days:
+        print(f"文章清单中共有 {manifest.count()} 篇历史文章用于去重")
+        return None
+    since_day = (datetime.now(TARGET_TIMEZONE) - timedelta(days=days)).strftime('%Y_%m_%d')
+    print(f"文章清单中最近 {days} 天共有 {manifest.count(since_day)} 篇文章用于去重")
+    return since_day
 
 # 检查当天文件夹中是否存在重复文章，如果有则删除
-def remove_duplicates_in_today_folder(today_folder):
+def remove_duplicates_in_today_folder(manifest, today_folder):
     if not os.path.exists(today_folder):
         return 0
         
@@ -138,48 +137,28 @@ def remove_duplicates_in_today_folder(today_folder):
     title_hashes = {}    # 标题哈希 -> 文件夹路径
     duplicates = []      # 要删除的重复文件夹
     
-    # 第一遍：收集所有文章的哈希值
-    for item in os.listdir(today_folder):
-        item_path = os.path.join(today_folder, item)
-        if os.path.isdir(item_path):
-            index_path = os.path.join(item_path, 'index.md')
-            if os.path.exists(index_path):
-                try:
-                    with open(index_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        
-                        # 提取标题
-                        title_match = re.search(r"title\s*=\s*'([^']*)'", content)
-                        if title_match:
-                            title = title_match.group(1)
-                            title_hash = get_title_hash(title)
-                            
-                            # 检查标题是否重复
-                            if title_hash in title_hashes:
-                                duplicates.append(item_path)
-                                print(f"⚠️ 发现重复标题: {title}")
-                                continue
-                            title_hashes[title_hash] = item_path
-                        
-                        # 提取正文部分
-                        content_match = re.search(r'^\+\+\+\n.*?\+\+\+\n(.*)', content, re.DOTALL)
-                        if content_match:
-                            content_body = content_match.group(1)
-                            content_hash = get_content_hash(content_body)
-                            
-                            # 检查内容是否重复
-                            if content_hash in content_hashes:
-                                duplicates.append(item_path)
-                                print(f"⚠️ 发现重复内容: {title}")
-                                continue
-                            content_hashes[content_hash] = item_path
-                except Exception as e:
-                    print(f"读取文件失败 {index_path}: {e}")
+    # 第一遍：按清单里记录的哈希找出重复的文章，序号小的保留
+    for item_path, title, title_hash, content_hash in manifest.posts_on(os.path.basename(today_folder)):
+        if title_hash:
+            # 检查标题是否重复
+            if title_hash in title_hashes:
+                duplicates.append(item_path)
+                print(f"⚠️ 发现重复标题: {title}")
+                continue
+            title_hashes[title_hash] = item_path
+        if content_hash:
+            # 检查内容是否重复
+            if content_hash in content_hashes:
+                duplicates.append(item_path)
+                print(f"⚠️ 发现重复内容: {title}")
+                continue
+            content_hashes[content_hash] = item_path
     
     # 第二遍：删除重复的文件夹
     for dup_path in duplicates:
         try:
             shutil.rmtree(dup_path)
+            manifest.remove(dup_path)
             print(f"🗑️ 删除重复文件夹: {os.path.basename(dup_path)}")
         except Exception as e:
             print(f"删除文件夹失败 {dup_path}: {e}")
@@ -201,149 +180,261 @@ def get_next_article_index(folder_path):
                     max_index = current_index
     return max_index + 1
 
-def generate_daily_news_folders():
-    today = datetime.now(TARGET_TIMEZONE).strftime('%Y-%m-%d')
-    today_safe = today.replace('-', '_')
-    today_folder = os.path.join(target_root, today_safe)
-    
-    # 确保目录存在
-    os.makedirs(today_folder, exist_ok=True)
-    print(f"创建文章目录: {today_folder}")
+def load_day_records(day):
+    """adapter 模式下某一天数据文件中的文章记录。"""
+    path = os.path.join(data_root, f"{day}.json")
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
 
-    # 获取当天文章的起始序号
-    next_article_index = get_next_article_index(today_folder)
+
+def open_today_posts(day=None):
+    """准备当天（或指定日期 YYYY_MM_DD）的文章目录：与文章清单对齐、清理当天重复的文章，返回逐篇生成文章所需的状态。"""
+    today_safe = day or datetime.now(TARGET_TIMEZONE).strftime('%Y_%m_%d')
+    today_folder = os.path.join(target_root, today_safe)
+    day_records = []
+
+    if POST_OUTPUT_MODE == 'adapter':
+        # 当天的文章都在一个数据文件里，序号接着文件中已有的记录
+        day_records = load_day_records(today_safe)
+        next_article_index = max(get_next_article_index(today_folder), len(day_records) + 1)
+        print(f"文章数据文件: {os.path.join(data_root, today_safe + '.json')}（已有 {len(day_records)} 篇）")
+    else:
+        # 确保目录存在
+        os.makedirs(today_folder, exist_ok=True)
+        print(f"创建文章目录: {today_folder}")
+
+        # 获取当天文章的起始序号
+        next_article_index = get_next_article_index(today_folder)
     print(f"今天的文章将从序号 {next_article_index:02d} 开始。")
     
+    # 文章清单只重新解析修改时间变过的文章，启动耗时与文章总数无关
+    manifest = PostManifest(target_root, data_root)
+    manifest.reconcile()
+    manifest.report()
+
     # 先清理当天文件夹中的重复文章
-    removed_count = remove_duplicates_in_today_folder(today_folder)
+    removed_count = remove_duplicates_in_today_folder(manifest, today_folder)
     if removed_count > 0:
         print(f"已删除当天文件夹中的 {removed_count} 个重复文章")
 
-    # 收集已存在的文章信息
-    existing_content_hashes, existing_title_hash_map = collect_existing_articles_info()
-
-    summary_jsonl = find_latest_summary_jsonl()
-    if not summary_jsonl or not os.path.exists(summary_jsonl):
-        print('未找到 summarized_articles.jsonl，请先运行 AI_summary.py')
-        return
-    print(f"使用摘要文件: {summary_jsonl}")
-    with open(summary_jsonl, 'r', encoding='utf-8') as f:
-        articles = [json.loads(line) for line in f if line.strip()]
-
-    # 记录处理结果
-    total_articles = len(articles)
-    skipped_articles = 0
-    generated_articles = 0
-    duplicate_title_count = 0
-
-    # 当前处理的文章内容哈希集合，用于防止当天内重复
-    today_content_hashes = set()
-    today_title_hashes = set()
-
-    # 每条新闻一个子文件夹，内有index.md
-    for idx, article in enumerate(articles):
-        title = article.get('title', f'news_{idx+1}')
-        summary = article.get('summary', '')
-        url = article.get('url', '')
-        original_content = article.get('original_content', '')
-        tags = article.get('tags', []) # 直接从JSON获取tags
-
-        # --- 诊断日志: 开始 ---
-        print(f"\n--- 正在处理文章: \"{title}\"")
-        # --- 诊断日志: 结束 ---
-
-        # 检查标题是否重复
-        title_hash = get_title_hash(title)
-        # --- 诊断日志: 开始 ---
-        print(f"    - 标题哈希: {title_hash}")
-        # --- 诊断日志: 结束 ---
-        if title_hash in existing_title_hash_map:
-            duplicate_folder = existing_title_hash_map[title_hash]
-            print(f"⏭️ 跳过重复标题: {title}")
-            print(f"   已存在于: {duplicate_folder}")
-            skipped_articles += 1
-            continue
-        
-        if title_hash in today_title_hashes:
-            print(f"⏭️ 跳过当天重复标题: {title}")
-            skipped_articles += 1
-            continue
-
-        # 内容去重
-        content_to_hash = summary + original_content
-        content_hash = get_content_hash(content_to_hash)
-        # --- 诊断日志: 开始 ---
-        print(f"    - 内容哈希: {content_hash}")
-        # --- 诊断日志: 结束 ---
-        if content_hash in existing_content_hashes:
-            print(f"⏭️ 跳过重复内容: {title}")
-            skipped_articles += 1
-            continue
-
-        if content_hash in today_content_hashes:
-            print(f"⏭️ 跳过当天重复内容: {title}")
-            skipped_articles += 1
-            continue
-
-        # 生成更健壮的文章URL slug
-        # 1. 转为小写
-        s = title.lower()
-        # 2. 移除非法字符 (保留字母、数字、- 和空格)
-        s = re.sub(r'[^\w\s-]', '', s)
-        # 3. 多个空格或-替换为单个-
-        s = re.sub(r'[\s-]+', '-', s).strip('-')
-        # 4. 截断
-        post_slug = s[:65] # 缩短以容纳前缀
-
-
-        # 添加数字前缀
-        post_slug_with_prefix = f"{next_article_index:02d}_{post_slug}"
-
-        post_folder = os.path.join(today_folder, post_slug_with_prefix)
-        os.makedirs(post_folder, exist_ok=True)
-        
-        # 将当前文章的哈希值加入集合
-        today_content_hashes.add(content_hash)
-        today_title_hashes.add(title_hash)
-        
-        # 在子文件夹内创建 index.md
-        index_path = os.path.join(post_folder, 'index.md')
-        
-        # 准备Front Matter
-        # 使用 TOML 格式
-        # 将tags列表转换为TOML格式的字符串数组
-        tags_toml = json.dumps(tags)
-        
-        # 移除 "摘要：" 和 "标签："
-        summary_cleaned = summary.replace("摘要：", "").strip()
-        
-        front_matter = f"""+++
-title = '{title.replace("'", "''")}'
-date = "{datetime.now(TARGET_TIMEZONE).isoformat()}"
-draft = false
-tags = {tags_toml}
-summary = "{summary_cleaned.replace('"', '""')[:150]}"
-slug = "{post_slug}"
-link = "{url}"
-+++
-
-{summary_cleaned}
-
-<!--more-->
-"""
-        
-        with open(index_path, 'w', encoding='utf-8') as f:
-            f.write(front_matter)
-            
-        print(f"✅ 成功生成文章: {post_slug_with_prefix}")
-        generated_articles += 1
-        next_article_index += 1 # 为下一篇文章增加序号
-
+    # 去重范围：默认为全部历史文章（POST_DEDUP_DAYS 可限定为最近几天），本次写出的文章也会立即登记进清单
+    since_day = collect_existing_articles_info(manifest)
+
+    return {
+        "day": today_safe,
+        "folder": today_folder,
+        "day_records": day_records,
+        "next_index": next_article_index,
+        "manifest": manifest,
+        "since_day": since_day,
+        # 当天的汇总 Markdown、JSON Feed 和 RSS，与文章在同一遍里渲染
+        "daily": post_renderer.DailyOutputs(
+            hugo_project_path, today_safe,
+            archive_path=os.path.join(hugo_project_path, 'spiders', 'ai_news', 'summarized_articles.md'),
+        ),
+        # 记录处理结果
+        "total": 0,
+        "generated": 0,
+        "skipped": 0,
+    }
+
+
+def write_post(state, article, idx=0):
+    """为一条摘要生成文章子文件夹和 index.md，重复的文章跳过。返回是否生成了文章。"""
+    state["total"] += 1
+    title = article.get('title', f'news_{idx+1}')
+    summary = article.get('summary', '')
+    url = article.get('url', '')
+    tags = article.get('tags', []) # 直接从JSON获取tags
+
+    # --- 诊断日志: 开始 ---
+    print(f"\n--- 正在处理文章: \"{title}\"")
+    # --- 诊断日志: 结束 ---
+
+    # 检查标题是否重复
+    title_hash = text_hash.title_hash(title)
+    # --- 诊断日志: 开始 ---
+    print(f"    - 标题哈希: {title_hash}")
+    # --- 诊断日志: 结束 ---
+    duplicate_folder = state["manifest"].find_title(title_hash, state["since_day"])
+    if duplicate_folder and os.path.dirname(duplicate_folder) == state["folder"]:
+        print(f"⏭️ 跳过当天重复标题: {title}")
+        state["skipped"] += 1
+        return False
+    if duplicate_folder:
+        print(f"⏭️ 跳过重复标题: {title}")
+        print(f"   已存在于: {duplicate_folder}")
+        state["skipped"] += 1
+        return False
+
+    # 移除 "摘要："；内容去重对写进正文的摘要取哈希，与 post_manifest 重建清单时解析出的文本一致
+    summary_cleaned = text_hash.post_summary(summary)
+    content_hash = text_hash.content_hash(summary_cleaned)
+    # --- 诊断日志: 开始 ---
+    print(f"    - 内容哈希: {content_hash}")
+    # --- 诊断日志: 结束 ---
+    duplicate_folder = state["manifest"].find_content(content_hash, state["since_day"])
+    if duplicate_folder and os.path.dirname(duplicate_folder) == state["folder"]:
+        print(f"⏭️ 跳过当天重复内容: {title}")
+        state["skipped"] += 1
+        return False
+    if duplicate_folder:
+        print(f"⏭️ 跳过重复内容: {title}")
+        state["skipped"] += 1
+        return False
+
+    # 生成更健壮的文章URL slug
+    # 1. 转为小写
+    s = title.lower()
+    # 2. 移除非法字符 (保留字母、数字、- 和空格)
+    s = re.sub(r'[^\w\s-]', '', s)
+    # 3. 多个空格或-替换为单个-
+    s = re.sub(r'[\s-]+', '-', s).strip('-')
+    # 4. 截断
+    post_slug = s[:65] # 缩短以容纳前缀
+
+
+    # 每篇文章只组装一次字段，各种输出格式都从这里渲染
+    post = post_renderer.make_post(title, tags, summary_cleaned, post_slug, url,
+                                   datetime.now(TARGET_TIMEZONE).isoformat())
+    if POST_OUTPUT_MODE == 'adapter':
+        written_as = append_post_record(state, post, title_hash, content_hash)
+    else:
+        written_as = write_post_bundle(state, post, title_hash, content_hash)
+    state["daily"].add(post, written_as)
+
+    print(f"✅ 成功生成文章: {written_as}")
+    state["generated"] += 1
+    run_metrics.count("posts_generated")
+    state["next_index"] += 1 # 为下一篇文章增加序号
+    return True
+
+
+def write_post_bundle(state, post, title_hash, content_hash):
+    """bundle 模式：写出 NN_slug/index.md 并登记到清单，返回 YYYY_MM_DD/NN_slug。"""
+    # 添加数字前缀
+    post_slug_with_prefix = f"{state['next_index']:02d}_{post['slug']}"
+
+    post_folder = os.path.join(state["folder"], post_slug_with_prefix)
+    os.makedirs(post_folder, exist_ok=True)
+    
+    # 在子文件夹内创建 index.md
+    index_path = os.path.join(post_folder, 'index.md')
+    
+    # TOML front matter 由 post_renderer 用 tomli_w 序列化
+    text = post_renderer.render_bundle(post)
+    with open(index_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    run_metrics.count("bytes_written", len(text.encode("utf-8")))
+    # 登记到文章清单，本次运行中后面的文章和以后的运行都按清单去重
+    state["manifest"].add(post_folder, post["title"], title_hash, content_hash, post["slug"])
+    return f"{state['day']}/{post_slug_with_prefix}"
+
+
+def append_post_record(state, post, title_hash, content_hash):
+    """adapter 模式：把文章追加到当天的数据文件（整份原子替换）并登记到清单，返回页面路径。
+
+    front matter 字段与 bundle 模式相同；页面路径用 slug，生成的网址与 bundle 模式一致，同一天内重名时加上序号。
+    """
+    post_slug = post["slug"]
+    path = post_slug or f"{state['next_index']:02d}"
+    if any(record["path"] == path for record in state["day_records"]):
+        path = f"{post_slug}-{state['next_index']:02d}"
+    state["day_records"].append(post_renderer.adapter_record(post, path))
+    # 每篇一行，git 的差异只包含新增的行
+    text = "[\n" + ",\n".join(json.dumps(record, ensure_ascii=False) for record in state["day_records"]) + "\n]\n"
+    data_file = os.path.join(data_root, f"{state['day']}.json")
+    os.makedirs(data_root, exist_ok=True)
+    tmp_file = data_file + ".tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_file, data_file)
+    run_metrics.count("bytes_written", len(text.encode("utf-8")))
+    state["manifest"].add_data(state["day"], path, post["title"], title_hash, content_hash, post_slug)
+    return f"{state['day']}/{path}"
+
+
+def report_posts(state):
     print("\n--- 生成完毕 ---")
-    print(f"总共处理文章: {total_articles}")
-    print(f"成功生成: {generated_articles}")
-    print(f"因重复跳过: {skipped_articles}")
+    print(f"总共处理文章: {state['total']}")
+    print(f"成功生成: {state['generated']}")
+    print(f"因重复跳过: {state['skipped']}")
     print("--- --- ---")
 
+
+def process_new_summaries(state, summary_jsonl):
+    """把摘要文件断点之后新增的摘要逐条生成文章并推进断点，返回读取的条数。"""
+    summary_jsonl = os.path.abspath(summary_jsonl)
+    manifest = state["manifest"]
+    offset, last_title = manifest.checkpoint(summary_jsonl)
+    if offset:
+        print(f"📍 从断点 {offset} 字节处继续（上次处理到: {last_title}）")
+
+    # 逐行读取断点之后新增的摘要，每条新闻一个子文件夹，内有index.md；内存占用与文件大小无关
+    read_to = offset
+    idx = 0
+    for article, line_start, line_end in iter_jsonl(summary_jsonl, offset):
+        if article is None:
+            print(f"⚠️ 解析JSON失败: 第 {line_start} 字节处")
+        else:
+            write_post(state, article, idx)
+            last_title = article.get('title', last_title)
+        idx += 1
+        read_to = line_end
+        # 定期保存断点；中途退出时最多重读这么多条，已生成的文章会按清单跳过
+        if idx % CHECKPOINT_EVERY == 0:
+            manifest.save_checkpoint(summary_jsonl, read_to, last_title)
+    manifest.save_checkpoint(summary_jsonl, read_to, last_title)
+    state["streamed_to"] = read_to
+    print(f"📍 本次读取 {idx} 条新摘要（{read_to - offset} 字节），断点 {read_to}")
+    return idx
+
+
+def write_streamed_post(state, summary_jsonl, article):
+    """流水线中摘要一写出就生成文章。摘要紧接在断点之后时同时推进断点，最后一遍只需处理流式阶段漏掉的记录。"""
+    written = write_post(state, article)
+    summary_jsonl = os.path.abspath(summary_jsonl)
+    manifest = state["manifest"]
+    if "streamed_to" not in state:
+        state["streamed_to"] = manifest.checkpoint(summary_jsonl)[0]
+    # 摘要文件只有 AI_summary 一个写入者，刚写出的记录就在文件末尾
+    end = os.path.getsize(summary_jsonl)
+    start = end - len((json.dumps(article, ensure_ascii=False) + "\n").encode("utf-8"))
+    if start == state["streamed_to"]:
+        manifest.save_checkpoint(summary_jsonl, end, article.get('title'))
+        state["streamed_to"] = end
+    else:
+        # 与断点不连续（例如中间夹着别的写入）：不再推进，剩下的交给最后一遍按清单去重
+        state["streamed_to"] = -1
+    return written
+
+
+def generate_daily_news_folders(state=None):
+    """把摘要文件断点之后新增的文章写入当天目录。state 是流水线里已经逐篇生成过文章的状态，传入时在其基础上继续。"""
+    if state is None:
+        state = open_today_posts()
+
+    try:
+        summary_jsonl = find_latest_summary_jsonl()
+        if not summary_jsonl or not os.path.exists(summary_jsonl):
+            print('未找到 summarized_articles.jsonl，请先运行 AI_summary.py')
+            return
+        print(f"使用摘要文件: {summary_jsonl}")
+        process_new_summaries(state, summary_jsonl)
+
+        report_posts(state)
+        state["daily"].write()
+        state["manifest"].report_bloom()
+    finally:
+        state["manifest"].close()
+
+
+def main():
+    setup()
+    generate_daily_news_folders()
+
+
 if __name__ == '__main__':
-    generate_daily_news_folders() 
\ No newline at end of file
+    main()
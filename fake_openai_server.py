@@ -0,0 +1,237 @@
+"""本地的 OpenAI 兼容假服务，用于在不花钱的情况下测试 AI_summary.py 的并发、限流和重试。
+
+用法:
+    python fake_openai_server.py --latency 1.5 --rpm 30
+    OPENAI_API_BASE=<启动时打印的地址> OPENAI_API_KEY=test python AI_summary.py
+
+默认由系统分配空闲端口（--port 0），启动后第一行输出实际地址；也可以用 --port 指定固定端口。
+--rpm 限制每个窗口（--window 秒，默认 60）的请求数，超出时返回 429 和 Retry-After 头。
+GET /v1/stats 返回已完成的请求数和 429 次数，供测试检查。
+同时模拟 Batch API（/files、/batches、/files/{id}/content），--batch-delay 控制批任务完成前的耗时。
+"""
+import json
+import time
+import uuid
+import argparse
+import threading
+from collections import deque
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    rpm = 0
+    window = 60.0
+    completed = 0
+    rate_limited = 0
+    request_times = deque()
+    lock = threading.Lock()
+    counter = 0
+    batch_delay = 0.0
+    # Batch API 的内存状态：file_id -> {"meta": dict, "data": bytes}，batch_id -> dict
+    files = {}
+    batches = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=None):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def check_rate_limit(self):
+        """滑动窗口限流，超出时返回需要等待的秒数。"""
+        if not self.rpm:
+            return None
+        with self.lock:
+            now = time.monotonic()
+            while self.request_times and now - self.request_times[0] > self.window:
+                self.request_times.popleft()
+            if len(self.request_times) >= self.rpm:
+                FakeOpenAIHandler.rate_limited += 1
+                return max(0.1, self.window - (now - self.request_times[0]))
+            self.request_times.append(now)
+            return None
+
+    def read_upload(self):
+        """解析 multipart/form-data 上传，返回 (表单字段, 文件名, 文件内容)。"""
+        length = int(self.headers.get("Content-Length", 0))
+        raw = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("latin-1") + self.rfile.read(length)
+        fields, filename, data = {}, "upload.jsonl", b""
+        for part in BytesParser(policy=policy.HTTP).parsebytes(raw).iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if part.get_filename():
+                filename, data = part.get_filename(), part.get_payload(decode=True)
+            else:
+                fields[name] = part.get_payload(decode=True).decode("utf-8")
+        return fields, filename, data
+
+    @classmethod
+    def add_file(cls, filename, data, purpose):
+        file_id = f"file-fake-{uuid.uuid4().hex[:12]}"
+        meta = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(data),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        cls.files[file_id] = {"meta": meta, "data": data}
+        return meta
+
+    @classmethod
+    def run_batch(cls, batch_id):
+        """后台逐行执行批任务，完成后生成输出文件。"""
+        batch = cls.batches[batch_id]
+        time.sleep(cls.batch_delay / 2)
+        batch["status"] = "in_progress"
+        batch["in_progress_at"] = int(time.time())
+        lines = cls.files[batch["input_file_id"]]["data"].decode("utf-8").splitlines()
+        output = []
+        for line in filter(None, lines):
+            item = json.loads(line)
+            output.append(json.dumps({
+                "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                "custom_id": item["custom_id"],
+                "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": cls.completion(item["body"])},
+                "error": None,
+            }, ensure_ascii=False))
+            batch["request_counts"]["completed"] += 1
+        time.sleep(cls.batch_delay / 2)
+        # 输出文件里的顺序与输入无关，真实服务也不保证顺序
+        output.reverse()
+        meta = cls.add_file(f"{batch_id}_output.jsonl", ("\n".join(output) + "\n").encode("utf-8"), "batch_output")
+        batch["output_file_id"] = meta["id"]
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+
+    def create_batch(self):
+        request = self.read_json()
+        input_file = self.files.get(request.get("input_file_id"))
+        if input_file is None:
+            self.send_json(404, {"error": {"message": "input file not found"}})
+            return
+        total = sum(1 for line in input_file["data"].splitlines() if line.strip())
+        batch_id = f"batch_fake_{uuid.uuid4().hex[:12]}"
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": request["endpoint"],
+            "input_file_id": request["input_file_id"],
+            "completion_window": request["completion_window"],
+            "status": "validating",
+            "created_at": int(time.time()),
+            "output_file_id": None,
+            "error_file_id": None,
+            "request_counts": {"total": total, "completed": 0, "failed": 0},
+        }
+        self.batches[batch_id] = batch
+        threading.Thread(target=self.run_batch, args=(batch_id,), daemon=True).start()
+        self.send_json(200, batch)
+
+    def do_GET(self):
+        parts = self.path.rstrip("/").split("/")
+        if parts[-1] == "stats":
+            self.send_json(200, {"completed": self.completed, "rate_limited": self.rate_limited})
+        elif len(parts) >= 2 and parts[-2] == "batches" and parts[-1] in self.batches:
+            self.send_json(200, self.batches[parts[-1]])
+        elif len(parts) >= 3 and parts[-1] == "content" and parts[-2] in self.files:
+            data = self.files[parts[-2]]["data"]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self.send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+
+    def do_POST(self):
+        if self.path.endswith("/files"):
+            fields, filename, data = self.read_upload()
+            self.send_json(200, self.add_file(filename, data, fields.get("purpose", "batch")))
+            return
+        if self.path.endswith("/batches"):
+            self.create_batch()
+            return
+        if not self.path.endswith("/chat/completions"):
+            self.send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+            return
+        request = self.read_json()
+        retry_after = self.check_rate_limit()
+        if retry_after is not None:
+            self.send_json(
+                429,
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                {"Retry-After": f"{retry_after:.1f}"},
+            )
+            return
+        time.sleep(self.latency)
+        with self.lock:
+            FakeOpenAIHandler.completed += 1
+        self.send_json(200, self.completion(request), {"x-ratelimit-remaining-requests": "1000"})
+
+    @classmethod
+    def completion(cls, request):
+        with cls.lock:
+            cls.counter += 1
+            counter = cls.counter
+        user = request["messages"][-1]["content"]
+        prompt_tokens = sum(len(m["content"]) for m in request["messages"]) // 2
+        content = json.dumps({"summary": f"假摘要：{user[:60].strip()}", "tags": ["Agent"]}, ensure_ascii=False)
+        return {
+            "id": f"chatcmpl-fake-{counter}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "gpt-3.5-turbo"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content) // 2,
+                "total_tokens": prompt_tokens + len(content) // 2,
+            },
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容假服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="监听端口，0 表示由系统分配空闲端口")
+    parser.add_argument("--latency", type=float, default=1.0, help="每个请求的模拟延迟（秒）")
+    parser.add_argument("--rpm", type=int, default=0, help="每个窗口的请求上限，0 表示不限")
+    parser.add_argument("--window", type=float, default=60.0, help="限流窗口长度（秒）")
+    parser.add_argument("--batch-delay", type=float, default=5.0, help="批任务从提交到完成的模拟耗时（秒）")
+    args = parser.parse_args()
+
+    FakeOpenAIHandler.latency = args.latency
+    FakeOpenAIHandler.rpm = args.rpm
+    FakeOpenAIHandler.window = args.window
+    FakeOpenAIHandler.batch_delay = args.batch_delay
+    server = ThreadingHTTPServer((args.host, args.port), FakeOpenAIHandler)
+    host, port = server.server_address[:2]
+    print(f"🧪 假 OpenAI 服务已启动: http://{host}:{port}/v1（限流 {args.rpm or '不限'} 次/{args.window:g}s）", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
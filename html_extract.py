@@ -0,0 +1,62 @@
+from lxml import etree
+from lxml import html as lxml_html
+
+# 与 BeautifulSoup get_text 一致：脚本、样式、模板里的文本以及注释都不算正文
+SKIPPED_TAGS = {"script", "style", "template"}
+CONTENT_XPATH = etree.XPath(
+    "//div[contains(concat(' ', normalize-space(@class), ' '), ' article__content ')]"
+)
+
+
+def parse_html(html_content):
+    try:
+        return lxml_html.document_fromstring(html_content)
+    except ValueError:
+        # 带编码声明的字符串 lxml 不接受，改按 UTF-8 字节解析
+        return lxml_html.document_fromstring(html_content.encode("utf-8"))
+
+
+def iter_text(root):
+    """按文档顺序逐段产出元素内的文本，不构造中间列表；跳过的元素只保留其后的 tail 文本。"""
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            yield node
+            continue
+        # 注释和处理指令的 tag 不是字符串
+        if not isinstance(node.tag, str) or node.tag.lower() in SKIPPED_TAGS:
+            continue
+        for child in reversed(node):
+            if child.tail:
+                stack.append(child.tail)
+            stack.append(child)
+        if node.text:
+            yield node.text
+
+
+def extract_text(html_content):
+    """与 BeautifulSoup(html, "html.parser") + get_text(separator="\\n", strip=True) 等价的正文提取。
+
+    优先使用 div.article__content，找不到时提取整篇文本。
+    """
+    if not html_content or not html_content.strip():
+        return ""
+    try:
+        root = parse_html(html_content)
+    except etree.ParserError:
+        return ""  # 只有注释或空白的文档
+    containers = CONTENT_XPATH(root)
+    target = containers[0] if containers else root
+    return "\n".join(text for text in (piece.strip() for piece in iter_text(target)) if text)
+
+
+def extract_text_bs4(html_content):
+    """原来的 BeautifulSoup 实现，保留给基准测试做对照。"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html_content, "html.parser")
+    article_body = soup.find('div', class_='article__content')
+    if article_body:
+        return article_body.get_text(separator="\n", strip=True)
+    return soup.get_text(separator="\n", strip=True)
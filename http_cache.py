@@ -0,0 +1,123 @@
+import os
+import json
+import time
+
+from lru_store import LruStore
+
+# HTTP 缓存的总大小上限（字节）
+MAX_BYTES = int(os.getenv('HTTP_CACHE_MAX_BYTES', str(200 * 1024 * 1024)))
+# 只缓存这些资源类型的 Playwright 请求（页面本身和接口数据）
+CACHEABLE_RESOURCE_TYPES = {"document", "xhr", "fetch"}
+# 重放缓存时不能沿用的响应头：正文已解压，长度和编码都由 fulfill 重新计算
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS responses (
+        url TEXT PRIMARY KEY,
+        etag TEXT,
+        last_modified TEXT,
+        headers TEXT NOT NULL,
+        body BLOB NOT NULL,
+        size INTEGER NOT NULL,
+        last_access REAL NOT NULL
+    )
+"""
+
+
+def cache_path(base_dir):
+    return os.path.join(base_dir, "http_cache.sqlite3")
+
+
+class HttpCache(LruStore):
+    """以 URL 为键的持久化响应缓存，保存 ETag/Last-Modified 并用条件请求重新验证。"""
+
+    def __init__(self, path, max_bytes=MAX_BYTES):
+        super().__init__(path, SCHEMA, "url", max_bytes)
+        self.bytes_saved = 0
+        self.bytes_downloaded = 0
+
+    def lookup(self, url):
+        row = self.db.execute(
+            "SELECT etag, last_modified, headers, body FROM responses WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, headers, body = row
+        return {"etag": etag, "last_modified": last_modified, "headers": json.loads(headers), "body": body}
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def hit(self, url, entry):
+        """服务器返回 304：刷新访问时间，记为命中并统计省下的字节数。"""
+        self.touch(url)
+        self.hits += 1
+        self.bytes_saved += len(entry["body"])
+
+    def store(self, url, status, headers, body):
+        self.misses += 1
+        self.bytes_downloaded += len(body)
+        headers = {k.lower(): v for k, v in headers.items()}
+        etag = headers.get("etag")
+        last_modified = headers.get("last-modified")
+        # 没有校验信息的响应无法重新验证，缓存也没有意义
+        if status != 200 or not (etag or last_modified) or len(body) > self.max_bytes:
+            return
+        kept = {k: v for k, v in headers.items() if k not in DROPPED_HEADERS}
+        self.db.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, etag, last_modified, json.dumps(kept), body, len(body), time.time()),
+        )
+        self.db.commit()
+        self.evict()
+
+    async def fetch(self, client, url, **kwargs):
+        """httpx 路径：带条件请求头发起 GET，304 时返回用缓存正文构造的 200 响应。"""
+        entry = self.lookup(url)
+        headers = {**kwargs.pop("headers", {}), **self.conditional_headers(entry)}
+        response = await client.get(url, headers=headers, **kwargs)
+        if response.status_code == 304 and entry:
+            import httpx
+
+            self.hit(url, entry)
+            return httpx.Response(200, headers=entry["headers"], content=entry["body"], request=response.request,
+                                  extensions={"from_cache": True})
+        self.store(url, response.status_code, response.headers, response.content)
+        return response
+
+    async def handle_route(self, route):
+        """Playwright 路径：在 context.route 中代发请求，304 时直接用缓存正文 fulfill。"""
+        request = route.request
+        if request.method != "GET" or request.resource_type not in CACHEABLE_RESOURCE_TYPES:
+            await route.continue_()
+            return
+        entry = self.lookup(request.url)
+        try:
+            response = await route.fetch(headers={**request.headers, **self.conditional_headers(entry)})
+        except Exception:
+            await route.continue_()
+            return
+        if response.status == 304 and entry:
+            self.hit(request.url, entry)
+            await route.fulfill(status=200, headers=entry["headers"], body=entry["body"])
+            return
+        body = await response.body()
+        self.store(request.url, response.status, response.headers, body)
+        await route.fulfill(response=response, body=body)
+
+    def report(self):
+        print(f"🗄️ HTTP 缓存: 命中 {self.hits}，未命中 {self.misses}，命中率 {self.hit_rate():.1f}%，"
+              f"节省 {self.bytes_saved / 1024:.1f} KB，下载 {self.bytes_downloaded / 1024:.1f} KB，"
+              f"淘汰 {self.evictions} 条")
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bytes_saved": self.bytes_saved,
+            "bytes_downloaded": self.bytes_downloaded,
+            "evictions": self.evictions,
+        }
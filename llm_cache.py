@@ -0,0 +1,69 @@
+import os
+import json
+import time
+import hashlib
+
+from lru_store import LruStore
+
+# 摘要缓存的总大小上限（字节）
+MAX_BYTES = int(os.getenv('LLM_CACHE_MAX_BYTES', str(50 * 1024 * 1024)))
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS responses (
+        key TEXT PRIMARY KEY,
+        model TEXT NOT NULL,
+        value TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        created REAL NOT NULL,
+        last_access REAL NOT NULL
+    )
+"""
+
+
+def cache_path(base_dir):
+    return os.path.join(base_dir, "llm_cache.sqlite3")
+
+
+def make_key(content_hash, system_prompt, model, temperature, chunking=None):
+    """内容哈希 + 系统提示词（含关键词列表）哈希 + 模型 + 温度，任一变化都视为不同的请求。
+
+    chunking 描述超长原文的处理方式（分段提示词、每段 token 预算，或截断），只有超长的文章才传入；
+    短文章的键与之前相同，已有的缓存仍然有效。
+    """
+    prompt_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+    raw = f"{content_hash}|{prompt_hash}|{model}|{temperature}"
+    if chunking is not None:
+        raw += f"|{chunking}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache(LruStore):
+    """按内容寻址的摘要结果缓存，保存解析后的 summary/tags，重跑或重建输出时不再请求接口。"""
+
+    def __init__(self, path, max_bytes=MAX_BYTES):
+        super().__init__(path, SCHEMA, "key", max_bytes)
+
+    def get(self, key):
+        row = self.db.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.touch(key)
+        return json.loads(row[0])
+
+    def put(self, key, model, value):
+        payload = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        self.db.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+            (key, model, payload, len(payload.encode("utf-8")), now, now),
+        )
+        self.db.commit()
+        self.evict()
+
+    def report(self):
+        entries, size = self.stats()
+        print(f"🗄️ 摘要缓存: 命中 {self.hits}，未命中 {self.misses}，命中率 {self.hit_rate():.1f}%，"
+              f"共 {entries} 条 / {size / 1024:.1f} KB，淘汰 {self.evictions} 条")
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": entries}
@@ -0,0 +1,113 @@
+import re
+import time
+import asyncio
+import contextlib
+
+# 按字符粗估 token：中日韩字符约 1 token/字，其余约 4 字符/token
+CJK_PATTERN = re.compile(r"[　-鿿가-힯＀-￯]")
+
+
+def estimate_text_tokens(text):
+    cjk = len(CJK_PATTERN.findall(text))
+    return cjk + -(-(len(text) - cjk) // 4)
+
+
+def estimate_tokens(messages):
+    return sum(estimate_text_tokens(message["content"]) + 4 for message in messages)
+
+
+def parse_duration(value):
+    """解析 OpenAI 限流头里的时长（"1s"、"6m0s"、"20ms"、"0.5"），失败返回 None。"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r"([\d.]+)(ms|s|m|h)", value):
+        matched = True
+        total += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return total if matched else None
+
+
+class RateLimiter:
+    """按每分钟请求数（RPM）和每分钟 token 数（TPM）调度请求的双令牌桶。
+
+    收到 429 时按 Retry-After 暂停所有请求，并把速率乘性下调；之后每次成功再逐步恢复，
+    直到回到配置的上限。响应头里剩余额度为 0 时也会提前暂停到额度重置。
+    max_in_flight 限制同时进行中的请求数（async with limiter.slots），长文的分段请求也计入，
+    所有文章加起来不会超过这个上限。
+    """
+
+    def __init__(self, rpm, tpm, max_in_flight=None):
+        self.max_rpm = rpm
+        self.max_tpm = tpm
+        self.rpm = float(rpm)
+        self.tpm = float(tpm)
+        self.request_tokens = float(rpm)
+        self.token_tokens = float(tpm)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.throttled = 0
+        self.slots = asyncio.Semaphore(max_in_flight) if max_in_flight else contextlib.nullcontext()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.updated = now
+        self.request_tokens = min(self.rpm, self.request_tokens + elapsed * self.rpm / 60)
+        self.token_tokens = min(self.tpm, self.token_tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, tokens):
+        # 单个请求超过 TPM 上限时按上限计，否则永远等不到
+        tokens = min(tokens, self.tpm)
+        async with self._lock:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause > 0:
+                    await asyncio.sleep(pause)
+                    continue
+                self._refill()
+                if self.request_tokens >= 1 and self.token_tokens >= tokens:
+                    self.request_tokens -= 1
+                    self.token_tokens -= tokens
+                    return
+                wait = max(
+                    (1 - self.request_tokens) * 60 / self.rpm,
+                    (tokens - self.token_tokens) * 60 / self.tpm,
+                )
+                await asyncio.sleep(max(wait, 0.01))
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def on_rate_limited(self, retry_after=None):
+        """收到 429：按 Retry-After（没有则默认 5 秒）暂停，并把速率降到原来的一半。"""
+        self.throttled += 1
+        already_paused = time.monotonic() < self.paused_until
+        self.pause(retry_after if retry_after is not None else 5.0)
+        if already_paused:
+            return  # 同一波并发请求一起收到的 429 只降速一次
+        self.rpm = max(1.0, self.rpm * 0.5)
+        self.tpm = max(1000.0, self.tpm * 0.5)
+        self.request_tokens = min(self.request_tokens, self.rpm)
+        self.token_tokens = min(self.token_tokens, self.tpm)
+
+    def on_success(self, headers=None):
+        # 加性恢复：每次成功恢复上限的 5%
+        self.rpm = min(self.max_rpm, self.rpm + self.max_rpm * 0.05)
+        self.tpm = min(self.max_tpm, self.tpm + self.max_tpm * 0.05)
+        if not headers:
+            return
+        for remaining, reset in (
+            ("x-ratelimit-remaining-requests", "x-ratelimit-reset-requests"),
+            ("x-ratelimit-remaining-tokens", "x-ratelimit-reset-tokens"),
+        ):
+            if headers.get(remaining) == "0":
+                wait = parse_duration(headers.get(reset))
+                if wait:
+                    self.pause(wait)
@@ -0,0 +1,169 @@
+"""记录每次 LLM 调用的用量：提示/生成 token 数、耗时、重试次数和模型，追加写入 llm_usage.jsonl。
+
+每行一条紧凑的 JSON 记录，字段:
+    ts          调用完成的时间戳（秒）
+    model       模型名
+    kind        summary（整篇）、chunk（长文分段）、reduce（合并分段）、batch（批任务）
+    title       文章标题
+    prompt      提示 token 数（接口返回的 usage，失败时为 0）
+    completion  生成 token 数
+    latency_ms  最后一次请求的耗时，不含重试前的等待；批任务为 null
+    retries     重试次数
+    ok          是否成功
+
+用法:
+    python llm_usage.py        # 汇总日志里最近 7 天的调用
+    python llm_usage.py 30     # 汇总最近 30 天
+"""
+import os
+import sys
+import json
+import math
+import time
+import threading
+
+import run_metrics
+
+# 每百万 token 的美元价格（输入, 输出），可用 LLM_PRICE_INPUT / LLM_PRICE_OUTPUT 覆盖当前模型的价格
+PRICES = {
+    "gpt-3.5-turbo": (0.5, 1.5),
+    "gpt-4o-mini": (0.15, 0.6),
+    "gpt-4o": (2.5, 10.0),
+}
+# 批任务按半价计费
+BATCH_DISCOUNT = 0.5
+
+
+def log_path(base_dir):
+    return os.path.join(base_dir, "llm_usage.jsonl")
+
+
+def price_for(model):
+    price_in, price_out = os.getenv('LLM_PRICE_INPUT'), os.getenv('LLM_PRICE_OUTPUT')
+    if price_in and price_out:
+        return float(price_in), float(price_out)
+    # 带日期后缀的模型名（如 gpt-4o-mini-2024-07-18）按前缀匹配最长的一项
+    for name in sorted(PRICES, key=len, reverse=True):
+        if model.startswith(name):
+            return PRICES[name]
+    return None
+
+
+def cost_of(record):
+    price = price_for(record["model"])
+    if price is None:
+        return None
+    cost = (record["prompt"] * price[0] + record["completion"] * price[1]) / 1_000_000
+    return cost * BATCH_DISCOUNT if record["kind"] == "batch" else cost
+
+
+def percentile(values, q):
+    """最近秩法取分位数，values 需已排序。"""
+    if not values:
+        return None
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+
+def summarize(records):
+    ok = [r for r in records if r["ok"]]
+    latencies = sorted(r["latency_ms"] for r in ok if r["latency_ms"] is not None)
+    prompts = sorted(r["prompt"] for r in ok)
+    costs = [cost_of(r) for r in ok]
+    return {
+        "calls": len(records),
+        "failed": len(records) - len(ok),
+        "retries": sum(r["retries"] for r in records),
+        "prompt_tokens": sum(prompts),
+        "completion_tokens": sum(r["completion"] for r in ok),
+        "latency_ms": {q: percentile(latencies, q) for q in (50, 90, 99)},
+        "prompt_p90": percentile(prompts, 90),
+        "cost_usd": None if None in costs else round(sum(costs), 4),
+        "models": sorted({r["model"] for r in records}),
+    }
+
+
+def print_summary(stats, label):
+    if not stats["calls"]:
+        print(f"💰 {label}: 没有 LLM 调用")
+        return
+    latency = stats["latency_ms"]
+    cost = "未知（模型不在价格表中）" if stats["cost_usd"] is None else f"${stats['cost_usd']:.4f}"
+    print(f"💰 {label}: 调用 {stats['calls']} 次（失败 {stats['failed']}，重试 {stats['retries']}），"
+          f"提示 {stats['prompt_tokens']} + 生成 {stats['completion_tokens']} tokens，估算费用 {cost}")
+    if latency[50] is not None:
+        print(f"   耗时 p50 {latency[50]}ms / p90 {latency[90]}ms / p99 {latency[99]}ms，"
+              f"提示 p90 {stats['prompt_p90']} tokens，模型: {', '.join(stats['models'])}")
+
+
+class UsageLog:
+    """追加写入的用量日志；同步路径会在线程池里并发调用 record，写入加锁。"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.file = open(path, "a", encoding="utf-8")
+        self.records = []
+        self._lock = threading.Lock()
+
+    def record(self, model, usage, latency, retries, kind, title, ok=True):
+        """usage 为接口返回的 usage（对象或字典），失败时传 None；latency 为秒，批任务传 None。"""
+        if usage is not None and not isinstance(usage, dict):
+            usage = {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens}
+        usage = usage or {}
+        entry = {
+            "ts": round(time.time(), 3),
+            "model": model,
+            "kind": kind,
+            "title": title,
+            "prompt": usage.get("prompt_tokens") or 0,
+            "completion": usage.get("completion_tokens") or 0,
+            "latency_ms": None if latency is None else round(latency * 1000),
+            "retries": retries,
+            "ok": ok,
+        }
+        with self._lock:
+            self.records.append(entry)
+            self.file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self.file.flush()
+        run_metrics.count("llm_calls")
+        run_metrics.count("llm_prompt_tokens", entry["prompt"])
+        run_metrics.count("llm_completion_tokens", entry["completion"])
+
+    def report(self):
+        stats = summarize(self.records)
+        print_summary(stats, "本次 LLM 用量")
+        return stats
+
+    def close(self):
+        self.file.close()
+
+
+def read_log(path, since=None):
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # 进程中断时可能留下半行
+            if since is None or entry["ts"] >= since:
+                records.append(entry)
+    return records
+
+
+def main():
+    days = float(sys.argv[1]) if len(sys.argv) > 1 else 7
+    base_dir = os.path.join(os.getenv('HUGO_PROJECT_PATH', '.'), 'spiders', 'ai_news')
+    path = log_path(base_dir)
+    records = read_log(path, since=time.time() - days * 86400)
+    print(f"📒 用量日志: {path}")
+    print_summary(summarize(records), f"最近 {days:g} 天")
+    # 按类型拆开看，便于判断长文分段是否值得
+    for kind in sorted({r["kind"] for r in records}):
+        print_summary(summarize([r for r in records if r["kind"] == kind]), f"  {kind}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""按总大小封顶的 SQLite 缓存表：每行记录 size 和 last_access，超出上限后按最近访问时间淘汰。
+
+HTTP 响应缓存（http_cache）和摘要结果缓存（llm_cache）共用这里的建表、访问时间刷新、淘汰和命中统计，
+子类只定义表结构和各自的读写接口。表名固定为 responses。
+"""
+import os
+import time
+import sqlite3
+
+
+class LruStore:
+    def __init__(self, path, schema, key_column, max_bytes):
+        """schema 为 responses 表的 CREATE TABLE 语句，必须包含 size 和 last_access 两列。"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_bytes = max_bytes
+        self.key_column = key_column
+        # 多个进程可能同时写入，等待锁而不是立即报错
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute(schema)
+        self.db.commit()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def touch(self, key):
+        """命中时刷新访问时间，淘汰时最后才轮到它。"""
+        self.db.execute(f"UPDATE responses SET last_access = ? WHERE {self.key_column} = ?", (time.time(), key))
+        self.db.commit()
+
+    def evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.db.execute(
+            f"SELECT {self.key_column}, size FROM responses ORDER BY last_access"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self.db.execute(f"DELETE FROM responses WHERE {self.key_column} = ?", (key,))
+            total -= size
+            self.evictions += 1
+        self.db.commit()
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total * 100 if total else 0.0
+
+    def stats(self):
+        """(条目数, 总字节数)"""
+        return self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,233 @@
+import os
+import re
+import zlib
+import functools
+import random
+import sqlite3
+import time
+import hashlib
+from array import array
+
+# 相似度（Jaccard 估计值）达到该阈值即视为近似重复
+THRESHOLD = float(os.getenv('NEAR_DUP_THRESHOLD', '0.8'))
+NUM_PERM = 128
+# 按字符切 shingle，中英文都适用；去掉空白和标点，排版差异不影响结果
+SHINGLE_SIZE = 5
+SEED = 1
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+_rng = random.Random(SEED)
+PERMUTATIONS = [(_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+# 计算签名时每块的 shingle 数，块内是 NUM_PERM × SIGNATURE_BLOCK 的 uint64 矩阵
+SIGNATURE_BLOCK = 4096
+
+
+def index_path(base_dir):
+    return os.path.join(base_dir, "near_dup.sqlite3")
+
+
+def shingles(text):
+    text = re.sub(r"[\W_]+", "", text.lower())
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def signature(text):
+    """MinHash 签名：NUM_PERM 个哈希函数下各 shingle 哈希值的最小值。
+
+    用 numpy 对全部 shingle 一次算完 NUM_PERM 个排列（按 SIGNATURE_BLOCK 个 shingle 分块，控制内存）。
+    a * h 最多 93 位，uint64 放不下，按 2^61 ≡ 1 (mod 2^61-1) 拆开计算，结果与逐个用 Python 大整数计算完全相同，
+    已保存的签名仍然可以比较。
+    """
+    import numpy as np
+
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles(text)), dtype=np.uint64)
+    result = np.full(NUM_PERM, MAX_HASH, dtype=np.uint64)
+    for start in range(0, len(hashes), SIGNATURE_BLOCK):
+        values = _permute(hashes[start:start + SIGNATURE_BLOCK])
+        np.minimum(result, values.min(axis=1), out=result)
+    return array("I", result.astype(np.uint32).tobytes())
+
+
+def _permute(hashes):
+    """(a * h + b) mod (2^61-1) 的低 32 位，形状为 (NUM_PERM, len(hashes))。"""
+    import numpy as np
+
+    a_high, a_low, b = _permutation_arrays()
+    h = hashes[np.newaxis, :]
+    high = a_high * h  # < 2^61
+    low = a_low * h    # < 2^64
+    # high * 2^32 = (high >> 29) * 2^61 + (high 的低 29 位) * 2^32
+    total = (high >> np.uint64(29)) + ((high & np.uint64((1 << 29) - 1)) << np.uint64(32))
+    total += (low >> np.uint64(61)) + (low & np.uint64(MERSENNE_PRIME))
+    total += b
+    return (total % np.uint64(MERSENNE_PRIME)) & np.uint64(MAX_HASH)
+
+
+@functools.lru_cache(maxsize=None)
+def _permutation_arrays():
+    import numpy as np
+
+    a = np.array([a for a, _ in PERMUTATIONS], dtype=np.uint64)[:, np.newaxis]
+    b = np.array([b for _, b in PERMUTATIONS], dtype=np.uint64)[:, np.newaxis]
+    return a >> np.uint64(32), a & np.uint64(MAX_HASH), b
+
+
+def similarity(sig_a, sig_b):
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+def lsh_params(threshold, num_perm=NUM_PERM):
+    """选 bands × rows = num_perm 的切分，使低于阈值被误召回和高于阈值被漏掉的概率之和最小。"""
+    def integrate(f, low, high, steps=200):
+        width = (high - low) / steps
+        return sum(f(low + (i + 0.5) * width) for i in range(steps)) * width
+
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        false_positive = integrate(lambda s: 1 - (1 - s ** rows) ** bands, 0.0, threshold)
+        false_negative = integrate(lambda s: (1 - s ** rows) ** bands, threshold, 1.0)
+        error = false_positive + false_negative
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class NearDupIndex:
+    """持久化的 MinHash + LSH 近似重复索引。
+
+    每篇文章的签名切成若干 band，每个 band 哈希成一个桶；查询时只比较至少落进同一个桶的文章，
+    耗时与索引大小无关。阈值变化时只按已保存的签名重建桶，不需要原文。
+
+    正在摘要的文章先用 reserve() 登记在内存里，同一次运行中的近似重复稿也会被拦下；
+    摘要写出后 commit() 才写入索引，失败时 release() 丢弃，不会挡住它自己的重试和其他近似稿。
+    """
+
+    def __init__(self, path, threshold=THRESHOLD):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.threshold = threshold
+        self.bands, self.rows = lsh_params(threshold)
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY,
+                label TEXT NOT NULL,
+                signature BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS buckets (
+                band INTEGER NOT NULL,
+                bucket BLOB NOT NULL,
+                doc_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS buckets_lookup ON buckets (band, bucket);
+            CREATE TABLE IF NOT EXISTS meta (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+        layout = f"{NUM_PERM}/{SHINGLE_SIZE}/{SEED}/{self.bands}x{self.rows}"
+        row = self.db.execute("SELECT value FROM meta WHERE name = 'layout'").fetchone()
+        if row is None or row[0] != layout:
+            self._rebuild(row[0] if row else None, layout)
+        self.db.commit()
+        self.skipped = 0
+        self.pending = {}
+
+    def _rebuild(self, old_layout, layout):
+        self.db.execute("DELETE FROM buckets")
+        if old_layout is not None and old_layout.split("/")[:3] != layout.split("/")[:3]:
+            # 签名的计算方式变了，旧签名无法比较，只能清空
+            self.db.execute("DELETE FROM documents")
+        for doc_id, blob in self.db.execute("SELECT id, signature FROM documents").fetchall():
+            self._insert_buckets(doc_id, array("I", blob))
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('layout', ?)", (layout,))
+        if old_layout is not None:
+            print(f"🔁 近似重复索引参数变化（{old_layout} -> {layout}），已重建分桶")
+
+    def _band_keys(self, sig):
+        for band in range(self.bands):
+            chunk = sig[band * self.rows:(band + 1) * self.rows]
+            yield band, hashlib.md5(chunk.tobytes()).digest()[:8]
+
+    def _insert_buckets(self, doc_id, sig):
+        self.db.executemany(
+            "INSERT INTO buckets VALUES (?, ?, ?)",
+            ((band, bucket, doc_id) for band, bucket in self._band_keys(sig)),
+        )
+
+    def query(self, sig, exclude_label=None):
+        """返回最相似且不低于阈值的 (label, 相似度)，没有则返回 None。"""
+        candidates = set()
+        for band, bucket in self._band_keys(sig):
+            candidates.update(row[0] for row in self.db.execute(
+                "SELECT doc_id FROM buckets WHERE band = ? AND bucket = ?", (band, bucket)
+            ))
+        best = None
+        for doc_id in candidates:
+            label, blob = self.db.execute("SELECT label, signature FROM documents WHERE id = ?", (doc_id,)).fetchone()
+            if label == exclude_label:
+                continue
+            score = similarity(sig, array("I", blob))
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (label, score)
+        for label, pending_sig in self.pending.items():
+            if label == exclude_label:
+                continue
+            score = similarity(sig, pending_sig)
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (label, score)
+        return best
+
+    def add(self, label, sig, commit=True):
+        doc_id = self.db.execute(
+            "INSERT INTO documents (label, signature) VALUES (?, ?)", (label, sig.tobytes())
+        ).lastrowid
+        self._insert_buckets(doc_id, sig)
+        if commit:
+            self.db.commit()
+
+    def needs_backfill(self):
+        return self.db.execute("SELECT 1 FROM meta WHERE name = 'backfilled'").fetchone() is None
+
+    def backfill(self, records):
+        """一次性收录索引建立之前就已摘要过的文章，records 为 (label, 原文)；已在索引中的 label 跳过。"""
+        started = time.perf_counter()
+        known = {row[0] for row in self.db.execute("SELECT label FROM documents")}
+        added = 0
+        for label, text in records:
+            if label in known:
+                continue
+            known.add(label)
+            self.add(label, signature(text), commit=False)
+            added += 1
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES ('backfilled', ?)", (str(added),))
+        self.db.commit()
+        print(f"🪞 近似重复索引补录历史文章 {added} 篇，耗时 {time.perf_counter() - started:.2f}s")
+        return added
+
+    def reserve(self, label, sig):
+        self.pending[label] = sig
+
+    def commit(self, label):
+        """摘要已写出，把登记的签名写入索引。"""
+        sig = self.pending.pop(label, None)
+        if sig is not None:
+            self.add(label, sig)
+
+    def release(self, label):
+        self.pending.pop(label, None)
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def report(self):
+        print(f"🪞 近似重复: 跳过 {self.skipped} 篇（省下 {self.skipped} 次摘要调用），"
+              f"阈值 {self.threshold}，索引 {len(self)} 篇，{self.bands} 段 × {self.rows} 行")
+
+    def close(self):
+        self.db.close()
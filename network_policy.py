@@ -0,0 +1,191 @@
+import os
+import glob
+import json
+import time
+from urllib.parse import urlsplit
+
+import run_metrics
+
+# 拦截策略配置文件，可用 NETWORK_POLICY_FILE 指向其他文件调优
+POLICY_FILE = os.getenv(
+    'NETWORK_POLICY_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'network_policy.json')
+)
+DEFAULT_POLICY = {
+    "block_resource_types": ["image", "font", "media"],
+    "block_stylesheets": False,
+    "block_third_party": False,
+    "block_domains": [],
+    "allow_domains": [],
+}
+
+
+def load_policy(path=POLICY_FILE):
+    policy = dict(DEFAULT_POLICY)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            policy.update(json.load(f))
+    return policy
+
+
+def host_matches(host, domains):
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+def should_block(policy, resource_type, url, site=None):
+    """按策略判断请求是否拦截；site 为源站域名，开启 block_third_party 时其他域名一律拦截。"""
+    host = urlsplit(url).hostname or ""
+    if host_matches(host, policy["allow_domains"]):
+        return False
+    if resource_type in policy["block_resource_types"]:
+        return True
+    if resource_type == "stylesheet" and policy["block_stylesheets"]:
+        return True
+    if host_matches(host, policy["block_domains"]):
+        return True
+    if policy["block_third_party"] and site and not host_matches(host, [site]):
+        return True
+    return False
+
+
+class NetworkMeter:
+    """按文章和按新闻源统计请求数、拦截数、传输字节和加载耗时。
+
+    浏览器请求按所在页面归属到文章（bind），也可以按 URL 预先登记（expect），
+    例如在列表页里发起的文章接口请求；HTTP 客户端的请求用 record_response 记录。
+    """
+
+    def __init__(self, source, policy=None):
+        self.source = source
+        self.policy = policy or load_policy()
+        self.articles = {}
+        self.totals = {"requests": 0, "blocked": 0, "bytes": 0, "cache_hits": 0}
+        self._page_labels = {}
+        self._url_labels = {}
+        self._started = {}
+        self.listings = set()  # 列表页的标签，不计入每篇文章的平均值
+        self.run_started = time.perf_counter()
+
+    def _article(self, label):
+        if label not in self.articles:
+            self.articles[label] = {"requests": 0, "blocked": 0, "bytes": 0, "cache_hits": 0, "load_seconds": None}
+        return self.articles[label]
+
+    def _count(self, label, field, amount=1):
+        self.totals[field] += amount
+        if field == "bytes":
+            run_metrics.count("bytes_downloaded", amount)
+        if label is not None:
+            self._article(label)[field] += amount
+
+    def listing(self, label):
+        """把 label 登记为列表页（首页、栏目页），返回 label 本身，可直接传给 bind/record_response。"""
+        self.listings.add(label)
+        return label
+
+    def bind(self, page, label):
+        self._page_labels[page] = label
+
+    def expect(self, url, label):
+        self._url_labels[url] = label
+
+    def start(self, label):
+        self._article(label)
+        self._started[label] = time.perf_counter()
+
+    def finish(self, label):
+        started = self._started.pop(label, None)
+        if started is not None:
+            self._article(label)["load_seconds"] = round(time.perf_counter() - started, 3)
+
+    def label_for(self, request):
+        if request.url in self._url_labels:
+            return self._url_labels[request.url]
+        try:
+            return self._page_labels.get(request.frame.page)
+        except Exception:
+            return None  # service worker 等没有页面的请求
+
+    def record_response(self, label, response, seconds=None):
+        """记录一次 HTTP 客户端请求；缓存命中（304）时正文不计入传输字节。"""
+        self._count(label, "requests")
+        run_metrics.count("pages_fetched")
+        if response.extensions.get("from_cache"):
+            self._count(label, "cache_hits")
+        else:
+            self._count(label, "bytes", len(response.content))
+        if seconds is not None and label is not None:
+            self._article(label)["load_seconds"] = round(seconds, 3)
+
+    async def install(self, context, cache=None, site=None):
+        """在浏览器上下文上安装拦截策略（可叠加响应缓存）并开始计量。"""
+
+        async def handle_route(route):
+            request = route.request
+            if should_block(self.policy, request.resource_type, request.url, site):
+                self._count(self.label_for(request), "blocked")
+                await route.abort()
+            elif cache is not None:
+                await cache.handle_route(route)
+            else:
+                await route.continue_()
+
+        async def on_finished(request):
+            label = self.label_for(request)
+            self._count(label, "requests")
+            if request.resource_type == "document":
+                run_metrics.count("pages_fetched")
+            try:
+                sizes = await request.sizes()
+                self._count(label, "bytes", sizes["responseBodySize"] + sizes["responseHeadersSize"])
+            except Exception:
+                pass
+
+        def on_failed(request):
+            # 被拦截的请求已经计入 blocked，这里只统计真正失败的请求
+            if request.failure and "ERR_FAILED" not in request.failure:
+                self._count(self.label_for(request), "requests")
+
+        context.on("requestfinished", on_finished)
+        context.on("requestfailed", on_failed)
+        await context.route("**/*", handle_route)
+
+    def summary(self):
+        articles = {label: stats for label, stats in self.articles.items() if label not in self.listings}
+        loads = [a["load_seconds"] for a in articles.values() if a["load_seconds"] is not None]
+        return {
+            "source": self.source,
+            "policy": self.policy,
+            "wall_seconds": round(time.perf_counter() - self.run_started, 3),
+            "totals": dict(self.totals),
+            "articles": len(articles),
+            "article_totals": {field: sum(a[field] for a in articles.values())
+                               for field in ("requests", "blocked", "bytes", "cache_hits")},
+            "avg_load_seconds": round(sum(loads) / len(loads), 3) if loads else None,
+            "listings": {label: self.articles[label] for label in self.listings if label in self.articles},
+            "per_article": articles,
+        }
+
+    def write_summary(self, base_dir):
+        """把本次运行的统计写到 spiders/ai_news/network_stats/{source}_latest.json（覆盖上一次），并打印概要。
+
+        每篇平均值只按文章自己的请求计算，列表页和无法归属的请求只计入总数。
+        """
+        summary = self.summary()
+        stats_dir = os.path.join(base_dir, "network_stats")
+        os.makedirs(stats_dir, exist_ok=True)
+        # 旧版本每次运行写一个带时间戳的文件，目录会无限增长，这里顺手清掉
+        for old_path in glob.glob(os.path.join(stats_dir, f"{glob.escape(self.source)}_[0-9]*_[0-9]*.json")):
+            os.remove(old_path)
+        path = os.path.join(stats_dir, f"{self.source}_latest.json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        totals = summary["totals"]
+        article_totals = summary["article_totals"]
+        count = max(summary["articles"], 1)
+        print(f"📶 [{self.source}] 请求 {totals['requests']} 次，拦截 {totals['blocked']} 次，"
+              f"缓存命中 {totals['cache_hits']} 次，传输 {totals['bytes'] / 1024:.1f} KB，"
+              f"平均每篇 {article_totals['requests'] / count:.1f} 次请求 / {article_totals['bytes'] / count / 1024:.1f} KB")
+        print(f"   统计已写入: {path}")
+        return path
@@ -0,0 +1,451 @@
+import os
+import sys
+import json
+import time
+import asyncio
+from urllib.parse import urlsplit
+
+from http_cache import HttpCache, cache_path
+from seen_store import SeenStore, store_path
+from network_policy import NetworkMeter
+import run_metrics
+
+hugo_project_path = os.getenv('HUGO_PROJECT_PATH', '.')
+base_dir = os.path.join(hugo_project_path, 'spiders', 'ai_news')
+CONFIG_FILE = os.getenv('NEWS_SOURCES_CONFIG', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sources.json'))
+HEADLESS = os.getenv('HEADLESS', 'true').lower() != 'false'
+# 为 true 时在运行结束前为每个用到浏览器的源各启动、关闭一次 Chromium，实测“每个源各启动一次”的耗时；
+# 默认按本次共享启动的耗时估算，不额外启动浏览器
+BROWSER_STARTUP_BENCH = os.getenv('NEWS_BROWSER_STARTUP_BENCH', 'false').lower() == 'true'
+HTTP_HEADERS = {
+    "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                   "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"),
+    "Accept-Language": "en-US,en;q=0.9,zh-CN;q=0.8",
+}
+
+# 新闻源类型注册表：type 名称 -> 插件类
+SOURCE_TYPES = {}
+
+
+def register_source(type_name):
+    def decorator(cls):
+        SOURCE_TYPES[type_name] = cls
+        return cls
+    return decorator
+
+
+class SourceSession:
+    """一次运行中所有新闻源共享的资源：HTTP 连接池、响应缓存、已见索引和按需启动的浏览器。"""
+
+    def __init__(self, base_dir, max_connections=32):
+        import httpx
+
+        self.base_dir = base_dir
+        os.makedirs(base_dir, exist_ok=True)
+        self.cache = HttpCache(cache_path(base_dir))
+        self.seen = SeenStore(store_path(base_dir))
+        self.http = httpx.AsyncClient(
+            http2=True,
+            headers=HTTP_HEADERS,
+            timeout=httpx.Timeout(30.0),
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self._playwright = None
+        self._browser = None
+        self._browser_lock = asyncio.Lock()
+        self.launch_seconds = None
+        self.browser_users = set()  # 用到浏览器的新闻源
+
+    async def get(self, url, meter=None):
+        started = time.perf_counter()
+        response = await self.cache.fetch(self.http, url)
+        if meter is not None:
+            meter.record_response(url, response, time.perf_counter() - started)
+        response.raise_for_status()
+        return response
+
+    async def new_context(self, meter, site=None):
+        """第一次需要浏览器时才启动，所有用浏览器的新闻源共用这一个 Chromium，各自拿到独立的上下文。"""
+        async with self._browser_lock:
+            if self._browser is None:
+                from playwright.async_api import async_playwright
+
+                self._playwright = await async_playwright().start()
+                started = time.perf_counter()
+                self._browser = await self._playwright.chromium.launch(headless=HEADLESS)
+                self.launch_seconds = time.perf_counter() - started
+                print(f"🚀 已启动浏览器，耗时 {self.launch_seconds:.2f}s")
+            self.browser_users.add(meter.source)
+        context = await self._browser.new_context()
+        # 按共享策略拦截非必要资源并计量，页面和接口走磁盘缓存
+        await meter.install(context, self.cache, site=site)
+        return context
+
+    async def render(self, context, url, selector, meter):
+        """用浏览器打开页面并返回选择器匹配元素的文本，页面用完即关。"""
+        page = await context.new_page()
+        meter.bind(page, url)
+        meter.start(url)
+        try:
+            await page.goto(url, timeout=60000)
+            await page.wait_for_selector(selector, timeout=10000)
+            return await page.locator(selector).all_inner_texts()
+        finally:
+            meter.finish(url)
+            await page.close()
+
+    async def report_browser_startup(self):
+        """对比共享一个 Chromium 与每个源各启动一个（AI_MITNews.py / AI_jiqizhixin.py 单独运行时的做法）的启动耗时。"""
+        if self._browser is None:
+            return None
+        users = len(self.browser_users)
+        if BROWSER_STARTUP_BENCH:
+            separate = 0.0
+            for _ in range(users):
+                started = time.perf_counter()
+                browser = await self._playwright.chromium.launch(headless=HEADLESS)
+                separate += time.perf_counter() - started
+                await browser.close()
+            how = "实测"
+        else:
+            separate = self.launch_seconds * users
+            how = "按本次启动耗时估算"
+        saved = separate - self.launch_seconds
+        print(f"🧭 浏览器启动: 共享启动 1 次 {self.launch_seconds:.2f}s；{users} 个源各启动一次{how}需 {separate:.2f}s，"
+              f"节省 {saved:.2f}s")
+        return {"shared": self.launch_seconds, "separate": separate, "saved": saved, "sources": users}
+
+    async def close(self):
+        await self.http.aclose()
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self.cache.report()
+        self.cache.close()
+        self.seen.close()
+
+
+class NewsSource:
+    """新闻源插件接口。
+
+    子类实现 list_items（列表页或接口，返回至少含 url 的条目）和 extract（把条目变成输出行，
+    返回 None 表示跳过）。dedup_kind/dedup_key 决定在已见索引中用什么去重：能从条目上算出的键
+    在抓取前过滤，只能从输出行上算出的键（例如标题）在写入前过滤。
+    """
+
+    dedup_kind = "url"
+    # 源站域名，用于网络策略中的第三方判断
+    site = None
+
+    def __init__(self, name, output, concurrency=4, timeout=600, **options):
+        self.name = name
+        self.output = output
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.options = options
+        self._context = None
+        self._context_lock = asyncio.Lock()
+        self.meter = NetworkMeter(name)
+
+    async def browser_context(self, session):
+        """该源专用的浏览器上下文，并发提取时只创建一次。"""
+        async with self._context_lock:
+            if self._context is None:
+                self._context = await session.new_context(self.meter, site=self.site)
+        return self._context
+
+    async def list_items(self, session):
+        raise NotImplementedError
+
+    async def extract(self, session, item):
+        raise NotImplementedError
+
+    def dedup_key(self, record):
+        return record.get("url")
+
+    async def close(self, session):
+        pass
+
+
+@register_source("mit_news")
+class MitNewsSource(NewsSource):
+    """MIT News：HTTP 解析首页和正文，正文选择器缺失时用浏览器渲染。"""
+
+    site = "news.mit.edu"
+
+    async def list_items(self, session):
+        import AI_MITNews
+
+        self.meter.listing(AI_MITNews.BASE_URL)
+        response = await session.get(AI_MITNews.BASE_URL, self.meter)
+        teasers = AI_MITNews.parse_teasers(response.text, set()) or []
+        return [{"title": title, "url": url} for title, url in teasers]
+
+    async def extract(self, session, item):
+        import httpx
+        import AI_MITNews
+
+        try:
+            content = AI_MITNews.parse_article((await session.get(item["url"], self.meter)).text)
+        except httpx.HTTPError as e:
+            print(f"↩️ [{self.name}] HTTP 抓取失败，改用浏览器：{item['url']} - {e}")
+            content = None
+        if content is None:
+            context = await self.browser_context(session)
+            paragraphs = await session.render(context, item["url"], AI_MITNews.ARTICLE_SELECTOR, self.meter)
+            content = "\n\n".join(paragraphs)
+        return {"title": item["title"], "url": item["url"], "content": content.strip()}
+
+
+@register_source("jiqizhixin")
+class JiqizhixinSource(NewsSource):
+    """机器之心：浏览器加载一次列表页，再在页面内并发请求文章接口。按规范化标题去重，按水位线增量抓取。
+
+    只支持接口模式；JIQIZHIXIN_MODE=click 或列表卡片没有链接时直接报错，逐篇点击请运行 AI_jiqizhixin.py。
+    """
+
+    dedup_kind = "title"
+    site = "jiqizhixin.com"
+
+    def dedup_key(self, record):
+        return record.get("title")
+
+    async def list_items(self, session):
+        import AI_jiqizhixin
+
+        if AI_jiqizhixin.CRAWL_MODE != "api":
+            raise RuntimeError(f"每日流水线只支持接口模式，JIQIZHIXIN_MODE={AI_jiqizhixin.CRAWL_MODE}")
+        context = await self.browser_context(session)
+        self._page = await context.new_page()
+        self.meter.bind(self._page, self.meter.listing(AI_jiqizhixin.LIST_URL))
+        await self._page.goto(AI_jiqizhixin.LIST_URL, timeout=60000)
+        self._watermark = AI_jiqizhixin.load_watermark()
+        articles = await AI_jiqizhixin.discover_articles(self._page, self._watermark)
+        if articles is None:
+            raise RuntimeError("列表页卡片中没有文章链接")
+        self._articles = articles
+        self._done = {}
+        return [{"id": article_id, "url": url} for article_id, url in articles]
+
+    async def extract(self, session, item):
+        import AI_jiqizhixin
+        from html_extract import extract_text
+
+        api_url = AI_jiqizhixin.API_URL + item["id"]
+        self.meter.expect(api_url, item["url"])
+        self.meter.start(item["url"])
+        try:
+            result = (await self._page.evaluate(AI_jiqizhixin.FETCH_BATCH_JS, [api_url]))[0]
+        finally:
+            self.meter.finish(item["url"])
+        if "data" not in result:
+            print(f"⚠️ [{self.name}] 接口请求失败，跳过文章 {item['id']}: {result.get('error') or result.get('status')}")
+            return None
+        data = result["data"]
+        self._done[item["id"]] = data.get("published_at")
+        if not data.get("title") or not data.get("content"):
+            return None
+        AI_jiqizhixin.save_html_sample(item["url"], data["content"])
+        return {
+            "title": data["title"],
+            "published_at": data.get("published_at"),
+            "url": item["url"],
+            "content": extract_text(data["content"]),
+        }
+
+    async def close(self, session):
+        import AI_jiqizhixin
+
+        page = getattr(self, "_page", None)
+        if page is not None:
+            self._page = None
+            try:
+                await page.close()
+            except Exception as e:
+                print(f"⚠️ [{self.name}] 关闭列表页失败: {e}")
+        if not hasattr(self, "_articles"):
+            return
+        watermark = AI_jiqizhixin.advance_watermark(self._watermark, self._articles, self._done)
+        if watermark is not self._watermark:
+            AI_jiqizhixin.save_watermark(watermark)
+            print(f"🔖 [{self.name}] 水位线更新为 {watermark['id']}")
+
+
+@register_source("html")
+class HtmlListingSource(NewsSource):
+    """只靠配置接入的通用源：listing_url + link_selector 找文章，content_selector 取正文段落。
+
+    可选项：base_url（补全相对链接）、title_selector（在链接内取标题）、render（为 true 时用浏览器渲染正文）。
+    """
+
+    def __init__(self, name, output, **options):
+        super().__init__(name, output, **options)
+        self.site = urlsplit(self.options["listing_url"]).hostname
+
+    async def list_items(self, session):
+        from bs4 import BeautifulSoup
+
+        listing_url = self.options["listing_url"]
+        self.meter.listing(listing_url)
+        soup = BeautifulSoup((await session.get(listing_url, self.meter)).text, "html.parser")
+        base_url = self.options.get("base_url", "")
+        items = []
+        seen = set()
+        for link in soup.select(self.options["link_selector"]):
+            href = link.get("href")
+            title_node = link.select_one(self.options["title_selector"]) if self.options.get("title_selector") else link
+            title = title_node.get_text(" ", strip=True) if title_node else ""
+            if not href or not title:
+                continue
+            url = href if href.startswith("http") else base_url + href
+            if url not in seen:
+                seen.add(url)
+                items.append({"title": title, "url": url})
+        return items
+
+    async def extract(self, session, item):
+        selector = self.options["content_selector"]
+        if self.options.get("render"):
+            context = await self.browser_context(session)
+            texts = await session.render(context, item["url"], selector, self.meter)
+        else:
+            from bs4 import BeautifulSoup
+
+            soup = BeautifulSoup((await session.get(item["url"], self.meter)).text, "html.parser")
+            texts = [node.get_text().strip() for node in soup.select(selector)]
+        content = "\n\n".join(t for t in texts if t)
+        if not content:
+            print(f"⚠️ [{self.name}] 未找到正文，跳过：{item['url']}")
+            return None
+        return {"title": item["title"], "url": item["url"], "content": content}
+
+
+def load_sources(config_file=CONFIG_FILE):
+    """读取 sources.json，按 type 实例化插件；enabled 为 false 的源会被跳过。"""
+    with open(config_file, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    defaults = config.get("defaults", {})
+    sources = []
+    for entry in config["sources"]:
+        entry = {**defaults, **entry}
+        if not entry.pop("enabled", True):
+            continue
+        type_name = entry.pop("type")
+        if type_name not in SOURCE_TYPES:
+            raise ValueError(f"未知的新闻源类型: {type_name}")
+        sources.append(SOURCE_TYPES[type_name](**entry))
+    return sources
+
+
+async def run_source(source, session, on_row=None):
+    """抓取单个新闻源：条目在并发上限内提取，由唯一的写入任务追加到该源的 JSONL。
+
+    source.timeout 只限制列表和正文的抓取。写入任务在 on_row 里等待下游（流水线摘要队列满时的背压）的时间
+    不计入超时，摘要慢或被限流时不会让正常的新闻源“超时”；超时后已抓到的文章仍会写出。
+    """
+    output_file = os.path.join(session.base_dir, source.output)
+    seen = session.seen.attach(
+        source.name, output_file, lambda record: [(source.dedup_kind, source.dedup_key(record))]
+    ).view(source.name, source.dedup_kind)
+
+    # 抓取结果的队列不设上限，抓取协程不会因为写入任务在等下游而阻塞
+    results = asyncio.Queue()
+    stats = {"listed": 0, "saved": 0, "failed": 0}
+
+    async def writer():
+        with open(output_file, "a", encoding="utf-8") as f:
+            while True:
+                row = await results.get()
+                if row is None:
+                    break
+                key = source.dedup_key(row)
+                if key and key in seen:
+                    print(f"⏭️ [{source.name}] 已存在，跳过：{row['title']}")
+                    continue
+                line = json.dumps(row, ensure_ascii=False) + "\n"
+                f.write(line)
+                f.flush()
+                if key:
+                    seen.add(key)
+                stats["saved"] += 1
+                run_metrics.count("articles_scraped")
+                run_metrics.count("bytes_written", len(line.encode("utf-8")))
+                print(f"✅ [{source.name}] 已保存：{row['title']}")
+                if on_row is not None:
+                    await on_row(source.name, row)
+
+    sem = asyncio.Semaphore(source.concurrency)
+
+    async def fetch(item):
+        async with sem:
+            try:
+                row = await source.extract(session, item)
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"❌ [{source.name}] 抓取失败: {item['url']} - {e}")
+                return
+            if row:
+                await results.put(row)
+
+    async def crawl():
+        items = await source.list_items(session)
+        stats["listed"] = len(items)
+        pending = []
+        for item in items:
+            key = source.dedup_key(item)
+            if key and key in seen:
+                continue
+            pending.append(item)
+        print(f"🧮 [{source.name}] 列表 {len(items)} 篇，待抓取 {len(pending)} 篇，并发 {source.concurrency}")
+        await asyncio.gather(*(fetch(item) for item in pending))
+
+    writer_task = asyncio.create_task(writer())
+    try:
+        await asyncio.wait_for(crawl(), timeout=source.timeout)
+    finally:
+        await results.put(None)
+        await writer_task
+        session.seen.commit()
+        await source.close(session)
+        source.meter.write_summary(session.base_dir)
+    return stats
+
+
+async def run_sources(sources, on_row=None, base_dir=base_dir):
+    """在同一个事件循环中并发运行所有新闻源，每个源有自己的并发上限和抓取超时。返回各源结果。"""
+    session = SourceSession(base_dir)
+    started = time.perf_counter()
+
+    async def run_one(source):
+        source_started = time.perf_counter()
+        try:
+            stats = await run_source(source, session, on_row)
+            status = "ok"
+        except asyncio.TimeoutError:
+            stats, status = {}, "timeout"
+            print(f"⌛ [{source.name}] 超过 {source.timeout}s，已中止")
+        except Exception as e:
+            stats, status = {}, "error"
+            print(f"❌ [{source.name}] 运行失败: {e}")
+        return {"source": source.name, "status": status, "seconds": round(time.perf_counter() - source_started, 2), **stats}
+
+    try:
+        results = await asyncio.gather(*(run_one(source) for source in sources))
+        await session.report_browser_startup()
+    finally:
+        await session.close()
+
+    print(f"\n📊 新闻源汇总（总耗时 {time.perf_counter() - started:.2f}s）")
+    for result in results:
+        print(f"   {result['source']}: {result['status']}，{result['seconds']}s，"
+              f"保存 {result.get('saved', 0)} 篇，失败 {result.get('failed', 0)} 篇")
+    return results
+
+
+if __name__ == "__main__":
+    results = asyncio.run(run_sources(load_sources()))
+    # 与原来逐个运行爬虫脚本时一致：任何一个源失败都以非零状态退出
+    if any(result["status"] != "ok" for result in results):
+        sys.exit(1)
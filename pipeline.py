@@ -0,0 +1,139 @@
+"""进程内的流式每日流程，取代逐个启动子进程的阶段串行。
+
+爬虫（news_sources）并发运行，每写出一篇文章就放进有界的 asyncio 队列，摘要协程立即取走生成摘要，
+摘要写出后马上生成当天的 Hugo 文章。队列满时爬虫在写入处等待，内存占用不随积压增长。
+总耗时接近最慢的阶段，而不是各阶段之和。
+
+失败语义与原来一致：任一新闻源失败或摘要阶段异常时立即取消其余阶段、不再生成文章和推送，以非零状态退出。
+"""
+import os
+import sys
+import time
+import asyncio
+
+import run_metrics
+
+# 爬虫与摘要之间的队列长度，超出后爬虫等待摘要跟上（背压）
+QUEUE_SIZE = max(1, int(os.getenv('PIPELINE_QUEUE_SIZE', '16')))
+
+
+async def stream_stages(sources, posts, timings):
+    """并发运行爬虫和流式摘要；返回是否全部成功。"""
+    import news_sources
+    import AI_summary
+    import daily_md_generator
+
+    # 只把 AI_summary 原本会读取的输入文件对应的新闻源接入摘要
+    summary_inputs = {os.path.basename(path) for path in AI_summary.input_files}
+    streamed = {source.name for source in sources if os.path.basename(source.output) in summary_inputs}
+    # 批任务模式需要攒齐再提交，不走队列，由爬虫结束后的补齐阶段处理
+    stream_summaries = AI_summary.SUMMARY_MODE != "batch"
+    queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    started = time.perf_counter()
+
+    async def on_row(source_name, row):
+        if stream_summaries and source_name in streamed:
+            await queue.put(row)  # 队列满时该源的写入任务在这里等待，不计入新闻源的抓取超时
+
+    def on_written(record):
+        daily_md_generator.write_streamed_post(posts, AI_summary.output_file, record)
+
+    async def scrape():
+        try:
+            results = await news_sources.run_sources(sources, on_row)
+        finally:
+            timings["scrape"] = time.perf_counter() - started
+        await queue.put(None)
+        return results
+
+    async def summarize():
+        await AI_summary.summarize_queue(queue, on_written)
+        timings["summarize"] = time.perf_counter() - started
+
+    scrape_task = asyncio.create_task(scrape())
+    summarize_task = asyncio.create_task(summarize())
+    pending = {scrape_task, summarize_task}
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        failure = None
+        for task in done:
+            if task.exception() is not None:
+                stage = "爬虫" if task is scrape_task else "摘要"
+                failure = f"{stage}阶段出错: {task.exception()!r}"
+            elif task is scrape_task and any(result["status"] != "ok" for result in task.result()):
+                failure = "有新闻源运行失败"
+        if failure:
+            # 与逐个运行脚本时一致：一个阶段失败就中止整个流程
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            print(f"❌ {failure}，中止流程")
+            return False
+    return True
+
+
+def run_stages(metrics):
+    import news_sources
+    import AI_summary
+    import daily_md_generator
+    import auto_push_github
+
+    print(f"🚀 开始执行每日构建流程（进程内流式，队列长度 {QUEUE_SIZE}）...")
+    started = time.perf_counter()
+    timings = {}
+    sources = news_sources.load_sources()
+    AI_summary.setup()
+    daily_md_generator.setup()
+    posts = daily_md_generator.open_today_posts()
+    if os.path.exists(AI_summary.output_file):
+        # 先处理上次运行写出但还没生成文章的摘要，断点推到文件末尾，之后流式写出的摘要才能逐条推进断点
+        daily_md_generator.process_new_summaries(posts, AI_summary.output_file)
+
+    try:
+        # 爬虫和摘要在同一个事件循环里交错运行，CPU 时间和内存无法再拆分，记为一个阶段
+        with metrics.stage("scrape+summarize") as record:
+            ok = asyncio.run(stream_stages(sources, posts, timings))
+            record.update({"scrape_wall_s": round(timings.get("scrape", 0), 3),
+                           "summarize_wall_s": round(timings.get("summarize", 0), 3)})
+            if not ok:
+                record["status"] = "failed"
+        if ok:
+            # 补齐：批任务模式、上次失败的文章等没有经过队列的新文章，同时推进输入文件断点
+            with metrics.stage("catch_up") as record:
+                AI_summary.summarize_pending(
+                    lambda summary: daily_md_generator.write_streamed_post(posts, AI_summary.output_file, summary))
+            timings["catch_up"] = record["wall_s"]
+    finally:
+        AI_summary.teardown()
+    if not ok:
+        sys.exit(1)
+
+    # 与单独运行 daily_md_generator.py 相同，再从断点过一遍摘要文件；流式阶段已推进断点，这里只处理漏掉的记录
+    with metrics.stage("markdown") as record:
+        daily_md_generator.generate_daily_news_folders(posts)
+    timings["markdown"] = record["wall_s"]
+
+    print(f"\n⏱️ 爬虫 {timings['scrape']:.2f}s，流式摘要 {timings['summarize']:.2f}s（与爬虫重叠），"
+          f"补齐 {timings['catch_up']:.2f}s，文章生成 {timings['markdown']:.2f}s，"
+          f"推送前总耗时 {time.perf_counter() - started:.2f}s")
+    with metrics.stage("push"):
+        auto_push_github.main()
+    print("\n🎉 所有阶段执行完毕。")
+
+
+def main():
+    metrics = run_metrics.RunMetrics("stream")
+    try:
+        run_stages(metrics)
+    except BaseException:
+        metrics.status = "failed"
+        raise
+    finally:
+        # 失败的运行也写出指标，但不会被用作以后的基线
+        regressed = metrics.finish()
+    if regressed and run_metrics.FAIL_ON_REGRESSION:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,390 @@
+"""已生成文章的清单：content/post/.post_manifest.sqlite3 记录每篇文章的标题哈希、内容哈希、目录、slug 和日期。
+
+文章有两种来源（kind）：bundle 是 content/post/YYYY_MM_DD/NN_slug/index.md；adapter 是 data/posts/YYYY_MM_DD.json
+中的一条记录，由 Hugo 内容适配器生成页面，目录记为 YYYY_MM_DD/slug。两种文章一起参与去重。
+
+daily_md_generator 写出文章时同步登记，去重直接按索引查询，不再每次读取近几天所有的 index.md。
+启动时按修改时间与文件系统对齐：日期目录的修改时间没变就整目录跳过，变了才逐篇比较 index.md 的修改时间，
+只有新增或改过的文章才会重新解析，删掉的文章从清单中移除。只在目录里改写 index.md 而不增删文章时，
+日期目录的修改时间不变，需要用 --full 全量核对。
+
+去重覆盖全部历史文章：每篇文章的标题哈希和内容哈希（键 t:<哈希> / c:<哈希>）同时装入一个布隆过滤器，
+位图保存在同一个库的 bloom 表里。绝大多数新文章在过滤器里就能判定为“没见过”，不必查询 SQLite；
+过滤器命中时再按索引精确确认，误判只会多一次查询（参数和误判率见 bloom_filter.py）。
+新登记的键先写入 bloom_pending 表，与文章记录在同一个事务里提交，关闭清单时才把位图整体写回并清空该表，
+进程中途退出也不会漏判。删除的文章仍留在过滤器里，只会增加误判；用 --rebuild 可按文件系统重建。
+
+用法:
+    python post_manifest.py             # 与文件系统对齐并打印统计
+    python post_manifest.py --full      # 忽略修改时间，重新解析全部文章
+    python post_manifest.py --rebuild   # 全量重新解析 content/post，并从清单重建布隆过滤器
+"""
+import os
+import re
+import sys
+import json
+import sqlite3
+
+try:
+    import tomllib  # Python 3.11+
+except ImportError:
+    import tomli as tomllib
+
+from bloom_filter import BloomFilter
+from seen_store import position_valid, tail_digest
+from text_hash import content_hash, title_hash
+
+MANIFEST_NAME = ".post_manifest.sqlite3"  # 以点开头，Hugo 不会把它当作内容
+DAY_DIR = re.compile(r"^\d{4}_\d{2}_\d{2}$")
+TITLE_LINE = re.compile(r"^title\s*=\s*'((?:[^']|'')*)'", re.MULTILINE)
+SLUG_LINE = re.compile(r'^slug\s*=\s*"([^"]*)"', re.MULTILINE)
+BODY = re.compile(r'^\+\+\+\n.*?\+\+\+\n(.*)', re.DOTALL)
+FRONT_MATTER = re.compile(r'^\+\+\+\n(.*?)\+\+\+\n', re.DOTALL)
+DATA_FILE = re.compile(r"^(\d{4}_\d{2}_\d{2})\.json$")
+# 布隆过滤器的初始容量（键数，每篇文章两个键）和目标误判率；键数超过容量时按两倍容量重建
+BLOOM_CAPACITY = int(os.getenv('POST_BLOOM_CAPACITY', '200000'))
+BLOOM_ERROR_RATE = float(os.getenv('POST_BLOOM_ERROR_RATE', '0.001'))
+# 哈希规则的版本（记在 PRAGMA user_version）。早先写出文章时对原始摘要取内容哈希，与解析 index.md 得到的不一致，
+# 版本落后时下一次对齐按 full=True 重新解析全部文章
+HASH_VERSION = 1
+
+
+def manifest_path(target_root):
+    return os.path.join(target_root, MANIFEST_NAME)
+
+
+def parse_post(index_path):
+    """从 index.md 中取出标题、slug 和正文摘要（<!--more--> 之前的部分），缺失的字段为 None。"""
+    with open(index_path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    body_match = BODY.search(text)
+    summary = body_match.group(1).split("<!--more-->")[0].strip() if body_match else None
+    front_match = FRONT_MATTER.search(text)
+    try:
+        fields = tomllib.loads(front_match.group(1)) if front_match else {}
+        return fields.get("title"), fields.get("slug"), summary
+    except tomllib.TOMLDecodeError:
+        pass
+    # 旧版手写的 front matter 在摘要含换行或引号时不是合法的 TOML，逐行取标题和 slug
+    title_match = TITLE_LINE.search(text)
+    slug_match = SLUG_LINE.search(text)
+    title = title_match.group(1).replace("''", "'") if title_match else None
+    slug = slug_match.group(1) if slug_match else None
+    return title, slug, summary
+
+
+def bloom_keys(t_hash, c_hash):
+    return [key for key in (t_hash and f"t:{t_hash}", c_hash and f"c:{c_hash}") if key]
+
+
+def body_summary(content):
+    """正文中 <!--more--> 之前的部分，与 bundle 文章的解析方式一致。"""
+    return content.split("<!--more-->")[0].strip()
+
+
+class PostManifest:
+    def __init__(self, target_root, data_dir=None):
+        os.makedirs(target_root, exist_ok=True)
+        self.root = target_root
+        self.data_dir = data_dir
+        self.db = sqlite3.connect(manifest_path(target_root), timeout=30)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS posts (
+                folder TEXT PRIMARY KEY,
+                day TEXT NOT NULL,
+                slug TEXT,
+                title TEXT,
+                title_hash TEXT,
+                content_hash TEXT,
+                mtime_ns INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS posts_title ON posts (title_hash);
+            CREATE INDEX IF NOT EXISTS posts_content ON posts (content_hash);
+            CREATE INDEX IF NOT EXISTS posts_day ON posts (day);
+            CREATE TABLE IF NOT EXISTS days (
+                day TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                path TEXT PRIMARY KEY,
+                offset INTEGER NOT NULL,
+                tail_hash TEXT NOT NULL,
+                last_title TEXT
+            );
+            CREATE TABLE IF NOT EXISTS bloom (
+                name TEXT PRIMARY KEY,
+                capacity INTEGER NOT NULL,
+                error_rate REAL NOT NULL,
+                count INTEGER NOT NULL,
+                bits BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS bloom_pending (
+                key TEXT NOT NULL
+            );
+        """)
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(posts)")]
+        if "kind" not in columns:
+            self.db.execute("ALTER TABLE posts ADD COLUMN kind TEXT NOT NULL DEFAULT 'bundle'")
+        self.db.commit()
+        self.parsed = 0
+        self.scanned_days = 0
+        self.bloom_skipped = 0  # 过滤器判定为没见过、省掉的查询
+        self.bloom_hits = 0     # 过滤器命中且清单确认重复
+        self.bloom_false = 0    # 过滤器命中但清单里没有（误判或文章已删除）
+        self._bloom_dirty = False
+        self._load_bloom()
+        self._stale_hashes = self.db.execute("PRAGMA user_version").fetchone()[0] < HASH_VERSION
+
+    def _load_bloom(self):
+        row = self.db.execute("SELECT capacity, error_rate, count, bits FROM bloom WHERE name = 'posts'").fetchone()
+        if row is None or row[1] != BLOOM_ERROR_RATE or row[0] < BLOOM_CAPACITY:
+            self.rebuild_bloom()
+            return
+        self.bloom = BloomFilter(row[0], row[1], row[3], row[2])
+        # 上次没能写回位图的键（进程中途退出）
+        for (key,) in self.db.execute("SELECT key FROM bloom_pending"):
+            self.bloom.add(key)
+            self._bloom_dirty = True
+
+    def rebuild_bloom(self, capacity=BLOOM_CAPACITY):
+        """用清单里的全部文章重建布隆过滤器，容量不足时翻倍。"""
+        rows = self.db.execute("SELECT title_hash, content_hash FROM posts").fetchall()
+        keys = {key for t_hash, c_hash in rows for key in bloom_keys(t_hash, c_hash)}
+        while len(keys) > capacity:
+            capacity *= 2
+        self.bloom = BloomFilter(capacity, BLOOM_ERROR_RATE)
+        for key in keys:
+            self.bloom.add(key)
+        self._save_bloom()
+
+    def _save_bloom(self):
+        self.db.execute("INSERT OR REPLACE INTO bloom VALUES ('posts', ?, ?, ?, ?)", (
+            self.bloom.capacity, self.bloom.error_rate, self.bloom.count, bytes(self.bloom.bits),
+        ))
+        self.db.execute("DELETE FROM bloom_pending")
+        self.db.commit()
+        self._bloom_dirty = False
+
+    def _insert(self, folder, day, slug, title, t_hash, c_hash, mtime, kind):
+        # 键与文章记录在同一个事务里提交，位图在 close() 时才写回
+        self.db.execute("INSERT OR REPLACE INTO posts VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (folder, day, slug, title, t_hash, c_hash, mtime, kind))
+        for key in bloom_keys(t_hash, c_hash):
+            if key not in self.bloom:
+                self.db.execute("INSERT INTO bloom_pending VALUES (?)", (key,))
+                self.bloom.add(key)
+                self._bloom_dirty = True
+
+    def _relative(self, post_folder):
+        return os.path.relpath(post_folder, self.root).replace(os.sep, "/")
+
+    def _absolute(self, folder):
+        return os.path.join(self.root, *folder.split("/"))
+
+    def _data_file(self, day):
+        return os.path.join(self.data_dir, f"{day}.json")
+
+    def _touch_day(self, day, kind="bundle"):
+        # days 表里 bundle 的日期目录记为 YYYY_MM_DD，adapter 的数据文件记为 data/YYYY_MM_DD
+        if kind == "bundle":
+            key, path = day, os.path.join(self.root, day)
+        else:
+            key, path = f"data/{day}", self._data_file(day)
+        self.db.execute("INSERT OR REPLACE INTO days VALUES (?, ?)", (key, os.stat(path).st_mtime_ns))
+
+    def reconcile(self, full=False):
+        """与 content/post（以及 data/posts）对齐；full=True 时忽略修改时间，重新解析全部文章。"""
+        if self._stale_hashes and not full:
+            print("🔁 文章清单的哈希规则已更新，重新解析全部文章")
+            full = True
+        known_days = dict(self.db.execute("SELECT day, mtime_ns FROM days"))
+        present = set()
+        for entry in os.scandir(self.root):
+            if not entry.is_dir() or not DAY_DIR.match(entry.name):
+                continue
+            present.add(entry.name)
+            if not full and known_days.get(entry.name) == entry.stat().st_mtime_ns:
+                continue
+            self._reconcile_day(entry.name, full)
+            self._touch_day(entry.name)
+            self.scanned_days += 1
+        if self.data_dir and os.path.isdir(self.data_dir):
+            for entry in os.scandir(self.data_dir):
+                match = DATA_FILE.match(entry.name)
+                if not match:
+                    continue
+                present.add(f"data/{match.group(1)}")
+                if not full and known_days.get(f"data/{match.group(1)}") == entry.stat().st_mtime_ns:
+                    continue
+                self._reconcile_data(match.group(1))
+                self._touch_day(match.group(1), "adapter")
+                self.scanned_days += 1
+        for key in set(known_days) - present:
+            kind, day = ("adapter", key[len("data/"):]) if key.startswith("data/") else ("bundle", key)
+            if kind == "adapter" and not self.data_dir:
+                continue  # 没有指定数据目录时不核对 adapter 文章
+            self.db.execute("DELETE FROM posts WHERE day = ? AND kind = ?", (day, kind))
+            self.db.execute("DELETE FROM days WHERE day = ?", (key,))
+        if full:
+            self.db.execute(f"PRAGMA user_version = {HASH_VERSION}")
+            self._stale_hashes = False
+        self.db.commit()
+
+    def _reconcile_data(self, day):
+        """数据文件变了就整份重新载入（一天一份，只有几十条）。"""
+        try:
+            with open(self._data_file(day), 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"读取文件失败 {self._data_file(day)}: {e}")
+            return
+        mtime = os.stat(self._data_file(day)).st_mtime_ns
+        self.db.execute("DELETE FROM posts WHERE day = ? AND kind = 'adapter'", (day,))
+        for record in records:
+            self.parsed += 1
+            title = record.get("title")
+            self._insert(
+                f"{day}/{record.get('path')}", day, record.get("slug"), title,
+                title_hash(title) if title else None,
+                content_hash(body_summary(record.get("content", ""))),
+                mtime, "adapter",
+            )
+
+    def _reconcile_day(self, day, full):
+        known = dict(self.db.execute("SELECT folder, mtime_ns FROM posts WHERE day = ? AND kind = 'bundle'", (day,)))
+        present = set()
+        for entry in os.scandir(os.path.join(self.root, day)):
+            if not entry.is_dir():
+                continue
+            index_path = os.path.join(entry.path, 'index.md')
+            try:
+                mtime = os.stat(index_path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            folder = f"{day}/{entry.name}"
+            present.add(folder)
+            if not full and known.get(folder) == mtime:
+                continue
+            try:
+                title, slug, summary = parse_post(index_path)
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"读取文件失败 {index_path}: {e}")
+                continue
+            self.parsed += 1
+            self._insert(
+                folder, day, slug, title,
+                title_hash(title) if title else None,
+                content_hash(summary) if summary is not None else None,
+                mtime, "bundle",
+            )
+        self.db.executemany("DELETE FROM posts WHERE folder = ?", ((folder,) for folder in set(known) - present))
+
+    def add(self, post_folder, title, title_hash, content_hash, slug):
+        """登记刚写出的文章（index.md 已写入），同时记下日期目录的新修改时间，下次启动不必再扫描。"""
+        folder = self._relative(post_folder)
+        day = folder.split("/")[0]
+        mtime = os.stat(os.path.join(post_folder, 'index.md')).st_mtime_ns
+        self._insert(folder, day, slug, title, title_hash, content_hash, mtime, "bundle")
+        self._touch_day(day)
+        self.db.commit()
+
+    def add_data(self, day, path, title, title_hash, content_hash, slug):
+        """登记刚追加到 data/posts/YYYY_MM_DD.json（已写入）的 adapter 文章。"""
+        mtime = os.stat(self._data_file(day)).st_mtime_ns
+        self._insert(f"{day}/{path}", day, slug, title, title_hash, content_hash, mtime, "adapter")
+        self._touch_day(day, "adapter")
+        self.db.commit()
+
+    def remove(self, post_folder):
+        """文章目录被删除后调用。"""
+        folder = self._relative(post_folder)
+        self.db.execute("DELETE FROM posts WHERE folder = ?", (folder,))
+        self._touch_day(folder.split("/")[0])
+        self.db.commit()
+
+    def find_title(self, title_hash, since_day=None):
+        """返回 since_day（含）以来标题哈希相同的文章目录，没有则返回 None；since_day 为 None 时查找全部文章。"""
+        return self._find("title_hash", f"t:{title_hash}", title_hash, since_day)
+
+    def find_content(self, content_hash, since_day=None):
+        return self._find("content_hash", f"c:{content_hash}", content_hash, since_day)
+
+    def _find(self, column, key, value, since_day):
+        if key not in self.bloom:
+            self.bloom_skipped += 1
+            return None
+        row = self.db.execute(
+            f"SELECT folder FROM posts WHERE {column} = ? AND day >= ? ORDER BY folder LIMIT 1",
+            (value, since_day or ""),
+        ).fetchone()
+        if row is None:
+            self.bloom_false += 1
+            return None
+        self.bloom_hits += 1
+        return self._absolute(row[0])
+
+    def posts_on(self, day):
+        """某一天的 bundle 文章：[(目录, 标题, 标题哈希, 内容哈希)]，按目录名（即序号）排序。"""
+        return [(self._absolute(folder), title, t_hash, c_hash) for folder, title, t_hash, c_hash in self.db.execute(
+            "SELECT folder, title, title_hash, content_hash FROM posts WHERE day = ? AND kind = 'bundle' ORDER BY folder",
+            (day,),
+        )]
+
+    def checkpoint(self, path):
+        """摘要文件已处理到的位置和最后一条记录的标题；文件被截断或重写时返回 (0, None)。
+
+        断点和清单保存在同一个库里：文章目录连同清单被清空时，断点也随之消失，摘要会重新生成文章。
+        """
+        row = self.db.execute(
+            "SELECT offset, tail_hash, last_title FROM checkpoints WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None:
+            return 0, None
+        if not position_valid(path, row[0], row[1]):
+            print(f"🔁 {os.path.basename(path)} 已被截断或重写，从头重新处理")
+            return 0, None
+        return row[0], row[2]
+
+    def save_checkpoint(self, path, offset, last_title):
+        self.db.execute(
+            "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?)",
+            (path, offset, tail_digest(path, offset), last_title),
+        )
+        self.db.commit()
+
+    def count(self, since_day=None):
+        return self.db.execute("SELECT COUNT(*) FROM posts WHERE day >= ?", (since_day or "",)).fetchone()[0]
+
+    def report(self):
+        print(f"🗂️ 文章清单: 共 {self.count()} 篇，本次检查 {self.scanned_days} 个日期目录，重新解析 {self.parsed} 篇")
+
+    def report_bloom(self):
+        print(f"🌸 布隆过滤器: {self.bloom.count}/{self.bloom.capacity} 个键，"
+              f"{len(self.bloom.bits) / 1024:.0f}KB，估计误判率 {self.bloom.false_positive_rate():.4%}；"
+              f"本次 {self.bloom_skipped} 次查询直接跳过，命中 {self.bloom_hits} 次，未确认 {self.bloom_false} 次")
+
+    def close(self):
+        if self._bloom_dirty:
+            if self.bloom.count > self.bloom.capacity:
+                self.rebuild_bloom(self.bloom.capacity * 2)
+            else:
+                self._save_bloom()
+        self.db.close()
+
+
+def main():
+    import daily_md_generator
+
+    daily_md_generator.setup()
+    manifest = PostManifest(daily_md_generator.target_root, daily_md_generator.data_root)
+    rebuild = '--rebuild' in sys.argv[1:]
+    manifest.reconcile(full=rebuild or '--full' in sys.argv[1:])
+    if rebuild:
+        manifest.rebuild_bloom()
+    manifest.report()
+    manifest.report_bloom()
+    manifest.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""文章渲染：每条摘要只读取一次，在同一遍里生成全部输出格式。
+
+  - Hugo 文章：bundle 模式的 index.md，adapter 模式的数据文件记录（字段相同）；
+    TOML front matter 由 tomli_w 序列化，标题或摘要里的引号、反斜杠和换行都会正确转义；
+  - 当天的汇总 Markdown、JSON Feed 1.1 和 RSS 2.0，写到 static/daily/YYYY_MM_DD.{md,json,xml}，随站点一起发布；
+    RSS 2.0 要求频道链接是绝对地址，站点地址取 SITE_BASE_URL，未设置时读 Hugo 配置里的 baseURL，都没有时报错；
+  - 本次新生成的文章按同样的格式追加到 spiders/ai_news/summarized_articles.md（全部历史摘要的汇总），
+    AI_summary 不再单独渲染一遍。
+
+模板在导入时编译（string.Template），逐篇渲染只做替换。同一天多次运行时，先从当天的 JSON Feed
+读回已渲染的文章，汇总和订阅源始终包含全天的文章，不必重新读取摘要文件或文章目录。
+"""
+import os
+import re
+import json
+from datetime import datetime
+from email.utils import format_datetime
+from string import Template
+from xml.sax.saxutils import escape
+
+import tomli_w
+
+try:
+    import tomllib  # Python 3.11+
+except ImportError:
+    import tomli as tomllib
+
+import run_metrics
+
+# 当天汇总和订阅源所在的目录（相对 Hugo 项目），放在 static 下会原样发布到站点的 /daily/
+DAILY_DIR = os.getenv('POST_DAILY_DIR', os.path.join('static', 'daily'))
+# Hugo 站点配置文件，按 Hugo 自己的查找顺序；SITE_BASE_URL 未设置时从中读取 baseURL
+HUGO_CONFIG_FILES = ("hugo.toml", "hugo.yaml", "hugo.yml", "hugo.json", "config.toml", "config.yaml", "config.yml", "config.json")
+YAML_BASE_URL = re.compile(r"^baseURL\s*:\s*['\"]?([^'\"\s#]+)", re.MULTILINE)
+# front matter 和订阅源里摘要的最大长度
+SUMMARY_LENGTH = 150
+
+BUNDLE = Template("+++\n$front_matter+++\n\n$content")
+CONTENT = Template("$summary\n\n<!--more-->\n")
+DIGEST_HEADER = Template("# $day AI 新闻汇总\n\n共 $count 篇\n\n")
+DIGEST_ENTRY = Template("## $title\n\n$link_line$tags_line**摘要：**\n\n$summary\n\n---\n\n")
+DIGEST_LINK = Template("**原文链接：** [$link]($link)\n\n")
+DIGEST_TAGS = Template("**标签：** $tags\n\n")
+RSS = Template(
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<rss version="2.0">\n'
+    '<channel>\n'
+    '<title>$title</title>\n'
+    '<link>$link</link>\n'
+    '<description>$title</description>\n'
+    '<lastBuildDate>$updated</lastBuildDate>\n'
+    '$items'
+    '</channel>\n'
+    '</rss>\n'
+)
+RSS_ITEM = Template(
+    '<item>\n'
+    '<title>$title</title>\n'
+    '$link'
+    '<guid isPermaLink="false">$guid</guid>\n'
+    '<pubDate>$date</pubDate>\n'
+    '$categories'
+    '<description>$summary</description>\n'
+    '</item>\n'
+)
+RSS_LINK = Template('<link>$link</link>\n')
+RSS_CATEGORY = Template('<category>$tag</category>\n')
+
+
+def site_url(hugo_project_path):
+    """订阅源使用的站点绝对地址（不带结尾的 /）：SITE_BASE_URL 优先，其次是 Hugo 配置里的 baseURL。"""
+    url = os.getenv('SITE_BASE_URL', '')
+    source = "SITE_BASE_URL"
+    if not url:
+        for name in HUGO_CONFIG_FILES:
+            path = os.path.join(hugo_project_path, name)
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            if name.endswith(".toml"):
+                url = tomllib.loads(text).get("baseURL", "")
+            elif name.endswith(".json"):
+                url = json.loads(text).get("baseURL", "")
+            else:
+                match = YAML_BASE_URL.search(text)
+                url = match.group(1) if match else ""
+            source = path
+            break
+    if not re.match(r"^https?://[^/]", url or ""):
+        raise RuntimeError(f"订阅源需要站点的绝对地址：请设置 SITE_BASE_URL，或在 Hugo 配置中设置 baseURL"
+                           f"（{source}: {url!r}）")
+    return url.rstrip('/')
+
+
+def one_line(text):
+    """标题用于 Markdown 标题行时合并成一行。"""
+    return " ".join(text.split())
+
+
+def make_post(title, tags, summary, slug, link, date):
+    """一篇文章的全部字段；adapter 模式的数据文件记录在此基础上加上 path。"""
+    return {
+        "title": title,
+        "date": date,
+        "tags": tags,
+        "summary": summary[:SUMMARY_LENGTH],
+        "slug": slug,
+        "link": link,
+        "content": CONTENT.substitute(summary=summary),
+        "full_summary": summary,
+    }
+
+
+def front_matter(post):
+    return tomli_w.dumps({
+        "title": post["title"],
+        "date": post["date"],
+        "draft": False,
+        "tags": post["tags"],
+        "summary": post["summary"],
+        "slug": post["slug"],
+        "link": post["link"],
+    })
+
+
+def render_bundle(post):
+    """bundle 模式的 index.md 全文。"""
+    return BUNDLE.substitute(front_matter=front_matter(post), content=post["content"])
+
+
+def adapter_record(post, path):
+    """adapter 模式数据文件中的一条记录，字段与 bundle 的 front matter 相同。"""
+    record = {"path": path}
+    record.update((key, value) for key, value in post.items() if key != "full_summary")
+    return record
+
+
+def digest_entry(title, link, tags, summary):
+    """汇总 Markdown 中的一篇文章。"""
+    return DIGEST_ENTRY.substitute(
+        title=one_line(title),
+        link_line=DIGEST_LINK.substitute(link=link) if link else "",
+        tags_line=DIGEST_TAGS.substitute(tags=", ".join(tags)) if tags else "",
+        summary=summary,
+    )
+
+
+class DailyOutputs:
+    """某一天的汇总 Markdown、JSON Feed 和 RSS：write_post 每生成一篇文章调用 add()，最后 write() 一次写出。
+
+    archive_path 为全部历史摘要的汇总 Markdown，本次新增的文章在 write() 时按同样的格式追加进去。
+    """
+
+    def __init__(self, hugo_project_path, day, archive_path=None):
+        self.day = day
+        self.site_url = site_url(hugo_project_path)
+        self.dir = os.path.join(hugo_project_path, DAILY_DIR)
+        self.paths = {ext: os.path.join(self.dir, f"{day}.{ext}") for ext in ("md", "json", "xml")}
+        self.archive_path = archive_path
+        self.entries = self._load()
+        self.added = []
+        self.changed = False
+
+    def _load(self):
+        # 当天的 JSON Feed 就是已渲染文章的记录，按生成顺序存放在扩展字段 _order 中
+        try:
+            with open(self.paths["json"], 'r', encoding='utf-8') as f:
+                items = json.load(f)["items"]
+        except (OSError, ValueError, KeyError):
+            return []
+        return [{
+            "id": item["id"],
+            "title": item["title"],
+            "link": item.get("external_url", ""),
+            "tags": item.get("tags", []),
+            "summary": item.get("content_text", ""),
+            "date": item["date_published"],
+        } for item in sorted(items, key=lambda item: item.get("_order", 0))]
+
+    def add(self, post, post_id):
+        self.entries.append({
+            "id": post_id,
+            "title": post["title"],
+            "link": post["link"],
+            "tags": post["tags"],
+            "summary": post["full_summary"],
+            "date": post["date"],
+        })
+        self.added.append(self.entries[-1])
+        self.changed = True
+
+    def render_digest(self):
+        return DIGEST_HEADER.substitute(day=self.day.replace("_", "-"), count=len(self.entries)) + "".join(
+            digest_entry(entry["title"], entry["link"], entry["tags"], entry["summary"]) for entry in self.entries
+        )
+
+    def render_feed(self):
+        # 订阅源按时间倒序，最新的文章在前
+        items = [{
+            "id": entry["id"],
+            "url": entry["link"] or None,
+            "external_url": entry["link"] or None,
+            "title": entry["title"],
+            "content_text": entry["summary"],
+            "summary": entry["summary"][:SUMMARY_LENGTH],
+            "date_published": entry["date"],
+            "tags": entry["tags"],
+            "_order": order,
+        } for order, entry in reversed(list(enumerate(self.entries)))]
+        feed = {
+            "version": "https://jsonfeed.org/version/1.1",
+            "title": f"AI 新闻 {self.day.replace('_', '-')}",
+            "home_page_url": self.site_url,
+            "feed_url": f"{self.site_url}/daily/{self.day}.json",
+            "items": [{key: value for key, value in item.items() if value is not None} for item in items],
+        }
+        return json.dumps({key: value for key, value in feed.items() if value is not None},
+                          ensure_ascii=False, indent=2) + "\n"
+
+    def render_rss(self):
+        items = "".join(RSS_ITEM.substitute(
+            title=escape(one_line(entry["title"])),
+            link=RSS_LINK.substitute(link=escape(entry["link"])) if entry["link"] else "",
+            guid=escape(entry["id"]),
+            date=format_datetime(datetime.fromisoformat(entry["date"])),
+            categories="".join(RSS_CATEGORY.substitute(tag=escape(tag)) for tag in entry["tags"]),
+            summary=escape(entry["summary"]),
+        ) for entry in reversed(self.entries))
+        updated = max((datetime.fromisoformat(entry["date"]) for entry in self.entries), default=None)
+        return RSS.substitute(
+            title=escape(f"AI 新闻 {self.day.replace('_', '-')}"),
+            link=escape(self.site_url),
+            updated=format_datetime(updated) if updated else "",
+            items=items,
+        )
+
+    def write(self):
+        """有新文章或文件缺失时写出三份文件（各自原子替换），再把新文章追加到汇总 Markdown；当天没有文章时不写。"""
+        if not self.entries or (not self.changed and all(os.path.exists(path) for path in self.paths.values())):
+            return
+        os.makedirs(self.dir, exist_ok=True)
+        renderers = {"md": self.render_digest, "json": self.render_feed, "xml": self.render_rss}
+        for ext in self.paths:
+            text = renderers[ext]()
+            tmp_path = self.paths[ext] + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, self.paths[ext])
+            run_metrics.count("bytes_written", len(text.encode("utf-8")))
+        print(f"📰 已写出当天汇总和订阅源（{len(self.entries)} 篇）: {os.path.join(self.dir, self.day)}.{{md,json,xml}}")
+        if self.archive_path and self.added:
+            os.makedirs(os.path.dirname(self.archive_path), exist_ok=True)
+            text = "".join(digest_entry(entry["title"], entry["link"], entry["tags"], entry["summary"])
+                           for entry in self.added)
+            with open(self.archive_path, 'a', encoding='utf-8') as f:
+                f.write(text)
+            run_metrics.count("bytes_written", len(text.encode("utf-8")))
+        self.added = []
+        self.changed = False
@@ -1,53 +1,134 @@
 import subprocess
 import sys
 import os
+import time
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import run_metrics
 
 # 获取脚本所在的当前目录
 current_dir = os.path.dirname(os.path.abspath(__file__))
+# stream: 在一个进程内流式运行各阶段（pipeline.py）；subprocess: 按阶段逐个启动脚本（旧流程）
+PIPELINE_MODE = os.getenv('PIPELINE_MODE', 'stream')
 
-# 定义要按顺序运行的脚本列表
-scripts_to_run = [
-    'AI_jiqizhixin.py',
-    'AI_MITNews.py',
-    'AI_summary.py',
-    'daily_md_generator.py',
-    'auto_push_github.py',
+# 定义要按顺序运行的阶段，同一阶段内的脚本并发运行
+# news_sources.py 在一个进程内并发运行 sources.json 中登记的所有新闻源，用浏览器的源共用一个 Chromium
+stages_to_run = [
+    ['news_sources.py'],
+    ['AI_summary.py'],
+    ['daily_md_generator.py'],
+    ['auto_push_github.py'],
 ]
 
-print("🚀 开始执行每日构建流程...")
 
-# 依次执行定义好的脚本
-for script_name in scripts_to_run:
+def run_script(script_name, env, prefix=""):
+    """运行一个脚本并实时转发它的输出（同一阶段并发多个脚本时每行带上脚本名）。
+
+    返回 (退出码, 墙钟时间, 资源用量, 计数器)；资源用量来自 os.wait4，Windows 上为 None。
+    """
     script_path = os.path.join(current_dir, script_name)
-    print(f"\n▶️ 正在运行: {script_name}")
-    try:
-        # 使用 subprocess.run 来执行脚本
-        # check=True 会在脚本返回非零退出码时抛出异常
-        result = subprocess.run(
-            [sys.executable, script_path], 
-            check=True, 
-            capture_output=True, # 捕获输出
-            text=True # 以文本形式解码输出
-        )
+    counters_file = os.path.join(env[run_metrics.COUNTERS_FILE_ENV], f"{script_name}.json")
+    # 子进程的输出不经过缓冲，日志随运行实时出现
+    env = dict(env, PYTHONUNBUFFERED='1', PYTHONIOENCODING='utf-8')
+    env[run_metrics.COUNTERS_FILE_ENV] = counters_file
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, script_path],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT, # 错误输出按发生顺序合并进来
+        text=True,
+        encoding='utf-8',
+        errors='replace',
+        env=env,
+    )
+    for line in process.stdout:
+        print(f"{prefix}{line}", end="", flush=True)
+    process.stdout.close()
+    rusage = None
+    if hasattr(os, 'wait4'):
+        _, status, rusage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+    else:
+        process.wait()
+    return process.returncode, time.perf_counter() - started, rusage, run_metrics.read_counters(counters_file)
+
+
+def report_result(script_name, returncode=None, error=None):
+    if error is None and returncode == 0:
         print(f"✅ {script_name} 执行成功。")
-        if result.stdout:
-            print("   --- 输出 ---")
-            print(result.stdout)
-            print("   --- 输出结束 ---")
+        return True
 
-    except subprocess.CalledProcessError as e:
+    if error is None:
         print(f"❌ 执行 {script_name} 时出错！")
-        print(f"   - 返回码: {e.returncode}")
-        if e.stdout:
-            print("   --- 标准输出 ---")
-            print(e.stdout)
-        if e.stderr:
-            print("   --- 错误输出 ---")
-            print(e.stderr)
-        # 脚本执行失败，中止整个流程
-        sys.exit(1) 
-    except FileNotFoundError:
-        print(f"❌ 错误：脚本文件未找到: {script_path}")
+        print(f"   - 返回码: {returncode}")
+    elif isinstance(error, FileNotFoundError):
+        print(f"❌ 错误：脚本文件未找到: {os.path.join(current_dir, script_name)}")
+    else:
+        print(f"❌ 执行 {script_name} 时发生未知错误: {error}")
+    return False
+
+
+def run_stage(scripts, env, metrics):
+    """并发运行同一阶段的脚本，输出实时转发，等待全部结束后按顺序汇报结果；任一失败返回 False。"""
+    for script_name in scripts:
+        print(f"\n▶️ 正在运行: {script_name}")
+    with ThreadPoolExecutor(max_workers=len(scripts)) as executor:
+        futures = []
+        for name in scripts:
+            if not os.path.exists(os.path.join(current_dir, name)):
+                futures.append((name, None))
+                continue
+            prefix = f"[{name}] " if len(scripts) > 1 else ""
+            futures.append((name, executor.submit(run_script, name, env, prefix)))
+        ok = True
+        for script_name, future in futures:
+            if future is None:
+                ok = report_result(script_name, error=FileNotFoundError(script_name)) and ok
+                continue
+            try:
+                returncode, wall_s, rusage, counters = future.result()
+            except Exception as e:
+                ok = report_result(script_name, error=e) and ok
+                continue
+            metrics.add_process(script_name, wall_s, rusage, "ok" if returncode == 0 else "failed", counters)
+            ok = report_result(script_name, returncode) and ok
+    return ok
+
+
+def run_stages(metrics):
+    print("🚀 开始执行每日构建流程...")
+    env = os.environ.copy()
+    # 各脚本的计数器文件放在这个临时目录里，由 run_script 按脚本名区分
+    env[run_metrics.COUNTERS_FILE_ENV] = tempfile.mkdtemp(prefix="run-counters-")
+
+    # 依次执行定义好的阶段
+    for scripts in stages_to_run:
+        if not run_stage(scripts, env, metrics):
+            # 脚本执行失败，中止整个流程
+            sys.exit(1)
+
+    print("\n🎉 所有脚本执行完毕。")
+
+
+def main():
+    if PIPELINE_MODE == 'stream':
+        import pipeline
+        pipeline.main()
+        return
+
+    metrics = run_metrics.RunMetrics('subprocess')
+    try:
+        run_stages(metrics)
+    except BaseException:
+        metrics.status = 'failed'
+        raise
+    finally:
+        # 失败的运行也写出指标，但不会被用作以后的基线
+        regressed = metrics.finish()
+    if regressed and run_metrics.FAIL_ON_REGRESSION:
         sys.exit(1)
 
-print("\n🎉 所有脚本执行完毕。") 
\ No newline at end of file
+
+if __name__ == "__main__":
+    main()
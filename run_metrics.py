@@ -0,0 +1,271 @@
+"""每日流程的运行指标：每个阶段的墙钟时间、CPU 时间和内存峰值，以及全流程的计数器。
+
+每次运行写一份 JSON 到 spiders/ai_news/run_metrics/（可用 RUN_METRICS_DIR 修改），
+并与最近几次同模式、成功的运行取中位数作为基线比较，明显变慢或变大的指标会被标记为回退。
+
+计数器由各阶段调用 count() 累加。进程内流水线直接读取；按子进程运行时，
+父进程通过 RUN_COUNTERS_FILE 给每个脚本指定一个文件，子进程退出时把计数器写进去。
+
+用法:
+    python run_metrics.py   # 把最近一次运行与基线比较并打印
+"""
+import os
+import sys
+import json
+import glob
+import time
+import atexit
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from statistics import median
+
+try:
+    import resource  # Windows 上没有，只记录墙钟和 CPU 时间
+except ImportError:
+    resource = None
+
+COUNTERS_FILE_ENV = 'RUN_COUNTERS_FILE'
+METRICS_DIR = os.getenv('RUN_METRICS_DIR') or os.path.join(
+    os.getenv('HUGO_PROJECT_PATH', '.'), 'spiders', 'ai_news', 'run_metrics'
+)
+# 取最近多少次成功运行作为基线，少于 BASELINE_MIN_RUNS 次时不做比较
+BASELINE_RUNS = int(os.getenv('RUN_METRICS_BASELINE_RUNS', '7'))
+BASELINE_MIN_RUNS = int(os.getenv('RUN_METRICS_BASELINE_MIN_RUNS', '3'))
+# 超过基线中位数的比例，以及最小的绝对差（避免短阶段的抖动被当成回退）
+TOLERANCE = float(os.getenv('RUN_METRICS_TOLERANCE', '0.5'))
+MIN_DELTA = {"wall_s": 1.0, "cpu_s": 1.0, "peak_rss_mb": 20.0}
+FAIL_ON_REGRESSION = os.getenv('RUN_METRICS_FAIL_ON_REGRESSION', '0') == '1'
+RSS_SAMPLE_INTERVAL = 0.05
+
+# 本进程内累计的计数：articles_scraped、articles_deduped、articles_summarized、posts_generated、
+# pages_fetched、bytes_downloaded、bytes_written
+COUNTERS = Counter()
+_dump_registered = False
+
+
+def count(name, amount=1):
+    global _dump_registered
+    COUNTERS[name] += amount
+    if not _dump_registered and os.getenv(COUNTERS_FILE_ENV):
+        atexit.register(dump_counters)
+        _dump_registered = True
+
+
+def dump_counters():
+    """子进程退出时把计数器写到父进程指定的文件。"""
+    with open(os.environ[COUNTERS_FILE_ENV], "w", encoding="utf-8") as f:
+        json.dump(dict(COUNTERS), f)
+
+
+def read_counters(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _maxrss_mb(who):
+    if resource is None:
+        return None
+    rss = resource.getrusage(who).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class RssSampler:
+    """在后台线程里定期读取本进程的常驻内存，得到一个阶段内的峰值。
+
+    没有 /proc 时退回到进程启动以来的峰值（ru_maxrss），只增不减，对后面的阶段偏大。
+    """
+
+    def __init__(self):
+        self.peak = _current_rss_mb()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.peak is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(RSS_SAMPLE_INTERVAL):
+            rss = _current_rss_mb()
+            if rss is not None and rss > self.peak:
+                self.peak = rss
+
+    def stop(self):
+        if self._thread is None:
+            return _maxrss_mb(resource.RUSAGE_SELF) if resource else None
+        self._stop.set()
+        self._thread.join()
+        rss = _current_rss_mb()
+        return round(max(self.peak, rss or 0), 1)
+
+
+class RunMetrics:
+    def __init__(self, mode):
+        self.mode = mode
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self.stages = []
+        self.status = "ok"
+        self._child_cpu = 0.0
+
+    @contextmanager
+    def stage(self, name):
+        """记录一个在本进程内运行的阶段；阶段内累加的计数器一并记入。"""
+        record = {"name": name, "status": "ok"}
+        counters_before = Counter(COUNTERS)
+        sampler = RssSampler().start()
+        wall_started, cpu_started = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        except BaseException:
+            record["status"] = "failed"
+            raise
+        finally:
+            record["wall_s"] = round(time.perf_counter() - wall_started, 3)
+            record["cpu_s"] = round(time.process_time() - cpu_started, 3)
+            record["peak_rss_mb"] = sampler.stop()
+            record["counters"] = dict(Counter(COUNTERS) - counters_before)
+            self.stages.append(record)
+
+    def add_process(self, name, wall_s, rusage, status, counters):
+        """记录一个子进程阶段；rusage 来自 os.wait4，Windows 上为 None。"""
+        record = {"name": name, "status": status, "wall_s": round(wall_s, 3), "cpu_s": None, "peak_rss_mb": None}
+        if rusage is not None:
+            record["cpu_s"] = round(rusage.ru_utime + rusage.ru_stime, 3)
+            self._child_cpu += record["cpu_s"]
+            record["peak_rss_mb"] = round(rusage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+        record["counters"] = counters
+        self.stages.append(record)
+        COUNTERS.update(counters)
+
+    def to_dict(self):
+        stages_ok = all(stage["status"] == "ok" for stage in self.stages)
+        # 子进程阶段的 CPU 时间和内存峰值不在本进程里，合计时一并算上
+        peaks = [stage["peak_rss_mb"] for stage in self.stages if stage["peak_rss_mb"] is not None]
+        if resource is not None:
+            peaks.append(_maxrss_mb(resource.RUSAGE_SELF))
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "mode": self.mode,
+            "status": self.status if stages_ok else "failed",
+            "wall_s": round(time.perf_counter() - self._started, 3),
+            "cpu_s": round(time.process_time() + self._child_cpu, 3),
+            "peak_rss_mb": max(peaks) if peaks else None,
+            "stages": self.stages,
+            "counters": dict(COUNTERS),
+        }
+
+    def finish(self, metrics_dir=METRICS_DIR):
+        """写出本次运行的指标并与基线比较；返回是否发现回退。"""
+        data = self.to_dict()
+        baseline = load_baseline(metrics_dir, data["mode"])
+        data["regressions"] = find_regressions(data, baseline)
+        data["baseline_runs"] = len(baseline)
+        os.makedirs(metrics_dir, exist_ok=True)
+        path = os.path.join(metrics_dir, f"run_{self.started_at.strftime('%Y%m%d_%H%M%S')}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        report(data)
+        print(f"   指标已写入: {path}")
+        return bool(data["regressions"])
+
+
+def load_runs(metrics_dir=METRICS_DIR):
+    runs = []
+    for path in sorted(glob.glob(os.path.join(metrics_dir, "run_*.json"))):
+        try:
+            with open(path, encoding="utf-8") as f:
+                runs.append(json.load(f))
+        except (OSError, ValueError):
+            print(f"⚠️ 跳过无法读取的指标文件: {path}")
+    return runs
+
+
+def load_baseline(metrics_dir, mode, before=None):
+    """最近 BASELINE_RUNS 次同模式、成功的运行（不含 before 及其之后的运行）。"""
+    runs = [run for run in load_runs(metrics_dir)
+            if run.get("mode") == mode and run.get("status") == "ok"
+            and (before is None or run["started_at"] < before)]
+    return runs[-BASELINE_RUNS:]
+
+
+def find_regressions(data, baseline):
+    """与基线中位数比较总耗时和各阶段的墙钟时间、CPU 时间、内存峰值，超出容差的记为回退。"""
+    if len(baseline) < BASELINE_MIN_RUNS:
+        return []
+    regressions = []
+
+    def check(name, current, history):
+        for metric, floor in MIN_DELTA.items():
+            values = [entry[metric] for entry in history if entry.get(metric) is not None]
+            if current.get(metric) is None or len(values) < BASELINE_MIN_RUNS:
+                continue
+            expected = median(values)
+            if current[metric] > expected * (1 + TOLERANCE) and current[metric] - expected >= floor:
+                regressions.append({"stage": name, "metric": metric, "value": current[metric],
+                                    "baseline": round(expected, 3)})
+
+    check("total", data, baseline)
+    for stage in data["stages"]:
+        history = [s for run in baseline for s in run.get("stages", []) if s["name"] == stage["name"]]
+        check(stage["name"], stage, history)
+    return regressions
+
+
+def _format(value, unit):
+    return "-" if value is None else f"{value:.2f}{unit}"
+
+
+def report(data):
+    print(f"\n📈 运行指标（{data['mode']}，{data['status']}）：总耗时 {_format(data['wall_s'], 's')}，"
+          f"内存峰值 {_format(data['peak_rss_mb'], 'MB')}")
+    for stage in data["stages"]:
+        print(f"   {stage['name']:<24} {stage['status']:<7} 墙钟 {_format(stage['wall_s'], 's'):>9}  "
+              f"CPU {_format(stage['cpu_s'], 's'):>9}  内存峰值 {_format(stage['peak_rss_mb'], 'MB'):>10}")
+    counters = data["counters"]
+    print(f"   抓取 {counters.get('articles_scraped', 0)} 篇，去重跳过 {counters.get('articles_deduped', 0)} 篇，"
+          f"摘要 {counters.get('articles_summarized', 0)} 篇，生成文章 {counters.get('posts_generated', 0)} 篇，"
+          f"请求页面 {counters.get('pages_fetched', 0)} 次，下载 {counters.get('bytes_downloaded', 0) / 1024:.1f} KB，"
+          f"写入 {counters.get('bytes_written', 0) / 1024:.1f} KB")
+    if data["baseline_runs"] < BASELINE_MIN_RUNS:
+        print(f"   基线运行不足 {BASELINE_MIN_RUNS} 次（现有 {data['baseline_runs']} 次），暂不比较")
+    elif not data["regressions"]:
+        print(f"✅ 与最近 {data['baseline_runs']} 次运行的中位数相比没有回退")
+    for item in data["regressions"]:
+        print(f"⚠️ 回退: {item['stage']} 的 {item['metric']} 为 {item['value']}，"
+              f"基线中位数 {item['baseline']}（容差 {TOLERANCE:.0%}）")
+
+
+def main():
+    runs = load_runs()
+    if not runs:
+        print(f"未找到运行指标: {METRICS_DIR}")
+        return
+    data = runs[-1]
+    baseline = load_baseline(METRICS_DIR, data["mode"], before=data["started_at"])
+    data["regressions"] = find_regressions(data, baseline)
+    data["baseline_runs"] = len(baseline)
+    report(data)
+    if data["regressions"] and FAIL_ON_REGRESSION:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import os
+import json
+import hashlib
+import sqlite3
+
+from text_hash import content_hash, title_hash
+
+
+# 校验读取位置时比对文件开头和位置之前各这么多字节的哈希，文件被重写时即使长度没变短也能发现
+TAIL_BYTES = 4096
+
+
+def store_path(base_dir):
+    return os.path.join(base_dir, "seen_store.sqlite3")
+
+
+def tail_digest(path, offset):
+    """文件开头和 offset 之前各最多 TAIL_BYTES 字节的哈希；offset 为 0 时为空串。"""
+    if offset <= 0:
+        return ""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        digest.update(f.read(min(offset, TAIL_BYTES)))
+        start = max(0, offset - TAIL_BYTES)
+        f.seek(start)
+        digest.update(f.read(offset - start))
+    return digest.hexdigest()
+
+
+def position_valid(path, offset, digest):
+    """记录的读取位置是否仍然指向同一份内容：文件没有变短，位置之前的字节也没被改写。"""
+    if not os.path.exists(path):
+        return offset == 0
+    if os.path.getsize(path) < offset:
+        return False
+    return tail_digest(path, offset) == digest
+
+
+def iter_jsonl(path, offset=0):
+    """从 offset 开始逐行读取 JSONL，产出 (记录, 行首位置, 行尾位置)；解析失败的行记录为 None。
+
+    只产出以换行结尾的完整行，末尾未写完的行留到下次。逐行读取，内存占用与文件大小无关。
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            start, offset = offset, offset + len(line)
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            yield record, start, offset
+
+
+def make_key(kind, value):
+    """url 原样保存；标题和正文保存为定长哈希，索引大小与文本长度无关。"""
+    if kind == "title":
+        return title_hash(value)
+    if kind == "content":
+        return content_hash(value)
+    return value
+
+
+class SeenView:
+    """某个命名空间下某类键的集合视图，可以像 set 一样用 in 和 add。"""
+
+    def __init__(self, store, namespace, kind):
+        self.store = store
+        self.namespace = namespace
+        self.kind = kind
+
+    def __contains__(self, value):
+        return self.store.contains(self.namespace, self.kind, value)
+
+    def add(self, value):
+        self.store.add(self.namespace, self.kind, value)
+
+    def __len__(self):
+        return self.store.count(self.namespace, self.kind)
+
+
+class SeenStore:
+    """持久化的已见索引（URL、规范化标题、正文哈希），按需查询而不是每次载入全部历史。
+
+    每个命名空间对应一个 JSONL 输出文件，并记录已索引到的字节位置。首次使用时从头扫描
+    文件建立索引，之后只读取新追加的行；文件变短或位置之前的内容被改写时清空该命名空间并重建。
+    同一个库里还保存各输入文件的读取断点（checkpoint），供只读取新增行的流式处理使用，
+    以及每篇输入的失败次数（按正文哈希），反复失败的条目不再卡住断点。
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS seen (
+                namespace TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (namespace, kind, key)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS sources (
+                namespace TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                tail_hash TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                name TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                tail_hash TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS failures (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (namespace, key)
+            ) WITHOUT ROWID;
+        """)
+        self.db.commit()
+        self.sources = {}
+
+    def attach(self, namespace, jsonl_path, keys):
+        """登记命名空间及其 JSONL 文件，并把索引追平到文件末尾。keys(record) 返回 (kind, value) 序列。"""
+        self.sources[namespace] = (jsonl_path, keys)
+        row = self.db.execute(
+            "SELECT path, offset, tail_hash FROM sources WHERE namespace = ?", (namespace,)
+        ).fetchone()
+        if row is None or row[0] != jsonl_path or not position_valid(jsonl_path, row[1], row[2]):
+            if row is not None:
+                print(f"🔁 {namespace} 的输出文件已变化，重建已见索引")
+            self.db.execute("DELETE FROM seen WHERE namespace = ?", (namespace,))
+            self._save_offset(namespace, jsonl_path, 0)
+        added = self._sync(namespace)
+        self.db.commit()
+        if added:
+            print(f"📇 {namespace}: 已从 {os.path.basename(jsonl_path)} 索引 {added} 个键")
+        return self
+
+    def _sync(self, namespace):
+        """从记录的位置读到文件末尾，把新增的完整行加入索引并推进位置。"""
+        jsonl_path, keys = self.sources[namespace]
+        offset = self.db.execute("SELECT offset FROM sources WHERE namespace = ?", (namespace,)).fetchone()[0]
+        if not os.path.exists(jsonl_path) or os.path.getsize(jsonl_path) <= offset:
+            return 0
+        added = 0
+        for record, _, offset in iter_jsonl(jsonl_path, offset):
+            if record is None:
+                continue
+            for kind, value in keys(record):
+                if value:
+                    self.add(namespace, kind, value)
+                    added += 1
+        self._save_offset(namespace, jsonl_path, offset)
+        return added
+
+    def view(self, namespace, kind):
+        return SeenView(self, namespace, kind)
+
+    def contains(self, namespace, kind, value):
+        return self.db.execute(
+            "SELECT 1 FROM seen WHERE namespace = ? AND kind = ? AND key = ?",
+            (namespace, kind, make_key(kind, value)),
+        ).fetchone() is not None
+
+    def count(self, namespace, kind):
+        return self.db.execute(
+            "SELECT COUNT(*) FROM seen WHERE namespace = ? AND kind = ?", (namespace, kind)
+        ).fetchone()[0]
+
+    def add(self, namespace, kind, value):
+        self.db.execute(
+            "INSERT OR IGNORE INTO seen VALUES (?, ?, ?)",
+            (namespace, kind, make_key(kind, value)),
+        )
+
+    def commit(self):
+        """写入记录后调用：把各文件新写入的行补入索引（已 add 的键会被忽略），并推进索引位置。"""
+        for namespace in self.sources:
+            self._sync(namespace)
+        self.db.commit()
+
+    def _save_offset(self, namespace, jsonl_path, offset):
+        self.db.execute(
+            "INSERT OR REPLACE INTO sources (namespace, path, offset, tail_hash) VALUES (?, ?, ?, ?)",
+            (namespace, jsonl_path, offset, tail_digest(jsonl_path, offset)),
+        )
+
+    def checkpoint(self, name, path):
+        """读取某个输入文件的断点；文件换了路径、被截断或被重写时返回 0，从头重新扫描。"""
+        row = self.db.execute("SELECT path, offset, tail_hash FROM checkpoints WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return 0
+        if row[0] != path or not position_valid(path, row[1], row[2]):
+            print(f"🔁 {os.path.basename(path)} 已被截断或重写，从头重新扫描")
+            return 0
+        return row[1]
+
+    def save_checkpoint(self, name, path, offset):
+        self.db.execute(
+            "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?)",
+            (name, path, offset, tail_digest(path, offset)),
+        )
+        self.db.commit()
+
+    def record_failure(self, namespace, content):
+        """某条输入处理失败一次，返回累计的失败次数。"""
+        key = make_key("content", content)
+        self.db.execute(
+            "INSERT INTO failures VALUES (?, ?, 1) ON CONFLICT (namespace, key) DO UPDATE SET count = count + 1",
+            (namespace, key),
+        )
+        self.db.commit()
+        return self.failures(namespace, content)
+
+    def failures(self, namespace, content):
+        row = self.db.execute(
+            "SELECT count FROM failures WHERE namespace = ? AND key = ?", (namespace, make_key("content", content))
+        ).fetchone()
+        return row[0] if row else 0
+
+    def close(self):
+        self.commit()
+        self.db.close()
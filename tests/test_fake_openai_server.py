@@ -0,0 +1,74 @@
+"""对着本地假服务（fake_openai_server.py）跑并发摘要：服务端限流返回 429 + Retry-After 时，
+调度器按 Retry-After 暂停后重试，所有文章都能生成摘要，并按读取顺序写出。"""
+import os
+import re
+import sys
+import json
+import time
+import subprocess
+import urllib.request
+
+import pytest
+
+import AI_summary
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARTICLES = [{"title": f"Article {i}", "content": f"Article {i} is about topic number {i}. " * 10 + f"Unique {i * 7919}.",
+             "url": f"https://e.org/{i}"} for i in range(8)]
+RPM = 3
+WINDOW = 1.0
+
+
+@pytest.fixture
+def fake_server():
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "fake_openai_server.py"), "--port", "0", "--latency", "0.05",
+         "--rpm", str(RPM), "--window", str(WINDOW)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        line = process.stdout.readline()
+        match = re.search(r"(http://\S+/v1)", line)
+        assert match, f"假服务没有输出地址: {line!r}"
+        yield match.group(1)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def stats(base_url):
+    with urllib.request.urlopen(f"{base_url}/stats") as response:
+        return json.load(response)
+
+
+def test_concurrent_summaries_honor_server_rate_limit(fake_server, tmp_path, monkeypatch):
+    monkeypatch.setenv("GITHUB_ACTIONS", "true")
+    monkeypatch.setenv("HUGO_PROJECT_PATH", str(tmp_path))
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("OPENAI_API_BASE", fake_server)
+    monkeypatch.setattr(AI_summary, "CONCURRENCY", 4)
+    # 客户端预算设得比服务端宽松，限流只能靠服务端的 429 发现
+    monkeypatch.setattr(AI_summary, "RPM_LIMIT", 6000)
+    AI_summary.setup()
+    try:
+        with open(AI_summary.input_files[0], "w", encoding="utf-8") as f:
+            for article in ARTICLES:
+                f.write(json.dumps(article) + "\n")
+        started = time.perf_counter()
+        AI_summary.summarize_pending()
+        elapsed = time.perf_counter() - started
+    finally:
+        AI_summary.teardown()
+
+    with open(AI_summary.output_file, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [record["title"] for record in records] == [article["title"] for article in ARTICLES]
+    assert all(record["summary"].startswith("假摘要") for record in records)
+
+    counts = stats(fake_server)
+    assert counts["completed"] == len(ARTICLES)
+    assert counts["rate_limited"] >= 1
+    # 每个窗口最多 RPM 个请求，8 篇至少要跨过 2 个窗口
+    assert elapsed >= (len(ARTICLES) // RPM) * WINDOW * 0.9
+    # 按 Retry-After 暂停：不会在窗口内反复撞限流（忽略 Retry-After 时 429 次数会远多于请求数）
+    assert counts["rate_limited"] <= len(ARTICLES)
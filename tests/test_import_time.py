@@ -0,0 +1,21 @@
+"""各阶段模块导入时无副作用、不加载重依赖，导入耗时不超预算（见 check_import_time.py）。
+
+耗时按 IMPORT_BUDGET_MS 的 IMPORT_BUDGET_HEADROOM 倍（默认 2 倍）判定，慢一些的 CI 机器上也不会误报；
+超出时再重测一轮，两轮都超才算失败。
+"""
+import os
+
+import pytest
+
+import check_import_time
+
+HEADROOM = float(os.getenv('IMPORT_BUDGET_HEADROOM', '2'))
+
+
+@pytest.mark.parametrize("module", check_import_time.STAGE_MODULES)
+def test_stage_module_import(module, monkeypatch):
+    monkeypatch.setattr(check_import_time, "BUDGET_MS", check_import_time.BUDGET_MS * HEADROOM)
+    best, problems = check_import_time.check_module(module)
+    if problems and best is not None and best > check_import_time.BUDGET_MS:
+        best, problems = check_import_time.check_module(module)
+    assert not problems, f"{module}: {problems}"
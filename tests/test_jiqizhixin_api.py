@@ -0,0 +1,52 @@
+"""接口模式用滑动窗口并发请求文章：同时进行的请求不超过上限，结果仍按列表顺序写出。"""
+import asyncio
+import io
+import json
+
+import AI_jiqizhixin
+
+
+class FakeMeter:
+    def expect(self, url, label):
+        pass
+
+    def start(self, label):
+        pass
+
+    def finish(self, label):
+        pass
+
+
+class FakePage:
+    def __init__(self, delays):
+        self.delays = delays
+        self.in_flight = 0
+        self.peak = 0
+
+    async def evaluate(self, script, urls):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        article_id = urls[0].rsplit("/", 1)[-1]
+        await asyncio.sleep(self.delays[article_id])
+        self.in_flight -= 1
+        if article_id == "3":
+            return [{"url": urls[0], "status": 500}]
+        data = {"title": f"文章 {article_id}", "content": f"<p>正文 {article_id}</p>", "published_at": article_id}
+        return [{"url": urls[0], "status": 200, "data": data}]
+
+
+def test_sliding_window_keeps_list_order(monkeypatch):
+    monkeypatch.setattr(AI_jiqizhixin, "CONCURRENCY", 2)
+    monkeypatch.setattr(AI_jiqizhixin, "summarized_titles", set())
+    monkeypatch.setattr(AI_jiqizhixin, "HTML_CORPUS_DIR", "")
+    # 第 0 篇最慢：后面的请求先返回，但要等它写出后才能按顺序写出
+    delays = {"0": 0.2, "1": 0.01, "2": 0.01, "3": 0.01, "4": 0.01}
+    page = FakePage(delays)
+    articles = [(article_id, f"https://e.org/articles/{article_id}") for article_id in delays]
+    out = io.StringIO()
+
+    done = asyncio.run(AI_jiqizhixin.crawl_via_api(page, articles, out, FakeMeter()))
+
+    assert page.peak == 2
+    assert [json.loads(line)["title"] for line in out.getvalue().splitlines()] == ["文章 0", "文章 1", "文章 2", "文章 4"]
+    assert done == {"0": "0", "1": "1", "2": "2", "4": "4"}
@@ -0,0 +1,29 @@
+import llm_cache
+import AI_summary
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = llm_cache.LLMCache(str(tmp_path / "llm_cache.sqlite3"), max_bytes=60)
+    cache.put("a", "m", {"summary": "x" * 10})
+    cache.put("b", "m", {"summary": "y" * 10})
+    assert cache.get("a") is not None  # a 最近被访问过，超限时先淘汰 b
+    cache.put("c", "m", {"summary": "z" * 10})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.evictions == 1
+    cache.close()
+
+
+def test_chunking_settings_are_part_of_the_key_for_long_articles(monkeypatch):
+    monkeypatch.setattr(AI_summary, "MAX_INPUT_TOKENS", 50)
+    short, long = "short article", "long article body " * 100
+    before_short, before_long = AI_summary.summary_cache_key(short), AI_summary.summary_cache_key(long)
+
+    monkeypatch.setattr(AI_summary, "CHUNK_PROMPT", AI_summary.CHUNK_PROMPT + " 保留数字。")
+    assert AI_summary.summary_cache_key(short) == before_short
+    assert AI_summary.summary_cache_key(long) != before_long
+
+    monkeypatch.setattr(AI_summary, "MAX_INPUT_TOKENS", 60)
+    assert AI_summary.summary_cache_key(short) == before_short
+    # 批任务截断与分段合并的结果不同，不共用缓存
+    assert AI_summary.summary_cache_key(long, truncated=True) != AI_summary.summary_cache_key(long)
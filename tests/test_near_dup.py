@@ -0,0 +1,54 @@
+"""近似重复索引只收录已写出摘要的文章，失败的文章不会挡住自己的重试和其他近似稿。"""
+import near_dup
+
+TEXT = ("OpenAI released a new reasoning model on Tuesday that tops several math and coding benchmarks. "
+        "The company said the model spends more compute at inference time and will reach paid users first, "
+        "while researchers cautioned that benchmark gains do not always carry over to everyday tasks.")
+COPY = TEXT + " Updated with comment."
+
+
+def test_reserved_signature_blocks_copies_until_released(tmp_path):
+    index = near_dup.NearDupIndex(str(tmp_path / "near_dup.sqlite3"))
+    sig, copy_sig = near_dup.signature(TEXT), near_dup.signature(COPY)
+
+    index.reserve("original", sig)
+    assert index.query(copy_sig)[0] == "original"
+    assert index.query(sig, exclude_label="original") is None
+
+    # 摘要失败：签名丢弃，没有写入索引
+    index.release("original")
+    assert index.query(copy_sig) is None
+    assert len(index) == 0
+
+    index.reserve("copy", copy_sig)
+    index.commit("copy")
+    assert len(index) == 1 and not index.pending
+    assert index.query(sig)[0] == "copy"
+    index.close()
+
+
+def reference_signature(text):
+    hashes = [near_dup.zlib.crc32(s.encode("utf-8")) for s in near_dup.shingles(text)]
+    return [min((a * h + b) % near_dup.MERSENNE_PRIME & near_dup.MAX_HASH for h in hashes)
+            for a, b in near_dup.PERMUTATIONS]
+
+
+def test_vectorized_signature_matches_reference():
+    for text in ("", "abc", TEXT, TEXT * 40):
+        assert list(near_dup.signature(text)) == reference_signature(text)
+
+
+def test_backfill_runs_once_and_skips_known_labels(tmp_path):
+    path = str(tmp_path / "near_dup.sqlite3")
+    index = near_dup.NearDupIndex(path)
+    index.add("original", near_dup.signature(TEXT))
+    assert index.needs_backfill()
+
+    assert index.backfill([("original", TEXT), ("copy", COPY), ("copy", COPY)]) == 1
+    assert len(index) == 2 and not index.needs_backfill()
+    index.close()
+
+    reopened = near_dup.NearDupIndex(path)
+    assert not reopened.needs_backfill()
+    assert reopened.query(near_dup.signature(COPY), exclude_label="copy")[0] == "original"
+    reopened.close()
@@ -0,0 +1,40 @@
+"""网络统计：列表页不计入每篇文章的平均值，统计文件每个源只保留最新一份。"""
+import os
+import json
+from types import SimpleNamespace
+
+from network_policy import NetworkMeter
+
+
+def response(size, from_cache=False):
+    return SimpleNamespace(content=b"x" * size, extensions={"from_cache": from_cache})
+
+
+def test_listing_is_excluded_from_per_article_figures(tmp_path, capsys):
+    meter = NetworkMeter("demo", policy={})
+    meter.record_response(meter.listing("https://e.org/"), response(100 * 1024))
+    for i in range(2):
+        meter.record_response(f"https://e.org/{i}", response(10 * 1024))
+
+    summary = meter.summary()
+    assert summary["articles"] == 2
+    assert summary["totals"]["requests"] == 3 and summary["article_totals"]["requests"] == 2
+    assert list(summary["listings"]) == ["https://e.org/"]
+    meter.write_summary(str(tmp_path))
+    assert "平均每篇 1.0 次请求 / 10.0 KB" in capsys.readouterr().out
+
+
+def test_stats_file_is_overwritten(tmp_path):
+    stats_dir = tmp_path / "network_stats"
+    stats_dir.mkdir()
+    # 旧版本留下的带时间戳的文件，以及名字相近的其他源
+    (stats_dir / "demo_20240101_101010.json").write_text("{}")
+    (stats_dir / "demo_other_latest.json").write_text("{}")
+    for requests in (1, 2):
+        meter = NetworkMeter("demo", policy={})
+        for i in range(requests):
+            meter.record_response(f"https://e.org/{i}", response(10))
+        path = meter.write_summary(str(tmp_path))
+    assert sorted(os.listdir(stats_dir)) == ["demo_latest.json", "demo_other_latest.json"]
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["articles"] == 2
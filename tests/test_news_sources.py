@@ -0,0 +1,83 @@
+import asyncio
+
+import news_sources
+
+
+class StaticSource(news_sources.NewsSource):
+    """不联网的测试源：列表固定，提取立即返回。"""
+
+    async def list_items(self, session):
+        return [{"url": f"https://e.org/{i}", "title": f"Story {i}"} for i in range(5)]
+
+    async def extract(self, session, item):
+        return {"title": item["title"], "url": item["url"], "content": "body"}
+
+
+def test_backpressure_does_not_count_against_source_timeout(tmp_path):
+    source = StaticSource("static", "static.jsonl", timeout=0.5)
+    received = []
+
+    async def slow_consumer(source_name, row):
+        # 下游摘要很慢：5 篇共 1s，超过该源 0.5s 的抓取超时
+        await asyncio.sleep(0.2)
+        received.append(row["title"])
+
+    results = asyncio.run(news_sources.run_sources([source], slow_consumer, base_dir=str(tmp_path)))
+    assert results[0]["status"] == "ok"
+    assert results[0]["saved"] == 5
+    assert received == [f"Story {i}" for i in range(5)]
+
+
+def test_slow_fetch_still_times_out(tmp_path):
+    class SlowSource(StaticSource):
+        async def extract(self, session, item):
+            await asyncio.sleep(5)
+
+    results = asyncio.run(news_sources.run_sources([SlowSource("slow", "slow.jsonl", timeout=0.2)],
+                                                   base_dir=str(tmp_path)))
+    assert results[0]["status"] == "timeout"
+
+
+def test_browser_startup_report(tmp_path, monkeypatch):
+    launches = []
+
+    class FakeBrowser:
+        async def close(self):
+            pass
+
+    async def launch(headless):
+        launches.append(headless)
+        await asyncio.sleep(0.05)
+        return FakeBrowser()
+
+    async def run(bench):
+        monkeypatch.setattr(news_sources, "BROWSER_STARTUP_BENCH", bench)
+        session = news_sources.SourceSession(str(tmp_path))
+        try:
+            assert await session.report_browser_startup() is None  # 没有源用到浏览器
+            session._browser = FakeBrowser()
+            session._playwright = type("FakePlaywright", (), {"chromium": type("C", (), {"launch": staticmethod(launch)})})()
+            session.launch_seconds = 0.5
+            session.browser_users = {"mit_news", "jiqizhixin", "html"}
+            return await session.report_browser_startup()
+        finally:
+            await session.http.aclose()
+
+    estimated = asyncio.run(run(False))
+    assert estimated["separate"] == 1.5 and estimated["saved"] == 1.0 and not launches
+    measured = asyncio.run(run(True))
+    assert len(launches) == 3 and measured["separate"] >= 0.15
+    assert measured["saved"] == measured["separate"] - 0.5
+
+
+def test_jiqizhixin_close_closes_listing_page(tmp_path):
+    closed = []
+
+    class FakePage:
+        async def close(self):
+            closed.append(True)
+
+    source = news_sources.JiqizhixinSource("jiqizhixin", "jiqizhixin.jsonl")
+    source._page = FakePage()
+    asyncio.run(source.close(None))
+    assert closed == [True] and source._page is None
@@ -0,0 +1,58 @@
+"""替换页面新建失败时，页面池不丢名额也不掩盖原来的抓取错误。"""
+import asyncio
+
+import pytest
+
+import AI_MITNews
+
+
+class FakePage:
+    async def close(self):
+        pass
+
+
+class FlakyContext:
+    def __init__(self, failures):
+        self.failures = failures
+
+    async def new_page(self):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("browser crashed")
+        return FakePage()
+
+
+def test_release_retries_replacement_page(monkeypatch):
+    monkeypatch.setattr(AI_MITNews, "PAGE_REPLACE_ATTEMPTS", 2)
+
+    async def scenario():
+        context = FlakyContext(0)
+        pool = AI_MITNews.PagePool(context, 1)
+        await pool.open()
+        page = await pool.acquire()
+        context.failures = 1
+        await pool.release(page, broken=True)
+        return pool, await pool.acquire()
+
+    pool, page = asyncio.run(scenario())
+    assert pool.size == 1 and page in pool._pages
+
+
+def test_release_shrinks_pool_and_fails_waiters_when_empty(monkeypatch):
+    monkeypatch.setattr(AI_MITNews, "PAGE_REPLACE_ATTEMPTS", 1)
+
+    async def scenario():
+        context = FlakyContext(0)
+        pool = AI_MITNews.PagePool(context, 1)
+        await pool.open()
+        page = await pool.acquire()
+        waiter = asyncio.create_task(pool.acquire())
+        context.failures = 1
+        await pool.release(page, broken=True)
+        assert pool.size == 0
+        with pytest.raises(RuntimeError):
+            await waiter
+        with pytest.raises(RuntimeError):
+            await pool.acquire()
+
+    asyncio.run(scenario())
@@ -0,0 +1,61 @@
+"""机器之心列表卡片上的时间换算，以及水位线的截止和推进规则。"""
+from datetime import datetime
+
+import pytest
+
+import AI_jiqizhixin
+from AI_jiqizhixin import SITE_TIMEZONE, advance_watermark, parse_card_time, reached_watermark
+
+NOW = SITE_TIMEZONE.localize(datetime(2024, 7, 10, 12, 0, 0))
+
+
+def at(*args):
+    return SITE_TIMEZONE.localize(datetime(*args))
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("刚刚", NOW),
+    ("  刚刚  ", NOW),
+    ("30秒前", at(2024, 7, 10, 11, 59, 30)),
+    ("5分钟前", at(2024, 7, 10, 11, 55)),
+    ("3小时前", at(2024, 7, 10, 9, 0)),
+    ("2天前", at(2024, 7, 8, 12, 0)),
+    ("1周前", at(2024, 7, 3, 12, 0)),
+    ("2个月前", at(2024, 5, 11, 12, 0)),
+    ("1年前", at(2023, 7, 11, 12, 0)),
+    ("昨天 10:20", at(2024, 7, 9, 10, 20)),
+    ("前天 08:05", at(2024, 7, 8, 8, 5)),
+    # 绝对日期只精确到天，取当天最后一秒
+    ("2024-07-01", at(2024, 7, 1, 23, 59, 59)),
+    ("2023/12/31", at(2023, 12, 31, 23, 59, 59)),
+    ("2024年7月1日", at(2024, 7, 1, 23, 59, 59)),
+    ("07-01", at(2024, 7, 1, 23, 59, 59)),
+    # 不带年份的日期落在未来时算作去年
+    ("12-25", at(2023, 12, 25, 23, 59, 59)),
+    ("", None),
+    ("不久之前", None),
+])
+def test_parse_card_time(text, expected):
+    assert parse_card_time(text, now=NOW) == expected
+
+
+@pytest.mark.parametrize("article_id, time_text, expected", [
+    ("100", "刚刚", True),  # 水位线那篇文章本身
+    ("101", "刚刚", False),
+    ("101", "2024-07-02", False),  # 当天最后一秒晚于水位线，可能是新文章
+    ("101", "2024-06-30", True),
+    (None, "不久之前", False),  # 无法识别的时间不截止
+])
+def test_reached_watermark(monkeypatch, article_id, time_text, expected):
+    monkeypatch.setattr(AI_jiqizhixin, "parse_card_time", lambda text: parse_card_time(text, now=NOW))
+    watermark = {"id": "100", "published_at": at(2024, 7, 2, 9, 0)}
+    assert reached_watermark(watermark, article_id, time_text) is expected
+
+
+def test_advance_watermark_stops_at_first_failure():
+    articles = [("3", "u3"), ("2", "u2"), (None, None), ("1", "u1")]
+    done = {"3": "2024-07-03 10:00:00", "2": "2024-07-02 10:00:00", "1": "2024-07-01 10:00:00"}
+    watermark = advance_watermark(None, articles, done)
+    # 点击模式里失败的卡片以 (None, None) 占位，水位线停在它之前
+    assert watermark == {"id": "1", "published_at": at(2024, 7, 1, 10, 0)}
+    assert advance_watermark(None, [a for a in articles if a[0]], done)["id"] == "3"
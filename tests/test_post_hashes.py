@@ -0,0 +1,85 @@
+"""写出文章时登记的哈希与重建清单时从 index.md 解析出的哈希必须一致，否则内容去重在重建后失效。"""
+import os
+import json
+import sqlite3
+
+import pytest
+
+import daily_md_generator
+import post_manifest
+
+ARTICLE = {
+    "title": "OpenAI 发布新模型",
+    "summary": "摘要：OpenAI 发布了新的推理模型，在数学和编程基准上领先。",
+    "tags": ["基模"],
+    "url": "https://e.org/a",
+    "original_content": "",
+}
+
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    monkeypatch.setenv("GITHUB_ACTIONS", "true")
+    monkeypatch.setenv("HUGO_PROJECT_PATH", str(tmp_path))
+    monkeypatch.setenv("SITE_BASE_URL", "https://blog.example.com")
+    monkeypatch.setattr(daily_md_generator, "POST_OUTPUT_MODE", "bundle")
+    daily_md_generator.setup()
+    return daily_md_generator.target_root
+
+
+def manifest_hashes(target_root):
+    with sqlite3.connect(post_manifest.manifest_path(target_root)) as db:
+        return db.execute("SELECT folder, title_hash, content_hash FROM posts ORDER BY folder").fetchall()
+
+
+def test_write_and_rebuild_agree(generator):
+    state = daily_md_generator.open_today_posts("2024_07_01")
+    assert daily_md_generator.write_post(state, dict(ARTICLE))
+    state["manifest"].close()
+    written = manifest_hashes(generator)
+
+    manifest = post_manifest.PostManifest(generator)
+    manifest.reconcile(full=True)
+    manifest.close()
+    assert manifest_hashes(generator) == written
+
+    # 摘要只差“摘要：”前缀的同一篇文章按内容判为重复
+    state = daily_md_generator.open_today_posts("2024_07_02")
+    copy = dict(ARTICLE, title="另一个标题", summary=ARTICLE["summary"].replace("摘要：", ""))
+    assert not daily_md_generator.write_post(state, copy)
+    state["manifest"].close()
+
+
+def test_outdated_hashes_are_reparsed_once(generator):
+    state = daily_md_generator.open_today_posts("2024_07_01")
+    daily_md_generator.write_post(state, dict(ARTICLE))
+    state["manifest"].close()
+    written = manifest_hashes(generator)
+    # 模拟旧版本登记的内容哈希（对原始摘要取哈希）和旧的哈希规则版本
+    with sqlite3.connect(post_manifest.manifest_path(generator)) as db:
+        db.execute("UPDATE posts SET content_hash = 'stale'")
+        db.execute("PRAGMA user_version = 0")
+
+    manifest = post_manifest.PostManifest(generator)
+    manifest.reconcile()
+    manifest.close()
+    assert manifest_hashes(generator) == written
+    with sqlite3.connect(post_manifest.manifest_path(generator)) as db:
+        assert db.execute("PRAGMA user_version").fetchone()[0] == post_manifest.HASH_VERSION
+
+
+def test_streamed_posts_advance_checkpoint(generator, tmp_path):
+    summary_jsonl = tmp_path / "spiders" / "ai_news" / "summarized_articles.jsonl"
+    summary_jsonl.parent.mkdir(parents=True, exist_ok=True)
+    state = daily_md_generator.open_today_posts("2024_07_01")
+    with open(summary_jsonl, "a", encoding="utf-8") as f:
+        for i in range(2):
+            article = dict(ARTICLE, title=f"第 {i} 篇", summary=f"摘要：第 {i} 篇的内容。")
+            f.write(json.dumps(article, ensure_ascii=False) + "\n")
+            f.flush()
+            assert daily_md_generator.write_streamed_post(state, str(summary_jsonl), article)
+
+    # 最后一遍从推进后的断点开始，不会把流式生成过的文章再读一遍当作重复跳过
+    assert daily_md_generator.process_new_summaries(state, str(summary_jsonl)) == 0
+    assert state["total"] == 2 and state["skipped"] == 0
+    state["manifest"].close()
@@ -0,0 +1,65 @@
+"""当天汇总和订阅源：RSS 频道链接必须是绝对地址，站点地址缺失时直接报错而不是少写一种格式。"""
+import os
+import json
+
+import pytest
+
+import post_renderer
+
+POST = post_renderer.make_post('Title with "quotes" & <tags>', ["Agent"], "摘要内容。", "01_title",
+                               "https://e.org/a", "2024-07-01T10:00:00+08:00")
+
+
+def render_day(tmp_path, archive_path=None):
+    outputs = post_renderer.DailyOutputs(str(tmp_path), "2024_07_01", archive_path)
+    outputs.add(POST, "2024_07_01/01_title")
+    outputs.write()
+    return os.path.join(str(tmp_path), post_renderer.DAILY_DIR, "2024_07_01")
+
+
+def test_missing_site_url_fails_loudly(tmp_path, monkeypatch):
+    monkeypatch.delenv("SITE_BASE_URL", raising=False)
+    with pytest.raises(RuntimeError, match="SITE_BASE_URL"):
+        post_renderer.DailyOutputs(str(tmp_path), "2024_07_01")
+    # 相对地址同样不行
+    (tmp_path / "hugo.toml").write_text('baseURL = "/"\n', encoding="utf-8")
+    with pytest.raises(RuntimeError, match="baseURL"):
+        post_renderer.DailyOutputs(str(tmp_path), "2024_07_01")
+
+
+@pytest.mark.parametrize("name, text", [
+    ("hugo.toml", 'title = "AI"\nbaseURL = "https://blog.example.com/"\n'),
+    ("config.yaml", "title: AI\nbaseURL: 'https://blog.example.com/'\n"),
+    ("config.json", '{"baseURL": "https://blog.example.com/"}'),
+])
+def test_site_url_falls_back_to_hugo_config(tmp_path, monkeypatch, name, text):
+    monkeypatch.delenv("SITE_BASE_URL", raising=False)
+    (tmp_path / name).write_text(text, encoding="utf-8")
+    assert post_renderer.site_url(str(tmp_path)) == "https://blog.example.com"
+
+
+def test_rss_channel_link_is_absolute(tmp_path, monkeypatch):
+    monkeypatch.setenv("SITE_BASE_URL", "https://blog.example.com/")
+    base = render_day(tmp_path)
+    with open(base + ".xml", encoding="utf-8") as f:
+        rss = f.read()
+    assert "<link>https://blog.example.com</link>" in rss
+    assert "<title>Title with \"quotes\" &amp; &lt;tags&gt;</title>" in rss
+    with open(base + ".json", encoding="utf-8") as f:
+        feed = json.load(f)
+    assert feed["feed_url"] == "https://blog.example.com/daily/2024_07_01.json"
+
+    # 同一天再次运行时从 JSON Feed 读回已有文章
+    outputs = post_renderer.DailyOutputs(str(tmp_path), "2024_07_01")
+    assert [entry["id"] for entry in outputs.entries] == ["2024_07_01/01_title"]
+
+
+def test_new_posts_are_appended_to_the_archive_digest(tmp_path, monkeypatch):
+    monkeypatch.setenv("SITE_BASE_URL", "https://blog.example.com")
+    archive = tmp_path / "spiders" / "ai_news" / "summarized_articles.md"
+    render_day(tmp_path, str(archive))
+    render_day(tmp_path, str(archive))
+    text = archive.read_text(encoding="utf-8")
+    # 每次只追加本次新增的文章，已有的不重复写入
+    assert text.count("## Title with") == 2
+    assert text.startswith(post_renderer.digest_entry(POST["title"], POST["link"], POST["tags"], "摘要内容。"))
@@ -0,0 +1,103 @@
+"""批任务模式提交后立即返回，之后的运行发现 batch 已结束时才合并结果。"""
+import os
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import AI_summary
+
+ARTICLES = [
+    {"title": f"Article {i}", "content": f"Article {i} covers a different topic, number {i}. " * 20,
+     "url": f"https://e.org/{i}"}
+    for i in range(2)
+]
+
+
+class FakeBatchClient:
+    def __init__(self):
+        self.status = "in_progress"
+        self.created = []
+        self.uploaded = {}
+        self.retrieved = 0
+        self.files = SimpleNamespace(create=self._upload, content=self._content)
+        self.batches = SimpleNamespace(create=self._create, retrieve=self._retrieve)
+
+    def _upload(self, file, purpose):
+        self.uploaded["input"] = [json.loads(line) for line in file.read().decode("utf-8").splitlines()]
+        return SimpleNamespace(id="input")
+
+    def _create(self, **kwargs):
+        self.created.append(kwargs)
+        return SimpleNamespace(id=f"batch-{len(self.created)}")
+
+    def _retrieve(self, batch_id):
+        self.retrieved += 1
+        return SimpleNamespace(id=batch_id, status=self.status, request_counts=None,
+                               output_file_id="output" if self.status == "completed" else None,
+                               error_file_id=None)
+
+    def _content(self, file_id):
+        lines = []
+        for request in self.uploaded["input"]:
+            body = {"model": "m", "usage": None, "choices": [{"message": {"content": json.dumps(
+                {"summary": "摘要 " + request["custom_id"], "tags": ["Agent"]})}}]}
+            lines.append(json.dumps({"custom_id": request["custom_id"],
+                                     "response": {"status_code": 200, "body": body}}))
+        return SimpleNamespace(text="\n".join(lines))
+
+
+@pytest.fixture
+def batch_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("GITHUB_ACTIONS", "true")
+    monkeypatch.setenv("HUGO_PROJECT_PATH", str(tmp_path))
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(AI_summary, "SUMMARY_MODE", "batch")
+    fake = FakeBatchClient()
+
+    def run():
+        AI_summary.setup()
+        AI_summary.client = fake
+        try:
+            AI_summary.summarize_pending()
+        finally:
+            AI_summary.teardown()
+
+    AI_summary.setup()
+    with open(AI_summary.input_files[0], "w", encoding="utf-8") as f:
+        for article in ARTICLES:
+            f.write(json.dumps(article, ensure_ascii=False) + "\n")
+    AI_summary.teardown()
+    return fake, run
+
+
+def summarized_titles():
+    if not os.path.exists(AI_summary.output_file):
+        return []
+    with open(AI_summary.output_file, encoding="utf-8") as f:
+        return [json.loads(line)["title"] for line in f]
+
+
+def test_batch_is_submitted_without_waiting_and_merged_later(batch_env):
+    fake, run = batch_env
+
+    run()
+    assert len(fake.created) == 1 and fake.retrieved == 0
+    assert os.path.exists(AI_summary.batch_state_file)
+    assert summarized_titles() == []
+
+    # batch 还在处理：只查询一次就返回，不重复提交
+    run()
+    assert fake.retrieved == 1 and len(fake.created) == 1
+    assert summarized_titles() == []
+
+    fake.status = "completed"
+    run()
+    assert summarized_titles() == ["Article 0", "Article 1"]
+    assert not os.path.exists(AI_summary.batch_state_file)
+    assert len(fake.created) == 1  # 合并后没有剩余文章，不再提交新的 batch
+    input_file = AI_summary.input_files[0]
+    AI_summary.setup()
+    checkpoint = AI_summary.seen_store.checkpoint(f"summary_input:{os.path.basename(input_file)}", input_file)
+    AI_summary.teardown()
+    assert checkpoint == os.path.getsize(input_file)
@@ -0,0 +1,107 @@
+"""流水线里摘要失败的文章必须在补齐阶段或下次运行时重试，输入文件断点不能越过它。"""
+import os
+import json
+import asyncio
+
+import pytest
+
+import AI_summary
+
+ARTICLES = [
+    {"title": "Good article", "content": "Good article body about foundation models. " * 20, "url": "https://e.org/good"},
+    {"title": "Bad article", "content": "Completely different text on robotics and embodied agents. " * 20,
+     "url": "https://e.org/bad"},
+]
+
+
+@pytest.fixture
+def summary_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("GITHUB_ACTIONS", "true")
+    monkeypatch.setenv("HUGO_PROJECT_PATH", str(tmp_path))
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    failing = {"Bad article"}
+
+    async def fake_summarize_async(async_client, limiter, article):
+        if article["title"] in failing:
+            raise RuntimeError("permanent 400")
+        return f"摘要 {article['title']}", ["Agent"]
+
+    def fake_summarize(article):
+        if article["title"] in failing:
+            raise RuntimeError("permanent 400")
+        return f"摘要 {article['title']}", ["Agent"]
+
+    monkeypatch.setattr(AI_summary, "summarize_article_async", fake_summarize_async)
+    monkeypatch.setattr(AI_summary, "summarize_article", fake_summarize)
+    AI_summary.setup()
+    input_file = AI_summary.input_files[0]
+    with open(input_file, "w", encoding="utf-8") as f:
+        for article in ARTICLES:
+            f.write(json.dumps(article, ensure_ascii=False) + "\n")
+    yield failing, input_file
+    AI_summary.teardown()
+
+
+def stream(articles):
+    async def run():
+        queue = asyncio.Queue()
+        for article in articles:
+            await queue.put(dict(article))
+        await queue.put(None)
+        await AI_summary.summarize_queue(queue)
+    asyncio.run(run())
+
+
+def summarized_titles():
+    with open(AI_summary.output_file, encoding="utf-8") as f:
+        return [json.loads(line)["title"] for line in f]
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_stream_failure_is_retried_by_catch_up(summary_env, monkeypatch, concurrency):
+    failing, input_file = summary_env
+    monkeypatch.setattr(AI_summary, "CONCURRENCY", concurrency)
+
+    stream(ARTICLES)
+    AI_summary.summarize_pending()
+    AI_summary.save_input_checkpoints()
+
+    assert summarized_titles() == ["Good article"]
+    # 断点停在失败文章所在的行，而不是文件末尾
+    with open(input_file, "rb") as f:
+        first_line = len(f.readline())
+    checkpoint = AI_summary.seen_store.checkpoint(f"summary_input:{os.path.basename(input_file)}", input_file)
+    assert checkpoint == first_line
+
+    # 下一次运行时接口恢复，失败的文章被重新读到并写出
+    AI_summary.teardown()
+    failing.clear()
+    AI_summary.setup()
+    AI_summary.summarize_pending()
+    assert summarized_titles() == ["Good article", "Bad article"]
+
+
+def test_poisoned_article_stops_pinning_the_checkpoint(summary_env, monkeypatch):
+    _, input_file = summary_env
+    attempts = []
+
+    async def unparsable(async_client, limiter, article):
+        if article["title"] == "Bad article":
+            attempts.append(article["title"])
+            raise ValueError("模型返回的内容无法解析")
+        return f"摘要 {article['title']}", ["Agent"]
+
+    monkeypatch.setattr(AI_summary, "summarize_article_async", unparsable)
+    monkeypatch.setattr(AI_summary, "CONCURRENCY", 4)
+    name = f"summary_input:{os.path.basename(input_file)}"
+
+    for _ in range(AI_summary.MAX_ARTICLE_FAILURES):
+        AI_summary.summarize_pending()
+        AI_summary.teardown()
+        AI_summary.setup()
+
+    # 失败次数达到上限后断点越过这篇文章，之后的运行不再读到它
+    assert AI_summary.seen_store.checkpoint(name, input_file) == os.path.getsize(input_file)
+    AI_summary.summarize_pending()
+    assert len(attempts) == AI_summary.MAX_ARTICLE_FAILURES
+    assert summarized_titles() == ["Good article"]
@@ -0,0 +1,44 @@
+"""长文的分段请求与其他文章共用同一组请求槽位，同时进行中的请求数不超过 SUMMARY_CONCURRENCY。"""
+import json
+import asyncio
+from types import SimpleNamespace
+
+import AI_summary
+from llm_scheduler import RateLimiter
+
+
+class CountingClient:
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(with_raw_response=SimpleNamespace(create=self.create)))
+
+    async def create(self, **kwargs):
+        self.in_flight += 1
+        self.calls += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        content = json.dumps({"summary": "要点", "tags": ["Agent"]})
+        response = SimpleNamespace(usage=None, choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+        return SimpleNamespace(headers={}, parse=lambda: response)
+
+
+def test_chunk_calls_share_the_in_flight_cap(monkeypatch):
+    monkeypatch.setattr(AI_summary, "MAX_INPUT_TOKENS", 50)
+    monkeypatch.setattr(AI_summary, "usage_log", SimpleNamespace(record=lambda *args, **kwargs: None))
+    client = CountingClient()
+    articles = [
+        {"title": f"Long {i}", "content": " ".join(f"Sentence {j} of article {i} about agents." for j in range(60))}
+        for i in range(3)
+    ]
+
+    async def run():
+        limiter = RateLimiter(100000, 10 ** 9, 2)
+        return await asyncio.gather(*(AI_summary.summarize_article_async(client, limiter, a) for a in articles))
+
+    results = asyncio.run(run())
+    assert results == [("要点", ["Agent"])] * 3
+    assert client.calls > 3 * 4  # 每篇都被切成多段
+    assert client.peak == 2
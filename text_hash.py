@@ -0,0 +1,24 @@
+"""去重用的标题和内容哈希，爬虫、摘要、文章生成和文章清单共用同一套规则。
+
+生成文章时和重建清单时必须对同一段文本取哈希，否则同一篇文章在两边得到不同的哈希，内容去重失效。
+文章的内容哈希统一取 post_summary() 之后的摘要，也就是 index.md 里 <!--more--> 之前的正文。
+"""
+import hashlib
+
+
+def normalize_title(title):
+    # 去掉空格和标点，转小写
+    return ''.join(c.lower() for c in title if c.isalnum())
+
+
+def title_hash(title):
+    return hashlib.md5(normalize_title(title).encode('utf-8')).hexdigest()
+
+
+def content_hash(text):
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+
+def post_summary(summary):
+    """写入文章正文的摘要：去掉模型有时带上的“摘要：”前缀和首尾空白。"""
+    return summary.replace("摘要：", "").strip()
@@ -0,0 +1,71 @@
+"""按 token 预算切分长文本。
+
+优先使用 tiktoken 精确计数；没有安装或编码文件下载失败（离线环境）时退回 llm_scheduler 的粗估，
+粗估对中文按 1 字 1 token 计算，只会高估，不会让请求超出上下文窗口。
+"""
+import re
+from llm_scheduler import estimate_text_tokens
+
+# 在句末标点或换行之后切开，标点留在前一句
+SENTENCE_END = re.compile(r"(?<=[。！？!?；;\n])|(?<=\. )")
+
+_encodings = {}
+
+
+def get_encoding(model):
+    if model not in _encodings:
+        try:
+            import tiktoken
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            print(f"⚠️ tiktoken 不可用，改用字符数估算 token: {e}")
+            _encodings[model] = None
+    return _encodings[model]
+
+
+def count_tokens(text, model):
+    encoding = get_encoding(model)
+    if encoding is None:
+        return estimate_text_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def hard_split(text, max_tokens, model):
+    """不考虑句子边界，按 token 数硬切。"""
+    encoding = get_encoding(model)
+    if encoding is None:
+        # 粗估下每个字符最多算 1 token，按字符切一定不超预算
+        return [text[i:i + max_tokens] for i in range(0, len(text), max_tokens)]
+    tokens = encoding.encode(text, disallowed_special=())
+    return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+
+
+def truncate_to_tokens(text, max_tokens, model):
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    return split_by_tokens(text, max_tokens, model)[0]
+
+
+def split_by_tokens(text, max_tokens, model):
+    """按句子把文本装进不超过 max_tokens 的块里；单句超长时再硬切。"""
+    chunks = []
+    current = []
+    current_tokens = 0
+    for sentence in SENTENCE_END.split(text):
+        if not sentence.strip():
+            continue
+        tokens = count_tokens(sentence, model)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("".join(current))
+            current, current_tokens = [], 0
+        if tokens > max_tokens:
+            chunks.extend(hard_split(sentence, max_tokens, model))
+            continue
+        current.append(sentence)
+        current_tokens += tokens
+    if current:
+        chunks.append("".join(current))
+    return chunks